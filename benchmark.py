@@ -0,0 +1,254 @@
+"""
+Benchmark harness for the search code.
+
+Generates reproducible problems by seeded random walks from the goal (EightPuzzle / 15-puzzle
+boards at chosen walk depths, LightsOut boards of chosen sizes in both toggle patterns), runs
+the chosen algorithms on them and writes time, expanded nodes, nodes per second and peak
+memory per run to a JSON file, so results from different commits can be compared.
+
+Examples:
+    python benchmark.py --output bench.json
+    python benchmark.py --algorithms astar bidirectional --eight_puzzle_depths 20 30 --lights_out_sizes 5x5
+    python benchmark.py --generate data/generated   # only write the problems, in the usual file formats
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+from state import LightsOutState, EightPuzzleState
+from search import astar_search, ida_star_search, rbfs_search, bidirectional_search
+from lights_out_solver import solve_lights_out
+from pattern_database import get_pattern_database_heuristic
+from utils import get_goal_eight_puzzle, get_goal_lights_out
+
+ALGORITHMS = {
+    "astar": astar_search,
+    "idastar": ida_star_search,
+    "rbfs": rbfs_search,
+    "bidirectional": bidirectional_search,
+    "gf2": solve_lights_out,
+}
+
+# Generators -------------------------------------------------------------------------------------------------
+
+def random_eight_puzzle(depth, size, rng):
+    '''
+    Random walk of depth moves of the blank from the goal, never directly undoing the previous
+    move. Return (grid, zero_loc) as read_eight_puzzle does; the optimal solution has at most depth moves.
+    '''
+    goal = get_goal_eight_puzzle(size)
+    state = EightPuzzleState(goal, goal, 0, False, [0, 0])
+    previous = None
+    for _ in range(depth):
+        successors = [s for s in state.generate_successors() if previous is None or s != previous]
+        previous, state = state, rng.choice(successors)
+    return state.grid, state.zero_loc
+
+def random_lights_out(toggles, rows, cols, cross_pattern, rng):
+    '''
+    Press toggles distinct random cells starting from all lights off.
+    Return (grid, cross_pattern, optimal number of toggles) as read_lights_out does.
+    '''
+    goal = get_goal_lights_out([[0] * cols for _ in range(rows)])
+    state = LightsOutState(goal, goal, 0, False, cross_pattern)
+    for cell in rng.sample(range(rows * cols), toggles):
+        state = state.make_successor(cell // cols, cell % cols)
+    # Several presses can cancel out, so get the true optimum from the algebraic solver
+    optimal = len(solve_lights_out(LightsOutState(state.grid, goal, 0, False, cross_pattern))) - 1
+    return state.grid, cross_pattern, optimal
+
+def generate_workloads(args):
+    '''
+    Return a list of (workload name, problem type, problem) with problems in the formats
+    returned by utils.read_eight_puzzle / utils.read_lights_out.
+    '''
+    rng = random.Random(args.seed)
+    workloads = []
+    for size in args.eight_puzzle_sizes:
+        for depth in args.eight_puzzle_depths:
+            name = f"EightPuzzle {size}x{size} walk {depth}"
+            for _ in range(args.instances):
+                workloads.append((name, "EightPuzzle", random_eight_puzzle(depth, size, rng)))
+    for shape in args.lights_out_sizes:
+        rows, cols = shape
+        for cross_pattern in (False, True):
+            for toggles in args.lights_out_toggles:
+                if toggles > rows * cols:
+                    continue
+                name = f"LightsOut {rows}x{cols} {'X' if cross_pattern else '+'} toggles {toggles}"
+                for _ in range(args.instances):
+                    workloads.append((name, "LightsOut", random_lights_out(toggles, rows, cols, cross_pattern, rng)))
+    return workloads
+
+def write_problem_files(workloads, directory):
+    '''
+    Write the problems in the formats of data/eight_puzzle and data/lights_out:
+    one eight_puzzle_<size>x<size>_walk_<depth>.txt file per workload, and a single lights_out.txt.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    lights_out_lines = []
+    eight_puzzle_files = {}
+    for name, problem_type, problem in workloads:
+        if problem_type == "EightPuzzle":
+            grid = problem[0]
+            tiles = [tile for row in grid for tile in row]
+            line = "".join(map(str, tiles)) if len(grid) == 3 else " ".join(map(str, tiles))
+            filename = "eight_puzzle_" + name.split(" ", 1)[1].replace(" ", "_") + ".txt"
+            eight_puzzle_files.setdefault(filename, []).append(line)
+        else:
+            grid, cross_pattern, optimal = problem
+            lights_out_lines.append(f"# {len(grid)} {len(grid[0])} {'X' if cross_pattern else '+'} {optimal}")
+            lights_out_lines.append("".join(str(c) for row in grid for c in row))
+    for filename, lines in eight_puzzle_files.items():
+        with open(os.path.join(directory, filename), "w") as f:
+            f.write("\n".join(lines) + "\n")
+    if lights_out_lines:
+        with open(os.path.join(directory, "lights_out.txt"), "w") as f:
+            f.write("\n".join(lights_out_lines) + "\n")
+
+# Runner -----------------------------------------------------------------------------------------------------
+
+def make_starting_state(problem_type, problem, heuristic):
+    if problem_type == "EightPuzzle":
+        grid, zero_loc = problem
+        goal = get_goal_eight_puzzle(len(grid))
+        if heuristic == "pdb":
+            heuristic = get_pattern_database_heuristic(goal, len(grid))
+        return EightPuzzleState(grid, goal, 0, True, zero_loc, heuristic=heuristic)
+    grid, cross_pattern, _ = problem
+    return LightsOutState(grid, get_goal_lights_out(grid), 0, True, cross_pattern)
+
+def run_once(algorithm, problem_type, problem, heuristic):
+    '''Return (path, seconds, nodes expanded or None if the algorithm does not report it)'''
+    starting_state = make_starting_state(problem_type, problem, heuristic)
+    start = time.perf_counter()
+    if algorithm == "astar":
+        path, stats = astar_search(starting_state, return_stats=True)
+        nodes = stats.nodes_expanded
+    else:
+        path = ALGORITHMS[algorithm](starting_state)
+        nodes = None
+    return path, time.perf_counter() - start, nodes
+
+def peak_memory(algorithm, problem_type, problem, heuristic):
+    # A separate run, since tracing allocations slows the search down
+    tracemalloc.start()
+    try:
+        run_once(algorithm, problem_type, problem, heuristic)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(workloads, args):
+    results = []
+    for index, (name, problem_type, problem) in enumerate(workloads):
+        for algorithm in args.algorithms:
+            if algorithm == "gf2" and problem_type != "LightsOut":
+                continue
+            path, seconds, nodes = run_once(algorithm, problem_type, problem, args.heuristic)
+            result = {
+                "workload": name,
+                "instance": index,
+                "algorithm": algorithm,
+                "solution_length": len(path) - 1,
+                "time": seconds,
+                "nodes_expanded": nodes,
+                "nodes_per_second": nodes / seconds if nodes is not None and seconds > 0 else None,
+                "peak_memory": None if args.no_memory else peak_memory(algorithm, problem_type, problem, args.heuristic),
+            }
+            if problem_type == "LightsOut":
+                result["optimal_length"] = problem[2]
+            results.append(result)
+            if not args.quiet:
+                print(f"{name:<36} #{index:<4} {algorithm:<14} moves {result['solution_length']:<4} "
+                      f"time {seconds:8.4f}s nodes {nodes if nodes is not None else '-'}")
+    return results
+
+# Totals per (workload, algorithm)
+def summarize(results):
+    summary = {}
+    for result in results:
+        entry = summary.setdefault((result["workload"], result["algorithm"]),
+                                   {"workload": result["workload"], "algorithm": result["algorithm"],
+                                    "instances": 0, "total_time": 0.0, "total_nodes": None, "max_peak_memory": None})
+        entry["instances"] += 1
+        entry["total_time"] += result["time"]
+        if result["nodes_expanded"] is not None:
+            entry["total_nodes"] = (entry["total_nodes"] or 0) + result["nodes_expanded"]
+        if result["peak_memory"] is not None:
+            entry["max_peak_memory"] = max(entry["max_peak_memory"] or 0, result["peak_memory"])
+    for entry in summary.values():
+        has_rate = entry["total_nodes"] is not None and entry["total_time"] > 0
+        entry["nodes_per_second"] = entry["total_nodes"] / entry["total_time"] if has_rate else None
+    return list(summary.values())
+
+def parse_shape(text):
+    rows, cols = text.lower().split("x")
+    return int(rows), int(cols)
+
+def main(args):
+    workloads = generate_workloads(args)
+    if args.generate:
+        write_problem_files(workloads, args.generate)
+        print(f"Wrote {len(workloads)} problems to {args.generate}")
+        return
+    results = run_benchmark(workloads, args)
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "quiet")},
+        "summary": summarize(results),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='CS440 MP3 Search benchmarks')
+    parser.add_argument('--seed', dest="seed", type=int, default=0,
+                        help='Random seed for the generated problems')
+    parser.add_argument('--instances', dest="instances", type=int, default=5,
+                        help='Number of problems per workload')
+    parser.add_argument('--eight_puzzle_sizes', dest="eight_puzzle_sizes", type=int, nargs="*", default=[3],
+                        help='Side lengths of the sliding-tile boards (3: EightPuzzle, 4: 15-puzzle)')
+    parser.add_argument('--eight_puzzle_depths', dest="eight_puzzle_depths", type=int, nargs="*", default=[10, 20, 30],
+                        help='Random walk lengths for the sliding-tile problems')
+    parser.add_argument('--lights_out_sizes', dest="lights_out_sizes", type=parse_shape, nargs="*",
+                        default=[(3, 3), (4, 4), (5, 5)],
+                        help='LightsOut board sizes, e.g. 5x5 (both toggle patterns are used)')
+    parser.add_argument('--lights_out_toggles', dest="lights_out_toggles", type=int, nargs="*", default=[3, 5],
+                        help='Number of random presses for the LightsOut problems')
+    parser.add_argument('--algorithms', dest="algorithms", type=str, nargs="*", default=["astar", "bidirectional"],
+                        choices=sorted(ALGORITHMS),
+                        help='Algorithms to run (gf2 only runs on LightsOut)')
+    parser.add_argument('--heuristic', dest="heuristic", type=str, default="manhattan",
+                        choices=["manhattan", "linear_conflict", "pdb"],
+                        help='EightPuzzle heuristic')
+    parser.add_argument('--no_memory', dest="no_memory", action='store_true',
+                        help='Skip the extra tracemalloc run that measures peak memory')
+    parser.add_argument('--output', dest="output", type=str, default="data/benchmarks/results.json",
+                        help='JSON file to write the results to')
+    parser.add_argument('--generate', dest="generate", type=str, default=None,
+                        help='Only write the generated problems to this directory, in the usual file formats')
+    parser.add_argument('--quiet', dest="quiet", action='store_true',
+                        help='Do not print a line per run')
+
+    args = parser.parse_args()
+    main(args)
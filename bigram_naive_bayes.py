@@ -18,9 +18,10 @@ so be careful to not modify anything else.
 
 
 import reader
-import math
-from tqdm import tqdm
-from collections import Counter
+import numpy as np
+from naive_bayes import NaiveBayesBase, token_columns, class_log_likelihoods, seen_columns, grow_columns
+from naive_bayes import partial_fit_stream, predict_stream
+from vocabulary import Vocabulary
 
 
 '''
@@ -41,101 +42,174 @@ load_data loads the input data by calling the provided utility.
 You can adjust default values for stemming and lowercase, when we haven't passed in specific values,
 to potentially improve performance.
 """
-def load_data(trainingdir, testdir, stemming=False, lowercase=False, silently=False):
+def load_data(trainingdir, testdir, stemming=False, lowercase=False, silently=False, workers=1, vocabulary=None):
     print(f"Stemming: {stemming}")
     print(f"Lowercase: {lowercase}")
-    train_set, train_labels, dev_set, dev_labels = reader.load_dataset(trainingdir,testdir,stemming,lowercase,silently)
+    train_set, train_labels, dev_set, dev_labels = reader.load_dataset(trainingdir,testdir,stemming,lowercase,silently,workers,vocabulary=vocabulary)
     return train_set, train_labels, dev_set, dev_labels
 
 
 """
-Main function for training and predicting with the bigram mixture model.
-    You can modify the default values for the Laplace smoothing parameters, model-mixture lambda parameter, and the prior for the positive label.
-    Notice that we may pass in specific values for these parameters during our testing.
+Compiled bigram model.
+    Bigrams are interned as packed 64-bit pair ids, (first << 32) | second, over the unigram columns
+    (word ids of a vocabulary.Vocabulary, see naive_bayes.token_columns). The ids do not depend on the
+    vocabulary size, so they stay valid while partial_fit() grows the vocabulary. The seen pair ids are kept sorted,
+    with one log-probability table per class whose last entry is the constant for all unseen bigrams,
+    so scoring a document set is a binary search plus table lookups and sums over arrays.
 """
-def bigram_bayes(train_set, train_labels, dev_set, unigram_laplace=0.5, bigram_laplace=1.0, bigram_lambda=0.45, pos_prior=0.5, silently=False):
-    print_values_bigram(unigram_laplace,bigram_laplace,bigram_lambda,pos_prior)
-    #Count Unigrams and Bigrams
-    def count_grams(train_set, train_labels):
-        positive_unigrams = Counter()
-        negative_unigrams = Counter()
-        positive_bigrams = Counter()
-        negative_bigrams = Counter()
-        positive_total_unigrams = 0
-        negative_total_unigrams = 0
-        positive_total_bigrams = 0
-        negative_total_bigrams   = 0
-        for tokens, label in zip(train_set, train_labels):
-            if label == 1:
-                positive_unigrams.update(tokens)
-                positive_total_unigrams += len(tokens)
-            else:
-                negative_unigrams.update(tokens)
-                negative_total_unigrams += len(tokens)
-            for i in range(len(tokens) - 1):
-                bigram = (tokens[i], tokens[i+1])
-                if label == 1:
-                    positive_bigrams[bigram] += 1
-                    positive_total_bigrams += 1
-                else:
-                    negative_bigrams[bigram] += 1
-                    negative_total_bigrams += 1
-        return positive_unigrams, negative_unigrams, positive_bigrams, negative_bigrams, positive_total_unigrams, negative_total_unigrams, positive_total_bigrams, negative_total_bigrams
-    positive_unigrams, negative_unigrams, positive_bigrams, negative_bigrams, positive_total_unigrams, negative_total_unigrams, positive_total_bigrams, negative_total_bigrams = count_grams(train_set, train_labels)
-    unigram_vocab = set(positive_unigrams.keys()) | set(negative_unigrams.keys())
-    bigram_vocab  = set(positive_bigrams.keys()) | set(negative_bigrams.keys())
-    Size_unigrams = len(unigram_vocab)
-    Size_bigrams  = len(bigram_vocab)
-
-    #Log Probability
-    def log_prob_unigram(tokens, target_class):
-        logp = 0.0
-        for i in tokens:
-            if target_class == 1:
-                count = positive_unigrams[i]
-                num = count + unigram_laplace
-                denom = positive_total_unigrams + unigram_laplace * Size_unigrams
-            else:
-                count = negative_unigrams[i]
-                num = count + unigram_laplace
-                denom = negative_total_unigrams + unigram_laplace * Size_unigrams
-            logp += math.log(num / denom)
-        return logp
-    def log_prob_bigram(tokens, target_class):
-        logp = 0.0
-        for i in range(len(tokens) - 1):
-            j = (tokens[i], tokens[i+1])
-            if target_class == 1:
-                count = positive_bigrams[j]
-                num = count + bigram_laplace
-                denom = positive_total_bigrams + bigram_laplace * Size_bigrams
-            else:
-                count = negative_bigrams[j]
-                num = count + bigram_laplace
-                denom = negative_total_bigrams + bigram_laplace * Size_bigrams
-            logp += math.log(num / denom)
-        return logp
-    #Score
-    yhats = []
-    for tokens in tqdm(dev_set, disable=silently):
-        positive_score = math.log(pos_prior)
-        positive_score += (1 - bigram_lambda) * log_prob_unigram(tokens, 1)
-        positive_score += bigram_lambda * log_prob_bigram(tokens, 1)
-        negative_score = math.log(1 - pos_prior)
-        negative_score += (1 - bigram_lambda) * log_prob_unigram(tokens, 0)
-        negative_score += bigram_lambda * log_prob_bigram(tokens, 0)
-        if positive_score > negative_score:
-            yhats.append(1)
-        else:
-            yhats.append(0)
-    return yhats
-
-
-
-
-
-
+# Pair ids of the consecutive tokens of every document (see naive_bayes.token_columns), and the document of each pair
+def bigram_ids(columns, lengths):
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    # Drop the pairs made of the last token of a document and the first token of the next one
+    starts = np.cumsum(lengths)[:-1]
+    within = np.ones(max(len(columns) - 1, 0), dtype=bool)
+    within[starts[(starts > 0) & (starts < len(columns))] - 1] = False
+    return ((columns[:-1] << 32) | columns[1:])[within], rows[:-1][within]
+
+# Table entry of every pair id: its position among the sorted seen ids, or len(seen_bigrams) if it was never seen
+def bigram_entries(seen_bigrams, pairs):
+    entries = np.full(len(pairs), len(seen_bigrams))
+    if len(seen_bigrams):
+        positions = np.minimum(np.searchsorted(seen_bigrams, pairs), len(seen_bigrams) - 1)
+        seen = seen_bigrams[positions] == pairs
+        entries[seen] = positions[seen]
+    return entries
+
+class BigramTables:
+    '''
+    Per-class unigram and bigram log-probability tables, computed once from the training counts.
+    Row c of unigram_log_probs / bigram_log_probs belongs to label c (0: negative, 1: positive).
+    '''
+    def __init__(self, vocabulary, unigram_log_probs, bigram_ids, bigram_log_probs):
+        self.vocabulary = vocabulary
+        self.unigram_log_probs = unigram_log_probs
+        self.bigram_ids = bigram_ids
+        self.bigram_log_probs = bigram_log_probs
+
+    @classmethod
+    def from_counts(cls, vocabulary, unigram_counts, bigram_ids, bigram_counts, unigram_laplace, bigram_laplace):
+        unigram_log_probs = np.array([class_log_likelihoods(class_counts, unigram_laplace, seen_columns(unigram_counts))
+                                      for class_counts in unigram_counts])
+        bigram_log_probs = np.array([class_log_likelihoods(class_counts, bigram_laplace, bigram_counts.shape[1])
+                                     for class_counts in bigram_counts])
+        return cls(vocabulary, unigram_log_probs, bigram_ids, bigram_log_probs)
+
+    def log_likelihoods(self, docs):
+        '''
+        Return (unigram, bigram): arrays of shape (2, len(docs)) holding the unigram and the bigram
+        log-likelihood of every document under each class
+        '''
+        columns, lengths = token_columns(docs, self.vocabulary, unseen=self.unigram_log_probs.shape[1] - 1)
+        rows = np.repeat(np.arange(len(docs)), lengths)
+        unigram = np.array([np.bincount(rows, weights=table[columns], minlength=len(docs))
+                            for table in self.unigram_log_probs])
+
+        pairs, pair_rows = bigram_ids(columns, lengths)
+        entries = bigram_entries(self.bigram_ids, pairs)
+        bigram = np.array([np.bincount(pair_rows, weights=table[entries], minlength=len(docs))
+                           for table in self.bigram_log_probs])
+        return unigram, bigram
+
+    def bigram_table_bytes(self):
+        return self.bigram_ids.nbytes + self.bigram_log_probs.nbytes
+
+def print_bigram_tables(tables):
+    print(f"Bigram tables: {len(tables.bigram_ids)} bigrams, {tables.bigram_table_bytes() / 2**20:.2f} MB")
 
 
+"""
+Bigram mixture model that is trained once and can then score any number of document sets.
+    It keeps the unigram and bigram counts and compiles them into BigramTables when it is next used for scoring.
+"""
+class BigramNaiveBayesModel(NaiveBayesBase):
+    def __init__(self, unigram_laplace=0.5, bigram_laplace=1.0, bigram_lambda=0.45, pos_prior=0.5, vocabulary=None):
+        self.unigram_laplace = unigram_laplace
+        self.bigram_laplace = bigram_laplace
+        self.bigram_lambda = bigram_lambda
+        self.pos_prior = pos_prior
+        self.vocabulary = Vocabulary() if vocabulary is None else vocabulary
+        self._reset()
+
+    def _reset(self):
+        # Row c: counts over the vocabulary / over the sorted seen bigram ids in the documents of label c
+        self.unigram_counts = np.zeros((2, 0))
+        self.bigram_ids = np.zeros(0, dtype=np.int64)
+        self.bigram_counts = np.zeros((2, 0))
+        self._tables = None
+
+    def fit(self, train_set, train_labels):
+        self._reset()
+        return self.partial_fit(train_set, train_labels)
+
+    def partial_fit(self, docs, labels):
+        self.vocabulary.add_docs(docs)
+        columns, lengths = token_columns(docs, self.vocabulary)
+        labels = np.array(labels, dtype=np.int64)
+        token_labels = np.repeat(labels, lengths)
+        unigram_counts = [np.bincount(columns[token_labels == label], minlength=len(self.vocabulary))
+                          for label in (0, 1)]
+        self.unigram_counts = grow_columns(self.unigram_counts, len(self.vocabulary)) + unigram_counts
+
+        # Merge the new pair ids into the sorted seen ids and move the old counts to their new positions
+        pairs, pair_rows = bigram_ids(columns, lengths)
+        merged_ids, positions = np.unique(np.concatenate([self.bigram_ids, pairs]), return_inverse=True)
+        bigram_counts = np.zeros((2, len(merged_ids)))
+        bigram_counts[:, positions[:len(self.bigram_ids)]] = self.bigram_counts
+        entries = positions[len(self.bigram_ids):]
+        pair_labels = labels[pair_rows]
+        for label in (0, 1):
+            bigram_counts[label] += np.bincount(entries[pair_labels == label], minlength=len(merged_ids))
+        self.bigram_ids = merged_ids
+        self.bigram_counts = bigram_counts
+        self._tables = None
+        return self
+
+    @property
+    def tables(self):
+        if self._tables is None:
+            self._tables = BigramTables.from_counts(self.vocabulary, self.unigram_counts, self.bigram_ids,
+                                                    self.bigram_counts, self.unigram_laplace, self.bigram_laplace)
+        return self._tables
+
+    def joint_log_likelihoods(self, docs):
+        unigram, bigram = self.tables.log_likelihoods(docs)
+        scores = self.log_priors[:, None] + (1 - self.bigram_lambda) * unigram
+        scores += self.bigram_lambda * bigram
+        return scores
+
+    def _header(self):
+        return {"unigram_laplace": self.unigram_laplace, "bigram_laplace": self.bigram_laplace,
+                "bigram_lambda": self.bigram_lambda, "pos_prior": self.pos_prior}
+
+    def _arrays(self):
+        return {
+            "unigram_counts": self.unigram_counts,
+            "bigram_counts": self.bigram_counts,
+            "unigram_log_probs": self.tables.unigram_log_probs,
+            "bigram_ids": self.tables.bigram_ids,
+            "bigram_log_probs": self.tables.bigram_log_probs,
+        }
+
+    @classmethod
+    def _from_file(cls, header, arrays, vocabulary):
+        model = cls(header["unigram_laplace"], header["bigram_laplace"], header["bigram_lambda"], header["pos_prior"],
+                    vocabulary)
+        model.unigram_counts = arrays["unigram_counts"]
+        model.bigram_ids = arrays["bigram_ids"]
+        model.bigram_counts = arrays["bigram_counts"]
+        model._tables = BigramTables(vocabulary, arrays["unigram_log_probs"], model.bigram_ids,
+                                     arrays["bigram_log_probs"])
+        return model
 
 
+"""
+Main function for training and predicting with the bigram mixture model.
+    You can modify the default values for the Laplace smoothing parameters, model-mixture lambda parameter, and the prior for the positive label.
+    Notice that we may pass in specific values for these parameters during our testing.
+"""
+def bigram_bayes(train_set, train_labels, dev_set, unigram_laplace=0.5, bigram_laplace=1.0, bigram_lambda=0.45, pos_prior=0.5, silently=False, vocabulary=None):
+    print_values_bigram(unigram_laplace,bigram_laplace,bigram_lambda,pos_prior)
+    model = BigramNaiveBayesModel(unigram_laplace, bigram_laplace, bigram_lambda, pos_prior, vocabulary).fit(train_set, train_labels)
+    if not silently:
+        print_bigram_tables(model.tables)
+    return model.predict(dev_set).tolist()
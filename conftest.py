@@ -0,0 +1,33 @@
+"""
+Shared fixtures for the model tests: a small synthetic two-class corpus.
+
+Positive documents draw more often from the first half of the words and negative ones from the
+second half, so the models have something to learn. Some documents are empty or a single token,
+and the dev set also has words that never occur in training.
+"""
+import random
+
+import pytest
+
+WORDS = [f"w{i}" for i in range(40)]
+UNSEEN_WORDS = [f"unseen{i}" for i in range(5)]
+
+
+def make_docs(rng, num_docs, words):
+    docs, labels = [], []
+    for i in range(num_docs):
+        label = i % 2
+        half = len(WORDS) // 2
+        favoured = WORDS[:half] if label else WORDS[half:]
+        length = rng.choice([0, 1, 2, rng.randint(3, 30)])
+        docs.append([rng.choice(favoured) if rng.random() < 0.7 else rng.choice(words) for _ in range(length)])
+        labels.append(label)
+    return docs, labels
+
+@pytest.fixture
+def corpus():
+    '''(train_set, train_labels, dev_set, dev_labels) of token-list documents'''
+    rng = random.Random(0)
+    train_set, train_labels = make_docs(rng, 200, WORDS)
+    dev_set, dev_labels = make_docs(rng, 80, WORDS + UNSEEN_WORDS)
+    return train_set, train_labels, dev_set, dev_labels
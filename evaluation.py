@@ -0,0 +1,139 @@
+"""
+Evaluation metrics shared by mp1.py and mp2.py.
+
+Labels are 0/1 and scores are the models' positive/negative log-odds (model.log_odds(docs)),
+so a document is predicted positive when its score is above 0; the multiclass functions take
+class indices instead. Everything is computed with numpy over the whole dev set at once:
+
+    confusion_matrix / compute_accuracies     counts of tn, fp, fn, tp in one bincount
+    multiclass_confusion_matrix               the K x K counts for K classes, also one bincount
+    roc_auc                                   rank statistic, ties counted as half
+    log_loss                                  mean negative log-likelihood of the true labels
+    precision_recall_curve                    one point per distinct score threshold
+    bootstrap_intervals                       percentile confidence intervals over resampled
+                                              dev sets, spread over a process pool
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def confusion_matrix(predicted_labels, labels):
+    '''Return (tn, fp, fn, tp)'''
+    predicted_labels = np.asarray(predicted_labels, dtype=np.int64)
+    labels = np.asarray(labels, dtype=np.int64)
+    tn, fp, fn, tp = np.bincount(2 * labels + predicted_labels, minlength=4)
+    return int(tn), int(fp), int(fn), int(tp)
+
+def compute_accuracies(predicted_labels, dev_labels):
+    assert len(predicted_labels) == len(dev_labels), "predicted and gold label lists have different lengths"
+    tn, fp, fn, tp = confusion_matrix(predicted_labels, dev_labels)
+    accuracy = (tp + tn) / len(dev_labels)
+    return accuracy, fp, fn, tp, tn
+
+def multiclass_confusion_matrix(predicted_labels, labels, num_classes):
+    '''Entry [i, j]: number of documents of class i predicted as class j'''
+    predicted_labels = np.asarray(predicted_labels, dtype=np.int64)
+    labels = np.asarray(labels, dtype=np.int64)
+    return np.bincount(num_classes * labels + predicted_labels, minlength=num_classes ** 2).reshape(num_classes, num_classes)
+
+def print_multiclass_stats(predicted_labels, labels, classes):
+    matrix = multiclass_confusion_matrix(predicted_labels, labels, len(classes))
+    correct = np.diag(matrix)
+    with np.errstate(invalid="ignore"):
+        precision = correct / matrix.sum(axis=0)
+        recall = correct / matrix.sum(axis=1)
+    print(f"Accuracy: {correct.sum() / matrix.sum()}")
+    width = max(len(name) for name in classes)
+    print(f"{'class':>{width}} {'precision':>10} {'recall':>10} {'support':>10}")
+    for name, class_precision, class_recall, support in zip(classes, precision, recall, matrix.sum(axis=1)):
+        print(f"{name:>{width}} {class_precision:>10.4f} {class_recall:>10.4f} {support:>10}")
+    print(f"total number of samples {matrix.sum()}")
+
+def accuracy(labels, scores):
+    return float(np.mean((np.asarray(scores) > 0) == (np.asarray(labels) == 1)))
+
+def roc_auc(labels, scores):
+    '''Probability that a random positive document scores above a random negative one'''
+    labels = np.asarray(labels) == 1
+    num_positive = int(labels.sum())
+    num_negative = len(labels) - num_positive
+    if num_positive == 0 or num_negative == 0:
+        return float("nan")
+    # Average rank of each distinct score (1-based), so tied documents share their rank
+    distinct, inverse, counts = np.unique(scores, return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts)
+    ranks = (ends - (counts - 1) / 2)[inverse]
+    return float((ranks[labels].sum() - num_positive * (num_positive + 1) / 2) / (num_positive * num_negative))
+
+def log_loss(labels, scores):
+    '''Mean of -log P(true label | doc), from log-odds scores'''
+    labels = np.asarray(labels) == 1
+    scores = np.asarray(scores, dtype=np.float64)
+    return float(np.mean(np.logaddexp(0, np.where(labels, -scores, scores))))
+
+def precision_recall_curve(labels, scores):
+    '''
+    Return (precision, recall, thresholds) for predicting positive when score >= threshold,
+    one point per distinct score from the highest down
+    '''
+    labels = np.asarray(labels) == 1
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(-scores, kind="stable")
+    scores = scores[order]
+    true_positives = np.cumsum(labels[order])
+    # The last document of each run of equal scores
+    last = np.flatnonzero(np.append(scores[1:] != scores[:-1], True))
+    predicted_positives = last + 1
+    true_positives = true_positives[last]
+    precision = true_positives / predicted_positives
+    recall = true_positives / max(int(labels.sum()), 1)
+    return precision, recall, scores[last]
+
+def average_precision(labels, scores):
+    precision, recall, _ = precision_recall_curve(labels, scores)
+    return float(np.sum(np.diff(np.append(0.0, recall)) * precision))
+
+SCORE_METRICS = {
+    "accuracy": accuracy,
+    "roc_auc": roc_auc,
+    "log_loss": log_loss,
+    "average_precision": average_precision,
+}
+
+# The metrics on one resample of the dev set per seed
+def _bootstrap_chunk(labels, scores, metric_names, seeds):
+    values = np.empty((len(seeds), len(metric_names)))
+    for i, seed in enumerate(seeds):
+        sample = np.random.default_rng(seed).integers(0, len(labels), len(labels))
+        for j, name in enumerate(metric_names):
+            values[i, j] = SCORE_METRICS[name](labels[sample], scores[sample])
+    return values
+
+def bootstrap_intervals(labels, scores, metric_names=tuple(SCORE_METRICS), num_resamples=1000, confidence=0.95,
+                        workers=1, seed=0):
+    '''
+    Return {metric name: (value, low, high)}: each metric on the dev set and its percentile
+    bootstrap confidence interval. Every resample has its own seed spawned from seed, and the
+    resamples are split over workers processes, so the result depends neither on the timing
+    nor on the number of the workers.
+    '''
+    labels = np.asarray(labels)
+    scores = np.asarray(scores, dtype=np.float64)
+    seeds = np.random.SeedSequence(seed).spawn(num_resamples)
+    bounds = np.linspace(0, num_resamples, max(workers, 1) + 1).astype(int)
+    args = [(labels, scores, metric_names, seeds[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            values = list(executor.map(_bootstrap_chunk, *zip(*args)))
+    else:
+        values = [_bootstrap_chunk(*chunk_args) for chunk_args in args]
+    values = np.concatenate(values)
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.nanpercentile(values, [tail, 100 - tail], axis=0)
+    return {name: (SCORE_METRICS[name](labels, scores), low[j], high[j]) for j, name in enumerate(metric_names)}
+
+def print_score_metrics(labels, scores, num_resamples=1000, workers=1):
+    intervals = bootstrap_intervals(labels, scores, num_resamples=num_resamples, workers=workers)
+    for name, (value, low, high) in intervals.items():
+        print(f"{name}: {value:.4f} (95% CI {low:.4f} - {high:.4f})")
@@ -0,0 +1,203 @@
+"""
+Priority queues for the A* frontier.
+
+All frontiers share the same small API, so astar_search can use any of them:
+    push(state): add state, or replace the entry of an equal state (which A* only does with a
+                 better path to it)
+    pop():       remove and return the smallest state (by SearchState.__lt__, i.e. f = g + h)
+    peek():      return the smallest state without removing it
+    len(frontier), state in frontier
+
+and count their work in pushes, pops, stale_pops (outdated entries thrown away on pop) and
+decrease_keys (pushes that replaced the entry of a queued state).
+"""
+import heapq
+from collections import OrderedDict
+
+
+class HeapqFrontier:
+    '''
+    A plain heapq. Replacing a state pushes a second entry; the outdated one stays in the
+    heap until it reaches the top and is then skipped (a stale pop).
+    '''
+    def __init__(self):
+        self.heap = []
+        # state -> the entry that is currently valid for it
+        self.entries = {}
+        self.pushes = 0
+        self.pops = 0
+        self.stale_pops = 0
+        self.decrease_keys = 0
+
+    def push(self, state):
+        if state in self.entries:
+            self.decrease_keys += 1
+        heapq.heappush(self.heap, state)
+        self.entries[state] = state
+        self.pushes += 1
+
+    def _drop_stale(self):
+        while self.heap and self.entries.get(self.heap[0]) is not self.heap[0]:
+            heapq.heappop(self.heap)
+            self.stale_pops += 1
+
+    def pop(self):
+        self._drop_stale()
+        state = heapq.heappop(self.heap)
+        del self.entries[state]
+        self.pops += 1
+        return state
+
+    def peek(self):
+        self._drop_stale()
+        return self.heap[0]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, state):
+        return state in self.entries
+
+
+class IndexedHeapFrontier:
+    '''
+    A binary heap that knows where each state sits, so replacing a state updates its entry in
+    place (decrease-key) and every entry in the heap is live.
+    '''
+    def __init__(self):
+        self.heap = []
+        # state -> index of its entry in self.heap
+        self.position = {}
+        self.pushes = 0
+        self.pops = 0
+        self.stale_pops = 0
+        self.decrease_keys = 0
+
+    def push(self, state):
+        self.pushes += 1
+        i = self.position.get(state)
+        if i is None:
+            self.heap.append(state)
+            self.position[state] = len(self.heap) - 1
+            self._sift_up(len(self.heap) - 1)
+        else:
+            self.heap[i] = state
+            self.decrease_keys += 1
+            self._sift_up(i)
+            self._sift_down(self.position[state])
+
+    def pop(self):
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        del self.position[top]
+        if heap:
+            heap[0] = last
+            self.position[last] = 0
+            self._sift_down(0)
+        self.pops += 1
+        return top
+
+    def peek(self):
+        return self.heap[0]
+
+    def _sift_up(self, i):
+        heap, position = self.heap, self.position
+        state = heap[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not state < heap[parent]:
+                break
+            heap[i] = heap[parent]
+            position[heap[i]] = i
+            i = parent
+        heap[i] = state
+        position[state] = i
+
+    def _sift_down(self, i):
+        heap, position = self.heap, self.position
+        n = len(heap)
+        state = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < state:
+                break
+            heap[i] = heap[child]
+            position[heap[i]] = i
+            i = child
+        heap[i] = state
+        position[state] = i
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, state):
+        return state in self.position
+
+
+class BucketFrontier:
+    '''
+    A bucket queue: one FIFO bucket per f value, plus a small heap of the f values that have a
+    bucket. With unit move costs f only takes a handful of distinct values (integers for
+    EightPuzzle, multiples of 1/5 for LightsOut), so most pushes and pops never touch the heap.
+    Within a bucket states come out in insertion order, which matches the creation_order
+    tie-break of SearchState.__lt__.
+    '''
+    def __init__(self):
+        # f -> OrderedDict used as an ordered set of states
+        self.buckets = {}
+        self.keys = []
+        # state -> f of the bucket holding it
+        self.where = {}
+        self.pushes = 0
+        self.pops = 0
+        self.stale_pops = 0
+        self.decrease_keys = 0
+
+    def push(self, state):
+        self.pushes += 1
+        old_f = self.where.get(state)
+        if old_f is not None:
+            del self.buckets[old_f][state]
+            self.decrease_keys += 1
+        f = state.path_cost + state.heuristic_value
+        bucket = self.buckets.get(f)
+        if bucket is None:
+            bucket = self.buckets[f] = OrderedDict()
+            heapq.heappush(self.keys, f)
+        bucket[state] = state
+        self.where[state] = f
+
+    def _first_bucket(self):
+        while not self.buckets[self.keys[0]]:
+            del self.buckets[heapq.heappop(self.keys)]
+        return self.buckets[self.keys[0]]
+
+    def pop(self):
+        _, state = self._first_bucket().popitem(last=False)
+        del self.where[state]
+        self.pops += 1
+        return state
+
+    def peek(self):
+        return next(iter(self._first_bucket().values()))
+
+    def __len__(self):
+        return len(self.where)
+
+    def __contains__(self, state):
+        return state in self.where
+
+
+FRONTIERS = {
+    "heapq": HeapqFrontier,
+    "indexed": IndexedHeapFrontier,
+    "bucket": BucketFrontier,
+}
+
+def make_frontier(name="heapq"):
+    return FRONTIERS[name]()
@@ -0,0 +1,199 @@
+"""
+Feature-hashing n-gram Naive Bayes.
+
+The exact models keep a count for every distinct word and bigram they have seen, so their size
+grows with the corpus, and with higher orders it grows much faster. HashedNaiveBayesModel maps
+the n-grams of each order into a fixed table of 2**bits buckets instead: a word is hashed once
+(a stable 64-bit hash of its text), an n-gram hash combines the hashes of its words, and the top
+bits of the mixed hash pick the bucket. Colliding n-grams share a bucket and its counts.
+
+Each order n has one (2, 2**bits) count table and is scored like the bigram model scores its
+orders: the document's log-likelihood is the lambda-weighted sum of its per-order log-likelihoods,
+each with its own Laplace value. Without collisions it matches the exact-count model of the same
+order, ngram_naive_bayes.NgramNaiveBayesModel (for two orders, BigramNaiveBayesModel).
+
+The tables are allocated at their full size up front, so the model takes table_bytes() from the
+first document on, however large the corpus grows. Words are hashed from their bytes for every
+batch, all tokens at once with numpy, so the model keeps nothing per word: a vocabulary is only
+needed to read documents interned as id arrays, and it is neither grown nor saved.
+"""
+from itertools import chain
+
+import numpy as np
+
+from naive_bayes import NaiveBayesBase, class_log_likelihoods, seen_columns
+from model_io import encode_words
+
+# Odd 64-bit constants (from splitmix64) to combine the word hashes of an n-gram and to mix the result
+COMBINE = np.uint64(0x9E3779B97F4A7C15)
+MIX = np.uint64(0xBF58476D1CE4E5B9)
+FINALIZE = np.uint64(0x94D049BB133111EB)
+# 64-bit FNV-1a offset basis and prime
+FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+FNV_PRIME = np.uint64(0x100000001B3)
+# Recorded in saved models, whose buckets are only valid for the word hash they were counted with
+WORD_HASH = "fnv1a64-splitmix"
+
+
+# 64-bit FNV-1a hash of the UTF-8 bytes of every word, passed through the splitmix64 finalizer: FNV hashes
+# of words that differ in one byte differ in a regular way, which the n-gram combination would carry into
+# bucket collisions. Stable across processes and runs, unlike hash(), so saved tables stay valid.
+# The words are sorted by length, so step j updates one slice of the hashes: those of the words with more
+# than j bytes; the work is one numpy operation per byte of the longest word.
+def word_hashes(words):
+    text = "".join(words)
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    if len(data) == len(text):
+        # Only ASCII: one byte per character, so the byte lengths are the string lengths
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        ends = np.cumsum(lengths)
+    else:
+        data, ends = encode_words(words)
+        lengths = np.diff(ends, prepend=0)
+    # Lengths as int16 when they fit, which numpy sorts with a radix sort
+    keys = -lengths.astype(np.int16) if lengths.max(initial=0) < 2 ** 15 else -lengths
+    order = np.argsort(keys, kind="stable")
+    starts = (ends - lengths)[order]
+    # longer[j]: number of words with more than j bytes
+    longer = np.searchsorted(-lengths[order], -np.arange(int(lengths.max(initial=0))), side="left")
+    hashes = np.full(len(lengths), FNV_OFFSET, dtype=np.uint64)
+    for j, count in enumerate(longer.tolist()):
+        hashes[:count] ^= data[starts[:count] + j]
+        hashes[:count] *= FNV_PRIME
+    hashes ^= hashes >> np.uint64(30)
+    hashes *= MIX
+    hashes ^= hashes >> np.uint64(27)
+    hashes *= FINALIZE
+    hashes ^= hashes >> np.uint64(31)
+    result = np.empty_like(hashes)
+    result[order] = hashes
+    return result
+
+# 64-bit hash of every n-gram of the given order within the documents, and the document of each.
+# hashes holds the word hash of every token of the documents, lengths the length of each document.
+def ngram_hashes(hashes, lengths, order):
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    count = max(len(hashes) - order + 1, 0)
+    combined = hashes[:count].copy()
+    for k in range(1, order):
+        combined = combined * COMBINE + hashes[k:k + count]
+    # Keep the n-grams that start at least order - 1 tokens before the end of their document
+    ends = np.repeat(np.cumsum(lengths), lengths)
+    within = (np.arange(len(hashes)) + order <= ends)[:count]
+    return combined[within], rows[:count][within]
+
+# Bucket of every hash in a table of 2**bits buckets
+def hash_buckets(hashes, bits):
+    mixed = (hashes ^ (hashes >> np.uint64(31))) * MIX
+    return (mixed >> np.uint64(64 - bits)).astype(np.int64)
+
+
+"""
+Hashed n-gram mixture model. The order of the model is len(lambdas); laplaces holds one Laplace value per order.
+    min_count prunes the rare n-grams of order 2 and up: a bucket counted fewer than min_count times over both
+    classes is scored as unseen, so one-off n-grams (and the buckets only they hit) do not swing the scores.
+    Pruning only happens when the log-probability tables are built, so partial_fit() keeps counting them.
+"""
+class HashedNaiveBayesModel(NaiveBayesBase):
+    saves_vocabulary = False
+
+    def __init__(self, bits=18, laplaces=(0.5, 1.0), lambdas=(0.55, 0.45), pos_prior=0.5, min_count=1, vocabulary=None):
+        if len(laplaces) != len(lambdas):
+            raise ValueError("laplaces and lambdas need one value per n-gram order")
+        if not 1 <= bits <= 32:
+            raise ValueError("bits must be between 1 and 32")
+        self.bits = bits
+        self.laplaces = tuple(laplaces)
+        self.lambdas = tuple(lambdas)
+        self.pos_prior = pos_prior
+        self.min_count = min_count
+        # Only used to read documents interned as id arrays
+        self.vocabulary = vocabulary
+        self._reset()
+
+    @property
+    def order(self):
+        return len(self.lambdas)
+
+    def _reset(self):
+        # counts[n - 1, c]: how often the n-grams of each bucket occur in the training documents of label c.
+        # int64, as a bucket shared by many frequent n-grams passes 2**31 on a large stream of documents
+        self.counts = np.zeros((self.order, 2, 2 ** self.bits), dtype=np.int64)
+        self._log_likelihoods = None
+
+    def fit(self, train_set, train_labels):
+        self._reset()
+        return self.partial_fit(train_set, train_labels)
+
+    def partial_fit(self, docs, labels):
+        labels = np.array(labels, dtype=np.int64)
+        if not self.counts.flags.writeable:
+            # Loaded from a model file: count on in a copy of the mapped tables
+            self.counts = self.counts.copy()
+        for n, (buckets, rows) in enumerate(self._ngram_buckets(docs)):
+            ngram_labels = labels[rows]
+            for label in (0, 1):
+                self.counts[n, label] += np.bincount(buckets[ngram_labels == label], minlength=2 ** self.bits)
+        self._log_likelihoods = None
+        return self
+
+    # (buckets, rows) of the n-grams of each order of docs
+    def _ngram_buckets(self, docs):
+        if self.vocabulary is None and not all(isinstance(doc, list) for doc in docs):
+            raise ValueError("documents interned as id arrays need the Vocabulary they were interned with")
+        words = self.vocabulary.words if self.vocabulary is not None else None
+        lengths = np.fromiter(map(len, docs), dtype=np.int64, count=len(docs))
+        if words is not None and not any(isinstance(doc, list) for doc in docs):
+            # Interned documents: hash each distinct word once
+            ids = np.concatenate([np.zeros(0, dtype=np.uint32)] + [np.frombuffer(doc, dtype=np.uint32) for doc in docs])
+            distinct, inverse = np.unique(ids, return_inverse=True)
+            hashes = word_hashes([words[i] for i in distinct.tolist()])[inverse]
+        else:
+            hashes = word_hashes(list(chain.from_iterable(doc if isinstance(doc, list) else map(words.__getitem__, doc)
+                                                          for doc in docs)))
+        for order in range(1, self.order + 1):
+            ngrams, rows = ngram_hashes(hashes, lengths, order)
+            yield hash_buckets(ngrams, self.bits), rows
+
+    # log_likelihoods[n - 1, c]: log P(bucket | label c) for the n-grams of order n, worked out from the current counts
+    @property
+    def log_likelihoods(self):
+        if self._log_likelihoods is None:
+            tables = []
+            for n, (counts, laplace) in enumerate(zip(self.counts, self.laplaces)):
+                counts = counts.astype(np.float64)
+                if n > 0 and self.min_count > 1:
+                    counts[:, counts.sum(axis=0) < self.min_count] = 0
+                vocabulary_size = seen_columns(counts)
+                tables.append([class_log_likelihoods(class_counts, laplace, vocabulary_size)[:-1]
+                               for class_counts in counts])
+            self._log_likelihoods = np.array(tables)
+        return self._log_likelihoods
+
+    def joint_log_likelihoods(self, docs):
+        scores = np.repeat(self.log_priors[:, None], len(docs), axis=1)
+        for tables, weight, (buckets, rows) in zip(self.log_likelihoods, self.lambdas, self._ngram_buckets(docs)):
+            for label, table in enumerate(tables):
+                scores[label] += weight * np.bincount(rows, weights=table[buckets], minlength=len(docs))
+        return scores
+
+    def table_bytes(self):
+        '''Memory of the count and log-probability tables, fixed by bits and the order'''
+        return self.counts.nbytes + self.counts.size * np.dtype(np.float64).itemsize
+
+    def _header(self):
+        return {"bits": self.bits, "laplaces": list(self.laplaces), "lambdas": list(self.lambdas),
+                "pos_prior": self.pos_prior, "min_count": self.min_count, "word_hash": WORD_HASH}
+
+    def _arrays(self):
+        return {"counts": self.counts, "log_likelihoods": self.log_likelihoods}
+
+    @classmethod
+    def _from_file(cls, header, arrays, vocabulary):
+        if header.get("word_hash") != WORD_HASH:
+            raise ValueError(f"the model was counted with the word hash {header.get('word_hash')}, not {WORD_HASH}")
+        model = cls(header["bits"], header["laplaces"], header["lambdas"], header["pos_prior"], header["min_count"],
+                    vocabulary)
+        model.counts = arrays["counts"]
+        model._log_likelihoods = arrays["log_likelihoods"]
+        return model
@@ -0,0 +1,79 @@
+"""
+Accuracy and memory of the hashed n-gram model against the exact-count n-gram model.
+
+Loads the corpus once, trains ngram_naive_bayes.NgramNaiveBayesModel and then one
+hashed_naive_bayes.HashedNaiveBayesModel per --bits value (and per --min_count value), all with
+the same Laplace / lambda / prior settings, and prints for each its dev accuracy, how often its
+predictions agree with the exact model's, and the memory of its tables. With --order 3 both also
+use trigrams, with --trigram_lambda of the weight taken from the unigrams.
+
+Examples:
+    python hashing_report.py --bits 14 16 18 20
+    python hashing_report.py --bits 18 20 --min_count 1 2 3 --order 3
+"""
+import argparse
+import itertools
+
+import numpy as np
+
+import reader
+from vocabulary import Vocabulary
+from ngram_naive_bayes import NgramNaiveBayesModel
+from hashed_naive_bayes import HashedNaiveBayesModel
+
+
+def main(args):
+    vocabulary = Vocabulary()
+    train_set, train_labels, dev_set, dev_labels = reader.load_dataset(args.training_dir, args.development_dir,
+                                                                       args.stemming, args.lowercase, silently=True,
+                                                                       workers=args.workers, vocabulary=vocabulary)
+    dev_labels = np.array(dev_labels)
+    laplaces = [args.laplace, args.bigram_laplace]
+    lambdas = [1 - args.bigram_lambda, args.bigram_lambda]
+    if args.order == 3:
+        laplaces.append(args.bigram_laplace)
+        lambdas = [1 - args.bigram_lambda - args.trigram_lambda, args.bigram_lambda, args.trigram_lambda]
+    exact = NgramNaiveBayesModel(laplaces, lambdas, args.pos_prior, vocabulary).fit(train_set, train_labels)
+    exact_predictions = exact.predict(dev_set)
+
+    print(f"{'model':>10} {'min_count':>10} {'accuracy':>10} {'agreement':>10} {'MB':>10}")
+    print(f"{'exact':>10} {'':>10} {(exact_predictions == dev_labels).mean():>10.4f} {1.0:>10.4f} "
+          f"{exact.table_bytes() / 2**20:>10.2f}")
+    for bits, min_count in itertools.product(args.bits, args.min_count):
+        model = HashedNaiveBayesModel(bits, laplaces, lambdas, args.pos_prior, min_count, vocabulary)
+        predictions = model.fit(train_set, train_labels).predict(dev_set)
+        print(f"{f'{bits} bits':>10} {min_count:>10} {(predictions == dev_labels).mean():>10.4f} "
+              f"{(predictions == exact_predictions).mean():>10.4f} {model.table_bytes() / 2**20:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='CS440 MP2 hashed vs. exact n-gram Naive Bayes')
+    parser.add_argument('--training', dest='training_dir', type=str, default = 'data/movie_reviews/train',
+                        help='the directory of the training data')
+    parser.add_argument('--development', dest='development_dir', type=str, default = 'data/movie_reviews/dev',
+                        help='the directory of the development data')
+    parser.add_argument('--stemming', dest="stemming", action='store_true',
+                        help='Use porter stemmer')
+    parser.add_argument('--lowercase', dest="lowercase", action='store_true',
+                        help='Convert all word to lower case')
+    parser.add_argument('--workers', dest="workers", type=int, default=1,
+                        help='Number of processes to tokenize the data with')
+    parser.add_argument('--bits', dest="bits", type=int, nargs="+", default=[14, 16, 18, 20],
+                        help='Hash table sizes to compare, as powers of two')
+    parser.add_argument('--min_count', dest="min_count", type=int, nargs="+", default=[1],
+                        help='Prune n-grams seen fewer times than this (1 keeps all)')
+    parser.add_argument('--order', dest="order", type=int, default=2, choices=[2, 3],
+                        help='Highest n-gram order of the models')
+    parser.add_argument('--laplace', dest="laplace", type=float, default=0.5,
+                        help='Unigram Laplace smoothing parameter')
+    parser.add_argument('--bigram_laplace', dest="bigram_laplace", type=float, default=1.0,
+                        help='Laplace smoothing parameter for bigrams (and trigrams)')
+    parser.add_argument('--bigram_lambda', dest="bigram_lambda", type=float, default=0.45,
+                        help='Weight on bigrams vs. unigrams')
+    parser.add_argument('--trigram_lambda', dest="trigram_lambda", type=float, default=0.15,
+                        help='Weight on trigrams with --order 3')
+    parser.add_argument('--pos_prior', dest="pos_prior", type=float, default=0.5,
+                        help='Positive prior')
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,106 @@
+"""
+Algebraic solver for LightsOut.
+
+Toggles commute and toggling a cell twice undoes it, so a solution is just a set of cells,
+i.e. a 0/1 vector x over GF(2) with A x = b, where column j of the toggle matrix A is the
+toggle mask of cell j and b is the board XOR the goal. We solve it with Gaussian elimination
+on bit-packed rows and then search the null space of A for the solution with the fewest
+toggles, which is an optimal solution.
+"""
+from state import get_toggle_masks
+
+
+def toggle_matrix_rows(rows, cols, cross_pattern=False):
+    '''
+    Return the rows of the toggle matrix as integers: bit j of row i is set when toggling
+    cell j flips cell i (cells numbered r*cols + c, as in the packed board).
+    '''
+    masks = get_toggle_masks(rows, cols, cross_pattern)
+    matrix = [0] * (rows * cols)
+    for j, mask in enumerate(masks):
+        while mask:
+            low = mask & -mask
+            matrix[low.bit_length() - 1] |= 1 << j
+            mask ^= low
+    return matrix
+
+def solve_toggles(board, goal, rows, cols, cross_pattern=False):
+    '''
+    board, goal: packed boards (see state.pack_grid)
+
+    Return: the packed set of cells to toggle (bit j = toggle cell j) with the fewest toggles,
+            or None if goal cannot be reached from board
+    '''
+    n = rows * cols
+    target = board ^ goal
+    # Augmented rows: coefficients in bits 0..n-1, right-hand side in bit n
+    equations = [row | (((target >> i) & 1) << n) for i, row in enumerate(toggle_matrix_rows(rows, cols, cross_pattern))]
+
+    # Gauss-Jordan elimination, recording the pivot column of each reduced row
+    pivots = []
+    rank = 0
+    for col in range(n):
+        bit = 1 << col
+        pivot = next((r for r in range(rank, n) if equations[r] & bit), None)
+        if pivot is None:
+            continue
+        equations[rank], equations[pivot] = equations[pivot], equations[rank]
+        for r in range(n):
+            if r != rank and equations[r] & bit:
+                equations[r] ^= equations[rank]
+        pivots.append(col)
+        rank += 1
+    # A remaining row 0 = 1 means the board is unsolvable
+    if any(equations[r] >> n for r in range(rank, n)):
+        return None
+
+    # Particular solution with every free cell untoggled
+    solution = 0
+    for r, col in enumerate(pivots):
+        if equations[r] >> n:
+            solution |= 1 << col
+    # One null-space vector per free cell: toggle it plus whichever pivot cells that forces
+    pivot_set = set(pivots)
+    null_basis = []
+    for free in range(n):
+        if free in pivot_set:
+            continue
+        vector = 1 << free
+        for r, col in enumerate(pivots):
+            if (equations[r] >> free) & 1:
+                vector |= 1 << col
+        null_basis.append(vector)
+
+    # All solutions are the particular one XOR a combination of the basis; visit them in Gray
+    # code order so each step XORs in a single basis vector. The null space of the toggle matrix
+    # has small dimension for the usual board sizes (e.g. 2 for 5x5), so this is cheap.
+    best = current = solution
+    best_count = best.bit_count()
+    for i in range(1, 1 << len(null_basis)):
+        current ^= null_basis[(i & -i).bit_length() - 1]
+        count = current.bit_count()
+        if count < best_count:
+            best, best_count = current, count
+    return best
+
+def solve_lights_out(starting_state):
+    '''
+    Solve a LightsOutState algebraically instead of searching.
+
+    Input:
+        starting_state: a LightsOutState
+
+    Return:
+        A path consisting of a list of LightsOutState states, in the same format as astar_search
+        (toggles are applied in row-major order), or an empty list if there is no solution
+    '''
+    rows, cols = starting_state.shape
+    toggles = solve_toggles(starting_state.current_state, starting_state.target_state, rows, cols,
+                            starting_state.cross_pattern)
+    if toggles is None:
+        return []
+    path = [starting_state]
+    for i in range(rows * cols):
+        if (toggles >> i) & 1:
+            path.append(path[-1].make_successor(i // cols, i % cols))
+    return path
@@ -0,0 +1,106 @@
+"""
+Load generator for serve.py.
+
+Opens --concurrency keep-alive connections to the server and sends POST /score requests on
+each of them back to back, for --requests requests in total or --duration seconds. The
+documents are the files of a data directory (e.g. the dev set), cycled. Prints the client side
+p50/p99 latency and requests per second, and the server's own counters from GET /stats.
+
+Examples:
+    python loadgen.py --data data/movie_reviews/dev --concurrency 32 --duration 10
+    python loadgen.py --port 8440 --requests 20000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+
+def load_documents(data_dir, limit=None):
+    paths = []
+    for root, _, files in os.walk(data_dir):
+        paths.extend(os.path.join(root, f) for f in sorted(files))
+    documents = []
+    for path in sorted(paths)[:limit]:
+        with open(path, 'rb') as f:
+            documents.append(f.read())
+    if not documents:
+        raise ValueError(f"no documents in {data_dir}")
+    return documents
+
+async def request(reader, writer, method, target, body=b""):
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = await reader.readline()
+    if not status:
+        raise ConnectionError("server closed the connection")
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    content = await reader.readexactly(length)
+    if status.split()[1] != b"200":
+        raise RuntimeError(f"{method} {target}: {status.decode().strip()} {content.decode()}")
+    return json.loads(content)
+
+async def client(host, port, documents, deadline, remaining, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for document in documents:
+            if time.perf_counter() >= deadline or remaining[0] <= 0:
+                break
+            remaining[0] -= 1
+            start = time.perf_counter()
+            await request(reader, writer, "POST", "/score", document)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+async def main(args):
+    documents = load_documents(args.data, args.limit)
+    deadline = time.perf_counter() + args.duration if args.duration else float("inf")
+    remaining = [args.requests if args.requests else float("inf")]
+    if remaining[0] == float("inf") and deadline == float("inf"):
+        raise ValueError("give --requests or --duration")
+    latencies = []
+    start = time.perf_counter()
+    # Each client starts at a different document, so concurrent batches do not all hold the same text
+    await asyncio.gather(*(client(args.host, args.port, itertools.islice(itertools.cycle(documents), i, None),
+                                  deadline, remaining, latencies)
+                           for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"requests {len(latencies)}  concurrency {args.concurrency}  elapsed {elapsed:.2f} s")
+    print(f"client latency p50 {p50:.2f} ms  p99 {p99:.2f} ms  throughput {len(latencies) / elapsed:.0f} req/s")
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    print(f"server stats {json.dumps(await request(reader, writer, 'GET', '/stats'))}")
+    writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load generator for the Naive Bayes scoring server')
+    parser.add_argument('--host', dest="host", type=str, default="127.0.0.1",
+                        help='Address of the server')
+    parser.add_argument('--port', dest="port", type=int, default=8440,
+                        help='Port of the server')
+    parser.add_argument('--data', dest="data", type=str, default='data/movie_reviews/dev',
+                        help='Directory whose files (searched recursively) are sent as documents')
+    parser.add_argument('--limit', dest="limit", type=int, default=None,
+                        help='Only use the first LIMIT documents')
+    parser.add_argument('--concurrency', dest="concurrency", type=int, default=16,
+                        help='Number of connections sending requests at the same time')
+    parser.add_argument('--requests', dest="requests", type=int, default=None,
+                        help='Total number of requests to send')
+    parser.add_argument('--duration', dest="duration", type=float, default=10.0,
+                        help='Seconds to send requests for (0 for no limit)')
+
+    args = parser.parse_args()
+    asyncio.run(main(args))
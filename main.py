@@ -1,59 +1,226 @@
 from state import LightsOutState, EightPuzzleState
-from search import astar_search
-from utils import read_eight_puzzle, read_lights_out, get_goal_lights_out
+from search import astar_search, ida_star_search, rbfs_search, bidirectional_search
+from utils import read_eight_puzzle, read_lights_out, get_goal_lights_out, get_goal_eight_puzzle
+from pattern_database import get_pattern_database_heuristic
+from frontier import FRONTIERS, make_frontier
+from lights_out_solver import solve_lights_out
+from solution_cache import SolutionCache
 
 import time
 import argparse
+import cProfile
+import io
+import json
+import pstats
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+SEARCH_ALGORITHMS = {
+    "astar": astar_search,
+    "idastar": ida_star_search,
+    "rbfs": rbfs_search,
+    "bidirectional": bidirectional_search,
+    # LightsOut only: solve the toggle equations over GF(2) instead of searching
+    "gf2": solve_lights_out,
+}
+
+# One solution cache per process, shared by all the problems it solves (None unless --cache_mb is given)
+_solution_cache = None
+
+def get_solution_cache(args):
+    global _solution_cache
+    if _solution_cache is None and args.cache_mb:
+        _solution_cache = SolutionCache(int(args.cache_mb * 1024 * 1024), args.cache_file)
+    return _solution_cache
+
+# Run the chosen search; also returns the frontier for A* (None otherwise) so its counters can be reported,
+# and the SearchStats of A* when --stats is given (None otherwise)
+def solve(starting_state, args):
+    if args.algorithm == "astar":
+        frontier = make_frontier(args.frontier)
+        cache = get_solution_cache(args)
+        if args.stats:
+            path, stats = astar_search(starting_state, frontier, return_stats=True, cache=cache)
+            return path, frontier, stats
+        return astar_search(starting_state, frontier, cache=cache), frontier, None
+    if args.algorithm == "bidirectional":
+        return bidirectional_search(starting_state, frontier=args.frontier), None, None
+    return SEARCH_ALGORITHMS[args.algorithm](starting_state), None, None
+
+# solve() under the profiler chosen with --profile; also returns the report lines to print
+def profiled_solve(starting_state, args):
+    if args.profile == "cprofile":
+        profiler = cProfile.Profile()
+        result = profiler.runcall(solve, starting_state, args)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(args.profile_lines)
+        return result, [report.getvalue()]
+    if args.profile == "tracemalloc":
+        tracemalloc.start()
+        try:
+            result = solve(starting_state, args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return result, [f"\tPeak traced memory: {peak / 1024:.1f} KiB"]
+    return solve(starting_state, args), []
+
+# One JSON object per problem for --stats json, so runs can be collected and compared
+def stats_record(args, start_grid, path, elapsed, stats):
+    record = {
+        "problem_type": args.problem_type,
+        "start": start_grid,
+        "algorithm": args.algorithm,
+        "frontier": args.frontier,
+        "heuristic": None if args.do_not_use_heuristic else
+                     args.heuristic if args.problem_type == "EightPuzzle" else "lights_on",
+        "solution_length": len(path) - 1,
+        "time": elapsed,
+    }
+    if stats is not None:
+        record.update(stats.to_dict())
+    return json.dumps(record)
+
+def frontier_counters(frontier):
+    return (f"\tFrontier: {frontier.pushes} pushes, {frontier.pops} pops, "
+            f"{frontier.stale_pops} stale pops, {frontier.decrease_keys} decrease-keys")
+
+# Each solve_*_instance function solves one problem and returns the lines to print for it,
+# the solve time and the number of expanded nodes (None if the algorithm does not count them).
+# They only take picklable arguments, so they can also run in a worker process.
+def solve_lights_out_instance(problem, args):
+    grid, cross_pattern, ground_truth_len = problem
+    lines = ["-"*40,
+             f"Doing LightsOut {'(cross pattern)' if cross_pattern else '(original)'} for grid:",
+             "\n".join([" ".join([str(c) for c in row]) for row in grid])]
+    goal = get_goal_lights_out(grid)
+    start = time.time()
+    starting_state = LightsOutState(grid, goal=goal, 
+                        path_cost=0, enable_heuristic=not args.do_not_use_heuristic,
+                        cross_pattern=cross_pattern, symmetry=args.symmetry)
+    (path, frontier, stats), profile_report = profiled_solve(starting_state, args)
+    end = time.time()
+    if args.print_solution:
+        lines.append("Solution:")
+        for i, state in enumerate(path):
+            lines.append(f"  (State {i})")
+            lines.append(state.__repr__())
+    lines.append(f"\tNumber of toggles (ground truth)  :  {ground_truth_len}")
+    lines.append(f"\tNumber of toggles in your solution:  {len(path) - 1}")
+    lines.append(f"\tTime: {end-start:.3f}")
+    if frontier is not None:
+        lines.append(frontier_counters(frontier))
+    lines.extend(profile_report)
+    if args.stats == "json":
+        lines.append(stats_record(args, grid, path, end - start, stats))
+    return lines, end - start, frontier.pops if frontier is not None else None
+
+def solve_eight_puzzle_instance(puzzle, args):
+    goal_puzzle = get_goal_eight_puzzle(args.puzzle_size)
+    heuristic = args.heuristic
+    if heuristic == "pdb" and not args.do_not_use_heuristic:
+        # Built on the first run and memory-mapped from data/pdb afterwards (once per process)
+        heuristic = get_pattern_database_heuristic(goal_puzzle, args.puzzle_size)
+    lines = ["-"*40]
+    start = time.time()
+    start_puzzle = puzzle[0]
+    zero_loc = puzzle[1]
+    lines.append(f"Start puzzle: {start_puzzle}")
+    starting_state = EightPuzzleState(start_puzzle, goal_puzzle, 
+                        path_cost=0, enable_heuristic=not args.do_not_use_heuristic, zero_loc=zero_loc,
+                        heuristic=heuristic, symmetry=args.symmetry)
+    (path, frontier, stats), profile_report = profiled_solve(starting_state, args)
+    end = time.time()
+    lines.append("Solution:")
+    for i, state in enumerate(path):
+        lines.append(f"  (State {i})")
+        lines.append(state.__repr__())
+    if args.puzzle_file is None:
+        lines.append(f"\tNumber of moves (ground truth)  :  {args.puzzle_len}")
+    lines.append(f"\tNumber of moves in your solution:  {len(path) - 1}")
+    lines.append(f"\tTime: {end-start:.3f}")
+    if frontier is not None:
+        lines.append(frontier_counters(frontier))
+    lines.extend(profile_report)
+    if args.stats == "json":
+        lines.append(stats_record(args, start_puzzle, path, end - start, stats))
+    return lines, end - start, frontier.pops if frontier is not None else None
+
+def run_batch(solve_instance, problems, args):
+    '''
+    Solve all problems, printing each one's output in input order.
+    With args.workers > 1 the problems are spread over a process pool; at most
+    args.max_in_flight of them are running or waiting to be printed at a time so memory stays
+    bounded, and results are printed as soon as every earlier problem has finished.
+    '''
+    batch_start = time.time()
+    if args.workers <= 1:
+        for problem in problems:
+            lines, _, _ = solve_instance(problem, args)
+            print("\n".join(lines))
+        return
+
+    max_in_flight = args.max_in_flight or 2 * args.workers
+    problems = iter(enumerate(problems))
+    finished = {}
+    next_to_print = 0
+    total_solve_time = 0
+    total_nodes = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        running = {}
+        while True:
+            # Results that finished out of order count too, so a slow problem cannot let them pile up
+            while len(running) + len(finished) < max_in_flight:
+                item = next(problems, None)
+                if item is None:
+                    break
+                index, problem = item
+                running[pool.submit(solve_instance, problem, args)] = index
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished[running.pop(future)] = future.result()
+            while next_to_print in finished:
+                lines, solve_time, nodes = finished.pop(next_to_print)
+                print("\n".join(lines), flush=True)
+                total_solve_time += solve_time
+                total_nodes += nodes or 0
+                next_to_print += 1
+    print("-"*40)
+    print(f"Solved {next_to_print} problems with {args.workers} workers in {time.time()-batch_start:.3f}s "
+          f"(total solve time {total_solve_time:.3f}s, {total_nodes} nodes expanded)")
 
 def main(args):
+    if args.cache_file and not args.cache_mb:
+        print("--cache_file needs --cache_mb")
+        return
+    if args.cache_file and args.workers > 1:
+        print("--cache_file cannot be shared between --workers processes")
+        return
+    if args.symmetry and args.algorithm == "bidirectional":
+        print("--symmetry does not work with bidirectional search")
+        return
     if args.problem_type == "LightsOut":
         lights_out_problems = read_lights_out(args.lights_out_file)
-        for grid, cross_pattern, ground_truth_len in lights_out_problems:
-            print("-"*40)
-            print(f"Doing LightsOut {'(cross pattern)' if cross_pattern else '(original)'} for grid:")
-            print("\n".join([" ".join([str(c) for c in row]) for row in grid]))
-            goal = get_goal_lights_out(grid)
-            start = time.time()
-            starting_state = LightsOutState(grid, goal=goal, 
-                                path_cost=0, enable_heuristic=not args.do_not_use_heuristic,
-                                cross_pattern=cross_pattern)
-            path = astar_search(starting_state)
-            end = time.time()
-            if args.print_solution:
-                print("Solution:")
-                for i, state in enumerate(path):
-                    print(f"  (State {i})")
-                    print(state.__repr__())
-            print("\tNumber of toggles (ground truth)  : ", ground_truth_len)
-            print("\tNumber of toggles in your solution: ", len(path) - 1)
-            print(f"\tTime: {end-start:.3f}")
+        run_batch(solve_lights_out_instance, lights_out_problems, args)
 
     elif args.problem_type == "EightPuzzle":
-        print(f"Doing EightPuzzle for length {args.puzzle_len} puzzles")
-        all_puzzles = read_eight_puzzle(f"data/eight_puzzle/{args.puzzle_len}_moves.txt")
-        for puzzle in all_puzzles:
-            print("-"*40)
-            start = time.time()
-            start_puzzle = puzzle[0]
-            zero_loc = puzzle[1]
-            print(f"Start puzzle: {start_puzzle}")
-            goal_puzzle = [[0,1,2],[3,4,5],[6,7,8]]
-            starting_state = EightPuzzleState(start_puzzle, goal_puzzle, 
-                                path_cost=0, enable_heuristic=not args.do_not_use_heuristic, zero_loc=zero_loc)
-            path = astar_search(starting_state)
-            end = time.time()
-            print("Solution:")
-            for i, state in enumerate(path):
-                print(f"  (State {i})")
-                print(state.__repr__())
-            print("\tNumber of moves (ground truth)  : ", args.puzzle_len)
-            print("\tNumber of moves in your solution: ", len(path) - 1)
-            print(f"\tTime: {end-start:.3f}")
+        if args.algorithm == "gf2":
+            print("The gf2 solver only works for LightsOut")
+            return
+        puzzle_file = args.puzzle_file or f"data/eight_puzzle/{args.puzzle_len}_moves.txt"
+        print(f"Doing EightPuzzle ({args.puzzle_size}x{args.puzzle_size}) for puzzles in {puzzle_file}")
+        all_puzzles = read_eight_puzzle(puzzle_file, args.puzzle_size)
+        run_batch(solve_eight_puzzle_instance, all_puzzles, args)
 
     else:
         print("Problem type must be one of [LightsOut, EightPuzzle]")
         return
 
+    if _solution_cache is not None:
+        _solution_cache.close()
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='CS440 MP3 Search')
@@ -61,6 +228,31 @@ if __name__ == "__main__":
                         help='Which search problem (i.e., State) to solve: [LightsOut, EightPuzzle]')
     parser.add_argument('--do_not_use_heuristic', action = 'store_true',
                         help = 'Do not use heuristic h in astar_search')
+    parser.add_argument('--algorithm',dest="algorithm", type=str, default="astar",
+                        choices=sorted(SEARCH_ALGORITHMS),
+                        help='Search algorithm: A*, bidirectional A*, the memory-bounded IDA* / RBFS, '
+                             'or gf2 (algebraic LightsOut solver)')
+    parser.add_argument('--frontier',dest="frontier", type=str, default="heapq",
+                        choices=sorted(FRONTIERS),
+                        help='Priority queue used by A* (and each direction of bidirectional A*): heapq with lazy deletion, indexed heap with decrease-key, '
+                             'or bucket queue keyed on f')
+    parser.add_argument('--workers',dest="workers", type=int, default=1,
+                        help='Number of worker processes to solve problems in parallel (1: solve them one by one)')
+    parser.add_argument('--max_in_flight',dest="max_in_flight", type=int, default=None,
+                        help='Most problems handed to the workers at once (default: 2 * workers)')
+    parser.add_argument('--stats',dest="stats", type=str, default=None, choices=["json"],
+                        help='Print a JSON line of search statistics per problem (detailed counters for astar)')
+    parser.add_argument('--profile',dest="profile", type=str, default=None, choices=["cprofile", "tracemalloc"],
+                        help='Profile each solve with cProfile, or report its peak memory with tracemalloc')
+    parser.add_argument('--profile_lines',dest="profile_lines", type=int, default=20,
+                        help='Number of functions to list in the cProfile report')
+    parser.add_argument('--cache_mb',dest="cache_mb", type=float, default=0,
+                        help='Memory budget in MB of a solution cache shared by the A* searches (0: no cache)')
+    parser.add_argument('--cache_file',dest="cache_file", type=str, default=None,
+                        help='Shelve file that keeps the solution cache between runs')
+    parser.add_argument('--symmetry',dest="symmetry", action='store_true',
+                        help='Treat rotations/reflections of a board that leave the goal unchanged as the same state '
+                             '(not with bidirectional search or the pdb heuristic)')
     parser.add_argument('--print_solution', action = 'store_true',
                         help = 'Print out the full solution path for debugging')
 
@@ -71,6 +263,14 @@ if __name__ == "__main__":
     # EIGHTPUZZLE ARGS
     parser.add_argument('--eight_puzzle_len',dest="puzzle_len", type=int, default = 5,
                         help='EightPuzzle problem difficulty: one of [5, 10, 27]')
+    parser.add_argument('--eight_puzzle_file',dest="puzzle_file", type=str, default = None,
+                        help='File of EightPuzzle problems to use instead of data/eight_puzzle/<len>_moves.txt')
+    parser.add_argument('--eight_puzzle_size',dest="puzzle_size", type=int, default = 3,
+                        help='Side length of the sliding-tile board: 3 (EightPuzzle) or 4 (15-puzzle)')
+    parser.add_argument('--heuristic',dest="heuristic", type=str, default = "manhattan",
+                        choices=["manhattan", "linear_conflict", "pdb"],
+                        help='EightPuzzle heuristic: Manhattan distance, Manhattan plus linear conflicts, '
+                             'or additive pattern databases (built once under data/pdb)')
 
     args = parser.parse_args()
     main(args)
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Binary file format for the trained Naive Bayes models.
+
+A model file is a small JSON header followed by raw numpy arrays:
+
+    b"NBMODEL1" | header length (8 bytes, little endian) | JSON header | padding | array data ...
+
+The header holds the model's parameters plus the dtype, shape and file offset of every array.
+Arrays start on 64-byte boundaries, so load_model_file() can hand out read-only views straight
+into a memory mapping of the file: loading does not copy or parse the tables, and processes
+that load the same model share its pages.
+"""
+import json
+import mmap
+
+import numpy as np
+
+MAGIC = b"NBMODEL1"
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def save_model_file(path, header, arrays):
+    '''
+    header: JSON-serialisable dict of model parameters
+    arrays: dict of name -> numpy array
+    '''
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    # The offsets are part of the header, so lay the arrays out after a header of the final length
+    layout = {}
+    header_size = 0
+    while True:
+        offset = _aligned(len(MAGIC) + 8 + header_size)
+        for name, array in arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _aligned(offset + array.nbytes)
+        encoded = json.dumps({"header": header, "arrays": layout}).encode()
+        if len(encoded) <= header_size:
+            break
+        header_size = len(encoded)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(header_size.to_bytes(8, "little"))
+        f.write(encoded.ljust(header_size))
+        for name, array in arrays.items():
+            f.seek(layout[name]["offset"])
+            f.write(array.tobytes())
+
+def load_model_file(path):
+    '''Return (header, dict of name -> read-only numpy array mapped from the file)'''
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model file")
+        header_size = int.from_bytes(f.read(8), "little")
+        content = json.loads(f.read(header_size))
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    for name, entry in content["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        if count == 0:
+            arrays[name] = np.empty(entry["shape"], dtype=dtype)
+            continue
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=entry["offset"]).reshape(entry["shape"])
+    return content["header"], arrays
+
+# A list of words as a UTF-8 blob plus the end offset of each word, for storing vocabularies
+def encode_words(words):
+    encoded = [word.encode() for word in words]
+    ends = np.cumsum([len(word) for word in encoded], dtype=np.int64)
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), ends
+
+def decode_words(blob, ends):
+    blob = blob.tobytes()
+    starts = [0] + ends[:-1].tolist()
+    return [blob[start:end].decode() for start, end in zip(starts, ends.tolist())]
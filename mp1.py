@@ -14,22 +14,15 @@ import configparser
 import copy
 
 import reader
+from evaluation import compute_accuracies, print_score_metrics, print_multiclass_stats
+from vocabulary import Vocabulary
 import naive_bayes as nb
+from multiclass_naive_bayes import MulticlassNaiveBayesModel
 
 """
 This file contains the main application that is run for this MP.
 """
 
-def compute_accuracies(predicted_labels, dev_labels):
-    yhats = predicted_labels
-    assert len(yhats) == len(dev_labels), "predicted and gold label lists have different lengths"
-    accuracy = sum([yhats[i] == dev_labels[i] for i in range(len(yhats))]) / len(yhats)
-    tp = sum([yhats[i] == dev_labels[i] and yhats[i] == 1 for i in range(len(yhats))])
-    tn = sum([yhats[i] == dev_labels[i] and yhats[i] == 0 for i in range(len(yhats))])
-    fp = sum([yhats[i] != dev_labels[i] and yhats[i] == 1 for i in range(len(yhats))])
-    fn = sum([yhats[i] != dev_labels[i] and yhats[i] == 0 for i in range(len(yhats))])
-    return accuracy, fp, fn, tp, tn
-
 # print value and also percentage out of n
 def print_value(label, value, numvalues):
    print(f"{label} {value} ({value/numvalues * 100}%)")
@@ -44,19 +37,75 @@ def print_stats(accuracy, false_positive, false_negative, true_positive, true_ne
     print(f"total number of samples {numvalues}")
 
 
+"""
+Train and predict while streaming the documents from disk, args.stream_batch at a time, so memory
+    only depends on the vocabulary and the batch size instead of the corpus size.
+"""
+def stream_predictions(args):
+    model = nb.NaiveBayesModel(args.laplace, args.pos_prior)
+    nb.partial_fit_stream(model, reader.iter_dataset(args.training_dir, args.stemming, args.lowercase), args.stream_batch)
+    if args.save_model:
+        model.save(args.save_model, args.stemming, args.lowercase)
+    return nb.predict_stream(model, reader.iter_dataset(args.development_dir, args.stemming, args.lowercase), args.stream_batch)
+
+
+"""
+K-class run: the classes are the subfolders of the training folder, found by reader.find_classes, and
+    every dev document gets the class that scores highest.
+"""
+def multiclass_main(args):
+    classes = reader.find_classes(args.training_dir)
+    if args.stream_batch:
+        model = MulticlassNaiveBayesModel(classes, args.laplace, args.priors)
+        nb.partial_fit_stream(model, reader.iter_labeled_dataset(args.training_dir, classes, args.stemming, args.lowercase),
+                              args.stream_batch)
+        predicted_labels, dev_labels = nb.predict_stream(model, reader.iter_labeled_dataset(args.development_dir, classes,
+                                                                                             args.stemming, args.lowercase),
+                                                         args.stream_batch)
+    else:
+        vocabulary = Vocabulary()
+        train_set, train_labels, dev_set, dev_labels, _ = reader.load_labeled_dataset(args.training_dir, args.development_dir,
+                                                                                      args.stemming, args.lowercase, False,
+                                                                                      args.workers, vocabulary=vocabulary,
+                                                                                      classes=classes)
+        model = MulticlassNaiveBayesModel(classes, args.laplace, args.priors, vocabulary).fit(train_set, train_labels)
+        predicted_labels = model.predict(dev_set)
+    if args.save_model:
+        model.save(args.save_model, args.stemming, args.lowercase)
+    print_multiclass_stats(predicted_labels, dev_labels, classes)
+
+
 """
 Main function
     You can modify the default parameter settings given below, 
     instead of constantly typing your favorite values at the command line.
 """
 def main(args):
-    train_set, train_labels, dev_set, dev_labels = nb.load_data(args.training_dir,args.development_dir,args.stemming,args.lowercase)
+    if args.multiclass:
+        return multiclass_main(args)
+    if args.stream_batch:
+        predicted_labels, dev_labels = stream_predictions(args)
+    else:
+        # Intern the words at load time, so the model counts and scores integer ids
+        vocabulary = Vocabulary()
+        train_set, train_labels, dev_set, dev_labels = nb.load_data(args.training_dir,args.development_dir,args.stemming,args.lowercase,workers=args.workers,
+                                                                    vocabulary=vocabulary)
     
-    predicted_labels = nb.naive_bayes(train_set, train_labels, dev_set, args.laplace, args.pos_prior)
+        if args.bootstrap or args.save_model:
+            # Keep the model itself, for the log-odds of the score metrics and for saving
+            model = nb.NaiveBayesModel(args.laplace, args.pos_prior, vocabulary).fit(train_set, train_labels)
+            scores = model.log_odds(dev_set)
+            predicted_labels = (scores > 0).astype(int)
+            if args.save_model:
+                model.save(args.save_model, args.stemming, args.lowercase)
+        else:
+            predicted_labels = nb.naive_bayes(train_set, train_labels, dev_set, args.laplace, args.pos_prior, vocabulary=vocabulary)
 
     accuracy, false_positive, false_negative, true_positive, true_negative = compute_accuracies(predicted_labels,dev_labels)
     nn = len(dev_labels)
     print_stats(accuracy, false_positive, false_negative, true_positive, true_negative, nn)
+    if args.bootstrap:
+        print_score_metrics(dev_labels, scores, args.bootstrap, args.workers)
 
     
 if __name__ == "__main__":
@@ -71,10 +120,26 @@ if __name__ == "__main__":
                         help='Use porter stemmer')
     parser.add_argument('--lowercase',dest="lowercase", type=bool, default=False,
                         help='Convert all word to lower case')
+    parser.add_argument('--workers',dest="workers", type=int, default=1,
+                        help='Number of processes to tokenize the data (tokens are also cached in data/token_cache) and bootstrap with')
+    parser.add_argument('--stream_batch',dest="stream_batch", type=int, default=None,
+                        help='Stream the documents from disk in batches of this size instead of loading them all')
     parser.add_argument('--laplace',dest="laplace", type=float, default = 1.0,
                         help='Laplace smoothing parameter')
     parser.add_argument('--pos_prior',dest="pos_prior", type=float, default = 0.5,
                         help='Positive prior, i.e. percentage of test examples that are positive')
+    parser.add_argument('--multiclass',dest="multiclass", action='store_true',
+                        help='Classify into all the classes found as subfolders of the training folder, not just pos/neg')
+    parser.add_argument('--priors',dest="priors", type=float, nargs="+", default=None,
+                        help='With --multiclass, the prior of each class in sorted order of the folder names (default: training class frequencies)')
+    parser.add_argument('--bootstrap',dest="bootstrap", type=int, default=None,
+                        help='Also print ROC-AUC, log-loss and average precision with confidence intervals from this many bootstrap resamples')
+    parser.add_argument('--save_model',dest="save_model", type=str, default=None,
+                        help='Also save the trained model to this file, e.g. for serve.py')
 
     args = parser.parse_args()
+    if args.bootstrap and args.multiclass:
+        parser.error("--bootstrap scores two classes and does not work with --multiclass")
+    if args.bootstrap and args.stream_batch:
+        parser.error("--bootstrap needs the log-odds of the whole dev set and does not work with --stream_batch")
     main(args)
@@ -14,22 +14,16 @@ import configparser
 import copy
 
 import reader
+from evaluation import compute_accuracies, print_score_metrics
+from vocabulary import Vocabulary
 import bigram_naive_bayes as nb
+from hashed_naive_bayes import HashedNaiveBayesModel
+from ngram_naive_bayes import NgramNaiveBayesModel
 
 """
 This file contains the main application that is run for this MP.
 """
 
-def compute_accuracies(predicted_labels, dev_labels):
-    yhats = predicted_labels
-    assert len(yhats) == len(dev_labels), "predicted and gold label lists have different lengths"
-    accuracy = sum([yhats[i] == dev_labels[i] for i in range(len(yhats))]) / len(yhats)
-    tp = sum([yhats[i] == dev_labels[i] and yhats[i] == 1 for i in range(len(yhats))])
-    tn = sum([yhats[i] == dev_labels[i] and yhats[i] == 0 for i in range(len(yhats))])
-    fp = sum([yhats[i] != dev_labels[i] and yhats[i] == 1 for i in range(len(yhats))])
-    fn = sum([yhats[i] != dev_labels[i] and yhats[i] == 0 for i in range(len(yhats))])
-    return accuracy, fp, fn, tp, tn
-
 # print value and also percentage out of n
 def print_value(label, value, numvalues):
    print(f"{label} {value} ({value/numvalues * 100}%)")
@@ -44,20 +38,65 @@ def print_stats(accuracy, false_positive, false_negative, true_positive, true_ne
     print(f"total number of samples {numvalues}")
 
 
+# The exact bigram model, with --ngram_lambdas the n-gram model of that order, and with --hash_bits
+# the hashed model with the same settings and bounded memory
+def make_model(args, vocabulary=None):
+    if args.ngram_lambdas:
+        lambdas = args.ngram_lambdas
+        laplaces = args.ngram_laplaces or [args.laplace] + [args.bigram_laplace] * (len(lambdas) - 1)
+    else:
+        lambdas = (1 - args.bigram_lambda, args.bigram_lambda)
+        laplaces = (args.laplace, args.bigram_laplace)
+    if args.hash_bits:
+        return HashedNaiveBayesModel(args.hash_bits, laplaces, lambdas, args.pos_prior, args.min_count, vocabulary)
+    if args.ngram_lambdas:
+        return NgramNaiveBayesModel(laplaces, lambdas, args.pos_prior, vocabulary)
+    return nb.BigramNaiveBayesModel(args.laplace, args.bigram_laplace, args.bigram_lambda, args.pos_prior, vocabulary)
+
+
+"""
+Train and predict while streaming the documents from disk, args.stream_batch at a time, so memory
+    only depends on the vocabulary and the batch size instead of the corpus size.
+"""
+def stream_predictions(args):
+    model = make_model(args)
+    nb.partial_fit_stream(model, reader.iter_dataset(args.training_dir, args.stemming, args.lowercase), args.stream_batch)
+    if args.save_model:
+        model.save(args.save_model, args.stemming, args.lowercase)
+    return nb.predict_stream(model, reader.iter_dataset(args.development_dir, args.stemming, args.lowercase), args.stream_batch)
+
+
 """
 Main function
     You can modify the default parameter settings given below, 
     instead of constantly typing your favorite values at the command line.
 """
 def main(args):
-    train_set, train_labels, dev_set, dev_labels = nb.load_data(args.training_dir,args.development_dir,args.stemming,args.lowercase)
+    if args.stream_batch:
+        predicted_labels, dev_labels = stream_predictions(args)
+    else:
+        # Intern the words at load time, so the model counts and scores integer ids
+        vocabulary = Vocabulary()
+        train_set, train_labels, dev_set, dev_labels = nb.load_data(args.training_dir,args.development_dir,args.stemming,args.lowercase,workers=args.workers,
+                                                                    vocabulary=vocabulary)
     
-    predicted_labels = nb.bigram_bayes(train_set, train_labels, dev_set,
-                                          args.laplace,args.bigram_laplace, args.bigram_lambda,args.pos_prior)
+        if args.bootstrap or args.save_model or args.hash_bits or args.ngram_lambdas:
+            # Use the model class directly: for the log-odds of the score metrics, for saving, or for the other models
+            model = make_model(args, vocabulary).fit(train_set, train_labels)
+            scores = model.log_odds(dev_set)
+            predicted_labels = (scores > 0).astype(int)
+            if args.save_model:
+                model.save(args.save_model, args.stemming, args.lowercase)
+        else:
+            predicted_labels = nb.bigram_bayes(train_set, train_labels, dev_set,
+                                                  args.laplace,args.bigram_laplace, args.bigram_lambda,args.pos_prior,
+                                                  vocabulary=vocabulary)
 
     accuracy, false_positive, false_negative, true_positive, true_negative = compute_accuracies(predicted_labels,dev_labels)
     nn = len(dev_labels)
     print_stats(accuracy, false_positive, false_negative, true_positive, true_negative, nn)
+    if args.bootstrap:
+        print_score_metrics(dev_labels, scores, args.bootstrap, args.workers)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='CS440 MP2 Bigram Naive Bayes')
@@ -71,6 +110,10 @@ if __name__ == "__main__":
                         help='Use porter stemmer')
     parser.add_argument('--lowercase',dest="lowercase", type=bool, default=False,
                         help='Convert all word to lower case')
+    parser.add_argument('--workers',dest="workers", type=int, default=1,
+                        help='Number of processes to tokenize the data (tokens are also cached in data/token_cache) and bootstrap with')
+    parser.add_argument('--stream_batch',dest="stream_batch", type=int, default=None,
+                        help='Stream the documents from disk in batches of this size instead of loading them all')
     parser.add_argument('--laplace',dest="laplace", type=float, default = 1.0,
                         help='Laplace smoothing parameter')
     parser.add_argument('--bigram_laplace',dest="bigram_laplace", type=float, default = 1.0,
@@ -79,6 +122,22 @@ if __name__ == "__main__":
                         help='Weight on bigrams vs. unigrams')
     parser.add_argument('--pos_prior',dest="pos_prior", type=float, default = 0.5,
                         help='Positive prior, i.e. percentage of test examples that are positive')
+    parser.add_argument('--ngram_lambdas',dest="ngram_lambdas", type=float, nargs="+", default=None,
+                        help='Weights of the n-gram orders 1, 2, 3, ... (replaces --bigram_lambda; the number of weights is the order)')
+    parser.add_argument('--ngram_laplaces',dest="ngram_laplaces", type=float, nargs="+", default=None,
+                        help='Laplace smoothing parameter of each order with --ngram_lambdas (default: --laplace, then --bigram_laplace)')
+    parser.add_argument('--hash_bits',dest="hash_bits", type=int, default=None,
+                        help='Hash the unigrams and bigrams into tables of 2**HASH_BITS buckets instead of counting them exactly')
+    parser.add_argument('--min_count',dest="min_count", type=int, default=1,
+                        help='With --hash_bits, score n-grams of order 2 and up seen fewer than MIN_COUNT times as unseen')
+    parser.add_argument('--bootstrap',dest="bootstrap", type=int, default=None,
+                        help='Also print ROC-AUC, log-loss and average precision with confidence intervals from this many bootstrap resamples')
+    parser.add_argument('--save_model',dest="save_model", type=str, default=None,
+                        help='Also save the trained model to this file, e.g. for serve.py')
 
     args = parser.parse_args()
+    if args.ngram_laplaces and len(args.ngram_laplaces) != len(args.ngram_lambdas or []):
+        parser.error("--ngram_laplaces needs --ngram_lambdas with the same number of values")
+    if args.bootstrap and args.stream_batch:
+        parser.error("--bootstrap needs the log-odds of the whole dev set and does not work with --stream_batch")
     main(args)
@@ -0,0 +1,126 @@
+"""
+Naive Bayes over any number of classes.
+
+The classes are names, usually found as the subfolders of the training folder by
+reader.find_classes / reader.load_labeled_dataset, and the label of a document is the index of its
+class. The model keeps one row of word counts per class, a K x V table, and turns it into a K x V
+table of log P(word | class) plus a vector of log P(class). A batch of documents is scored against
+all classes at once with one sparse matrix product (naive_bayes.csr_matmat), and training counts
+the (class, word) pairs of a batch with a single sort, so neither has a per-class branch or loop.
+
+With the classes neg/pos and priors (1 - pos_prior, pos_prior) it gives the predictions of
+naive_bayes.NaiveBayesModel.
+"""
+import numpy as np
+
+from naive_bayes import NaiveBayesBase, token_columns, document_term_matrix, unique_counts, csr_matmat
+from naive_bayes import class_log_likelihoods, seen_columns, grow_columns
+from vocabulary import Vocabulary
+
+
+def print_values_multiclass(classes, laplace, priors):
+    print(f"Classes: {len(classes)}")
+    print(f"Laplace: {laplace}")
+    print(f"Priors: {'class frequencies' if priors is None else list(priors)}")
+
+"""
+K-class model: joint_log_likelihoods() has one row per class, predict() returns class indices and
+    predict_log_proba() has one column per class.
+    priors is P(class) for every class, or None to use the class frequencies of the training documents.
+"""
+class MulticlassNaiveBayesModel(NaiveBayesBase):
+    def __init__(self, classes, laplace=1.0, priors=None, vocabulary=None):
+        self.classes = list(classes)
+        self.laplace = laplace
+        if priors is not None and len(priors) != len(self.classes):
+            raise ValueError(f"{len(priors)} priors for {len(self.classes)} classes")
+        self.priors = None if priors is None else np.array(priors, dtype=np.float64)
+        self.vocabulary = Vocabulary() if vocabulary is None else vocabulary
+        self._reset()
+
+    def _reset(self):
+        # Row c: how often each vocabulary word occurs in the training documents of class c
+        self.counts = np.zeros((len(self.classes), 0))
+        # Number of training documents of each class
+        self.doc_counts = np.zeros(len(self.classes))
+        self._log_likelihoods = None
+        self._word_table = None
+
+    def fit(self, train_set, train_labels):
+        self._reset()
+        return self.partial_fit(train_set, train_labels)
+
+    def partial_fit(self, docs, labels):
+        self.vocabulary.add_docs(docs)
+        num_columns = len(self.vocabulary)
+        columns, lengths = token_columns(docs, self.vocabulary)
+        labels = np.array(labels, dtype=np.int64)
+        # Only the (class, word) pairs that occur in the batch are counted and added, not a K x V table of them
+        cells, cell_counts = unique_counts(np.repeat(labels, lengths) * num_columns + columns)
+        counts = grow_columns(self.counts, num_columns)
+        if not counts.flags.writeable:
+            # Loaded from a model file: count on in a copy of the mapped table
+            counts = counts.copy()
+        counts[cells // num_columns, cells % num_columns] += cell_counts
+        self.counts = counts
+        self.doc_counts = self.doc_counts + np.bincount(labels, minlength=len(self.classes))
+        self._log_likelihoods = None
+        self._word_table = None
+        return self
+
+    @property
+    def log_priors(self):
+        priors = self.doc_counts / self.doc_counts.sum() if self.priors is None else self.priors
+        with np.errstate(divide="ignore"):
+            return np.log(priors)
+
+    # Row c: log P(word | class c) for every column (see naive_bayes.class_log_likelihoods), worked out from the current counts
+    @property
+    def log_likelihoods(self):
+        if self._log_likelihoods is None:
+            vocabulary_size = seen_columns(self.counts)
+            self._log_likelihoods = np.array([class_log_likelihoods(class_counts, self.laplace, vocabulary_size)
+                                              for class_counts in self.counts])
+        return self._log_likelihoods
+
+    def joint_log_likelihoods(self, docs):
+        if self._word_table is None:
+            # One row per word, so scoring gathers contiguous rows of K values
+            self._word_table = np.ascontiguousarray(self.log_likelihoods.T)
+        matrix = document_term_matrix(docs, self.vocabulary, unseen=self.counts.shape[1])
+        return csr_matmat(matrix, self._word_table).T + self.log_priors[:, None]
+
+    def predict(self, docs):
+        return np.argmax(self.joint_log_likelihoods(docs), axis=0)
+
+    def predict_classes(self, docs):
+        return [self.classes[label] for label in self.predict(docs)]
+
+    def predict_log_proba(self, docs):
+        scores = self.joint_log_likelihoods(docs).T
+        return scores - np.logaddexp.reduce(scores, axis=1, keepdims=True)
+
+    def _header(self):
+        return {"classes": self.classes, "laplace": self.laplace,
+                "priors": None if self.priors is None else self.priors.tolist()}
+
+    def _arrays(self):
+        return {"counts": self.counts, "doc_counts": self.doc_counts, "log_likelihoods": self.log_likelihoods}
+
+    @classmethod
+    def _from_file(cls, header, arrays, vocabulary):
+        model = cls(header["classes"], header["laplace"], header["priors"], vocabulary)
+        model.counts = arrays["counts"]
+        model.doc_counts = arrays["doc_counts"]
+        model._log_likelihoods = arrays["log_likelihoods"]
+        return model
+
+
+"""
+Main function for training and predicting with the K-class model, like naive_bayes.naive_bayes for the
+    classes of reader.load_labeled_dataset. Returns the predicted class index of every dev document.
+"""
+def multiclass_naive_bayes(train_set, train_labels, dev_set, classes, laplace=1.0, priors=None, silently=False, vocabulary=None):
+    print_values_multiclass(classes, laplace, priors)
+    model = MulticlassNaiveBayesModel(classes, laplace, priors, vocabulary).fit(train_set, train_labels)
+    return model.predict(dev_set).tolist()
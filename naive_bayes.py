@@ -19,8 +19,10 @@ so be careful to not modify anything else.
 
 import reader
 import math
-from tqdm import tqdm
-from collections import Counter
+import numpy as np
+from itertools import chain, islice
+from model_io import save_model_file, load_model_file, encode_words, decode_words
+from vocabulary import Vocabulary
 
 
 '''
@@ -35,48 +37,273 @@ load_data loads the input data by calling the provided utility.
 You can adjust default values for stemming and lowercase, when we haven't passed in specific values,
 to potentially improve performance.
 """
-def load_data(trainingdir, testdir, stemming=False, lowercase=False, silently=False):
+def load_data(trainingdir, testdir, stemming=False, lowercase=False, silently=False, workers=1, vocabulary=None):
     print(f"Stemming: {stemming}")
     print(f"Lowercase: {lowercase}")
-    train_set, train_labels, dev_set, dev_labels = reader.load_dataset(trainingdir,testdir,stemming,lowercase,silently)
+    train_set, train_labels, dev_set, dev_labels = reader.load_dataset(trainingdir,testdir,stemming,lowercase,silently,workers,vocabulary=vocabulary)
     return train_set, train_labels, dev_set, dev_labels
 
 
+"""
+Vectorized building blocks.
+    Every word has a column, its id in a vocabulary.Vocabulary; words that were never seen in training all
+    share the extra "unseen" column after the model's counts. Documents are token lists or id arrays interned
+    with the same Vocabulary. A set of documents is stored as a CSR document-term matrix, i.e. a tuple
+    (indptr, indices, counts) of numpy arrays: the distinct columns of document i are
+    indices[indptr[i]:indptr[i+1]], and counts holds how often each one occurs. Building the matrix sorts the
+    tokens, which pays off for a set that is scored many times (sweep.py) or against many classes; for one pass,
+    gathering the table value of every token and summing per document with np.bincount is faster.
+"""
+# The column of every token of docs as one flat array, along with the length of each document.
+# Columns from unseen on (words missing from the vocabulary or added after training) become unseen.
+def token_columns(docs, vocabulary, unseen=None):
+    if unseen is None:
+        unseen = len(vocabulary)
+    lengths = np.fromiter(map(len, docs), dtype=np.int64, count=len(docs))
+    if all(isinstance(doc, list) for doc in docs):
+        columns = np.fromiter(vocabulary.lookup(chain.from_iterable(docs)), dtype=np.int64, count=int(lengths.sum()))
+    elif not any(isinstance(doc, list) for doc in docs):
+        # Only id arrays: one buffer of all the ids instead of one array per document
+        columns = np.frombuffer(b"".join(docs), dtype=np.uint32).astype(np.int64)
+    else:
+        columns = np.concatenate([np.zeros(0, dtype=np.int64)] + [
+            np.fromiter(vocabulary.lookup(doc), dtype=np.int64, count=len(doc)) if isinstance(doc, list)
+            else np.frombuffer(doc, dtype=np.uint32).astype(np.int64)
+            for doc in docs])
+    return np.minimum(columns, unseen), lengths
+
+def document_term_matrix(docs, vocabulary, unseen=None):
+    if unseen is None:
+        unseen = len(vocabulary)
+    columns, lengths = token_columns(docs, vocabulary, unseen)
+    rows = np.repeat(np.arange(len(docs)), lengths)
+    return csr_from_coordinates(rows, columns, len(docs), unseen + 1)
+
+# Sorted distinct values of an integer array and how often each occurs. Plain sorting is much faster
+# than np.unique(return_counts=True) on large id arrays.
+def unique_counts(values):
+    values = np.sort(values)
+    if not len(values):
+        return values, np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    return values[starts], np.diff(np.append(starts, len(values)))
+
+# CSR matrix counting how often each (row, column) pair occurs in the two arrays
+def csr_from_coordinates(rows, columns, num_rows, num_columns):
+    # Sorting the pairs as single integers groups the repeats of a word within a document
+    cells, counts = unique_counts(rows * num_columns + columns)
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells // num_columns, minlength=num_rows), out=indptr[1:])
+    return indptr, cells % num_columns, counts.astype(np.float64)
+
+# Product of the matrix with a vector over its columns, i.e. the sum of vector[word] over the words of each document
+def csr_matvec(matrix, vector):
+    indptr, indices, counts = matrix
+    num_rows = len(indptr) - 1
+    entry_rows = np.repeat(np.arange(num_rows), np.diff(indptr))
+    return np.bincount(entry_rows, weights=counts * vector[indices], minlength=num_rows)
+
+# Product of the matrix with a (columns x k) array, i.e. csr_matvec for k vectors at once: the weighted rows
+# of dense are summed over each document's entries with np.add.reduceat. The documents are taken in blocks of
+# about block_entries entries so the (entries x k) temporary stays small however large k is.
+def csr_matmat(matrix, dense, block_entries=None):
+    indptr, indices, counts = matrix
+    num_rows = len(indptr) - 1
+    dense = np.ascontiguousarray(dense)
+    if block_entries is None:
+        block_entries = max(1024, 2 ** 18 // dense.shape[1])
+    result = np.zeros((num_rows, dense.shape[1]))
+    # A block starts at the document holding each multiple of block_entries
+    bounds = np.searchsorted(indptr, np.arange(0, indptr[-1], block_entries), side="right") - 1
+    bounds = np.unique(np.append(bounds, num_rows))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        first, last = indptr[start], indptr[end]
+        products = counts[first:last, None] * dense[indices[first:last]]
+        # reduceat gives an empty segment the row at its start, so empty documents are left at zero
+        nonempty = np.flatnonzero(np.diff(indptr[start:end + 1]) > 0)
+        if len(nonempty):
+            result[start + nonempty] = np.add.reduceat(products, indptr[start:end][nonempty] - first, axis=0)
+    return result
+
+"""
+Laplace-smoothed log P(word | class) for every column, given the class word counts over the vocabulary.
+    vocabulary_size is the number of distinct training words, which is not the number of columns when a shared
+    Vocabulary also holds test-only words. The last entry is the value of a word the class has never seen,
+    which also covers the unseen-word column.
+"""
+def class_log_likelihoods(word_counts, laplace, vocabulary_size):
+    denominator = word_counts.sum() + laplace * vocabulary_size
+    return np.log((np.append(word_counts, 0.0) + laplace) / denominator)
+
+# Number of columns with a nonzero count in a (classes x columns) count table
+def seen_columns(counts):
+    return int(np.count_nonzero(counts.sum(axis=0)))
+
+# Pad a (classes x columns) count table with zero columns up to num_columns
+def grow_columns(counts, num_columns):
+    if counts.shape[1] >= num_columns:
+        return counts
+    return np.concatenate([counts, np.zeros((counts.shape[0], num_columns - counts.shape[1]))], axis=1)
+
+"""
+Streaming helpers for models with partial_fit() and predict().
+    pairs is any iterable of (tokens, label), e.g. reader.iter_dataset(), and is consumed batch_size
+    documents at a time, so only one batch of documents is held in memory.
+"""
+def batches(pairs, batch_size):
+    pairs = iter(pairs)
+    while True:
+        batch = list(islice(pairs, batch_size))
+        if not batch:
+            return
+        yield [doc for doc, _ in batch], [label for _, label in batch]
+
+def partial_fit_stream(model, pairs, batch_size=1000):
+    for docs, labels in batches(pairs, batch_size):
+        model.partial_fit(docs, labels)
+    return model
+
+# Return the predicted and the true labels of all documents
+def predict_stream(model, pairs, batch_size=1000):
+    predicted_labels = []
+    true_labels = []
+    for docs, labels in batches(pairs, batch_size):
+        predicted_labels.extend(model.predict(docs).tolist())
+        true_labels.extend(labels)
+    return predicted_labels, true_labels
+
+
+# Two-column log posteriors (negative, positive) from the positive/negative log-odds
+def log_odds_to_log_proba(log_odds):
+    return np.stack([-np.logaddexp(0, log_odds), -np.logaddexp(0, -log_odds)], axis=1)
+
+
+"""
+Base class of the Naive Bayes models: the scores and the model file, derived from what each model defines.
+    A model implements joint_log_likelihoods(docs), the unnormalised log P(label, doc) with one row per label
+    (0: negative, 1: positive) and one column per document, plus _header() and _arrays(), the parameters and
+    tables save() writes, and _from_file(header, arrays, vocabulary), which rebuilds the model from them in load().
+    The vocabulary.Vocabulary of the model is written and read back along with its arrays, unless the model
+    does not keep one (saves_vocabulary is False, and _from_file() gets None). save() can also record how the
+    training documents were tokenized, which a loaded model has as tokenization (None if it was not recorded).
+    The model files use the binary format of model_io, so a loaded model scores straight from a memory mapping.
+"""
+class NaiveBayesBase:
+    saves_vocabulary = True
+    # {"stemming": ..., "lowercase": ...} of reader.tokenize_text for the documents the model was trained on
+    tokenization = None
+
+    @property
+    def log_priors(self):
+        return np.array([math.log(1 - self.pos_prior), math.log(self.pos_prior)])
+
+    # log P(positive | doc) - log P(negative | doc) for every document
+    def log_odds(self, docs):
+        scores = self.joint_log_likelihoods(docs)
+        return scores[1] - scores[0]
+
+    def predict(self, docs):
+        return (self.log_odds(docs) > 0).astype(int)
+
+    # Normalised log posteriors with one column per label
+    def predict_log_proba(self, docs):
+        return log_odds_to_log_proba(self.log_odds(docs))
+
+    def save(self, path, stemming=None, lowercase=None):
+        tokenization = self.tokenization
+        if stemming is not None or lowercase is not None:
+            tokenization = {"stemming": bool(stemming), "lowercase": bool(lowercase)}
+        arrays = self._arrays()
+        if self.saves_vocabulary:
+            arrays["vocabulary_words"], arrays["vocabulary_ends"] = encode_words(self.vocabulary.words)
+        save_model_file(path, {"model": type(self).__name__, "tokenization": tokenization, **self._header()}, arrays)
+
+    @classmethod
+    def load(cls, path):
+        header, arrays = load_model_file(path)
+        if header.get("model") != cls.__name__:
+            raise ValueError(f"{path} does not hold a {cls.__name__}")
+        vocabulary = None
+        if cls.saves_vocabulary:
+            vocabulary = Vocabulary(decode_words(arrays["vocabulary_words"], arrays["vocabulary_ends"]))
+        model = cls._from_file(header, arrays, vocabulary)
+        model.tokenization = header.get("tokenization")
+        return model
+
+
+"""
+Naive Bayes model that is trained once and can then score any number of document sets.
+    The model only keeps word counts, so partial_fit() can fold in more documents at any time and training
+    memory depends on the vocabulary size, not on the corpus size. Documents given as id arrays must be
+    interned with the model's vocabulary (e.g. pass the same Vocabulary to reader.load_dataset).
+"""
+class NaiveBayesModel(NaiveBayesBase):
+    def __init__(self, laplace=1.0, pos_prior=0.5, vocabulary=None):
+        self.laplace = laplace
+        self.pos_prior = pos_prior
+        self.vocabulary = Vocabulary() if vocabulary is None else vocabulary
+        # Row c: how often each vocabulary word occurs in the training documents of label c
+        self.counts = np.zeros((2, 0))
+        self._log_likelihoods = None
+
+    def fit(self, train_set, train_labels):
+        self.counts = np.zeros((2, 0))
+        return self.partial_fit(train_set, train_labels)
+
+    def partial_fit(self, docs, labels):
+        self.vocabulary.add_docs(docs)
+        columns, lengths = token_columns(docs, self.vocabulary)
+        token_labels = np.repeat(np.array(labels, dtype=np.int64), lengths)
+        counts = [np.bincount(columns[token_labels == label], minlength=len(self.vocabulary)) for label in (0, 1)]
+        self.counts = grow_columns(self.counts, len(self.vocabulary)) + counts
+        self._log_likelihoods = None
+        return self
+
+    # Row c: log P(word | label c) for every column (see class_log_likelihoods), worked out from the current counts
+    @property
+    def log_likelihoods(self):
+        if self._log_likelihoods is None:
+            vocabulary_size = seen_columns(self.counts)
+            self._log_likelihoods = np.array([class_log_likelihoods(class_counts, self.laplace, vocabulary_size)
+                                              for class_counts in self.counts])
+        return self._log_likelihoods
+
+    # Sum of table[column] over the tokens of each document, for every row of tables. Scoring a document set
+    # once, these per-token sums are the product with its document-term matrix without sorting the tokens into one.
+    def _token_sums(self, docs, tables):
+        columns, lengths = token_columns(docs, self.vocabulary, unseen=self.counts.shape[1])
+        rows = np.repeat(np.arange(len(docs)), lengths)
+        return np.array([np.bincount(rows, weights=table[columns], minlength=len(docs)) for table in tables])
+
+    def joint_log_likelihoods(self, docs):
+        return self._token_sums(docs, self.log_likelihoods) + self.log_priors[:, None]
+
+    # One sum of the differences of the two rows instead of one sum per row
+    def log_odds(self, docs):
+        log_odds = self._token_sums(docs, [self.log_likelihoods[1] - self.log_likelihoods[0]])[0]
+        log_odds += self.log_priors[1] - self.log_priors[0]
+        return log_odds
+
+    def _header(self):
+        return {"laplace": self.laplace, "pos_prior": self.pos_prior}
+
+    def _arrays(self):
+        return {"counts": self.counts, "log_likelihoods": self.log_likelihoods}
+
+    @classmethod
+    def _from_file(cls, header, arrays, vocabulary):
+        model = cls(header["laplace"], header["pos_prior"], vocabulary)
+        model.counts = arrays["counts"]
+        model._log_likelihoods = arrays["log_likelihoods"]
+        return model
+
+
 """
 Main function for training and predicting with naive bayes.
     You can modify the default values for the Laplace smoothing parameter and the prior for the positive label.
     Notice that we may pass in specific values for these parameters during our testing.
 """
-def naive_bayes(train_set, train_labels, dev_set, laplace=1.0, pos_prior=0.5, silently=False):
+def naive_bayes(train_set, train_labels, dev_set, laplace=1.0, pos_prior=0.5, silently=False, vocabulary=None):
     print_values(laplace,pos_prior)
-    
-    count_positive = Counter()
-    count_negative = Counter()
-
-    for review, label in zip(train_set, train_labels):
-        if label == 1:
-            count_positive.update(review)
-        else:
-            count_negative.update(review)
-    total_count_positive = sum(count_positive.values())
-    total_count_negative = sum(count_negative.values())
-    vocabulary_positive = set(count_positive.keys())
-    vocabulary_negative = set(count_negative.keys())
-    vocabulary_combined = vocabulary_positive.union(vocabulary_negative)
-    total_unique_words = len(vocabulary_combined)
-    yhats = []
-    for doc in tqdm(dev_set, disable=silently):
-        positive_log = math.log(pos_prior)
-        negative_log = math.log(1 - pos_prior)
-        for word in doc:
-            positive_log += math.log(
-                (count_positive.get(word, 0) + laplace) / (total_count_positive + laplace*total_unique_words)
-            )
-            negative_log += math.log(
-                (count_negative.get(word, 0) + laplace) / (total_count_negative + laplace*total_unique_words)
-            )
-        if (positive_log > negative_log):
-            yhats.append(1)
-        else:
-            yhats.append(0)
-    return yhats
+    model = NaiveBayesModel(laplace, pos_prior, vocabulary).fit(train_set, train_labels)
+    return model.predict(dev_set).tolist()
@@ -0,0 +1,193 @@
+"""
+N-gram Naive Bayes of any order.
+
+A mixture of the orders 1..max_order like bigram_naive_bayes generalised: the log-likelihood of a
+document is the lambda-weighted sum of its per-order log-likelihoods, and every order has its own
+Laplace value. With laplaces (unigram_laplace, bigram_laplace) and lambdas (1 - bigram_lambda,
+bigram_lambda) it gives the same scores as BigramNaiveBayesModel.
+
+The n-grams of all orders live in one count store, NgramStore, shaped like a trie: every seen n-gram
+is a node, identified by its prefix's node and its last word, so adding an order adds nodes, not
+another table or counting loop. The counts of all orders are one (2, number of nodes) array.
+"""
+import numpy as np
+
+from naive_bayes import NaiveBayesBase, token_columns, class_log_likelihoods, grow_columns
+from vocabulary import Vocabulary
+
+# Node of an n-gram that is not in the store
+NO_NODE = -1
+
+
+def print_values_ngram(laplaces, lambdas, pos_prior):
+    print(f"N-gram Laplace: {list(laplaces)}")
+    print(f"N-gram Lambda: {list(lambdas)}")
+    print(f"Positive prior: {pos_prior}")
+
+class NgramStore:
+    '''
+    The distinct n-grams of orders 1 and up seen so far, as trie nodes.
+    The key of a node packs its prefix's node and its last word as ((prefix + 1) << 32) | word, with
+    prefix NO_NODE for unigrams (so a unigram's key is its word id). keys is kept sorted with the node
+    of each key in key_nodes, and looking up n-grams is a binary search. Nodes are numbered in order of
+    first appearance and keep their number, so arrays indexed by node only ever grow at the end.
+    '''
+    def __init__(self, keys=None, key_nodes=None, orders=None):
+        self.keys = np.zeros(0, dtype=np.int64) if keys is None else keys
+        self.key_nodes = np.zeros(0, dtype=np.int64) if key_nodes is None else key_nodes
+        # Order of every node
+        self.orders = np.zeros(0, dtype=np.int8) if orders is None else orders
+
+    def __len__(self):
+        return len(self.orders)
+
+    def lookup(self, keys):
+        '''Node of every key, or NO_NODE'''
+        nodes = np.full(len(keys), NO_NODE, dtype=np.int64)
+        if len(self.keys):
+            positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            found = self.keys[positions] == keys
+            nodes[found] = self.key_nodes[positions[found]]
+        return nodes
+
+    def add(self, keys, order):
+        '''Node of every key, adding the missing ones as new nodes of the given order'''
+        nodes = self.lookup(keys)
+        missing = nodes == NO_NODE
+        new_keys, inverse = np.unique(keys[missing], return_inverse=True)
+        new_nodes = np.arange(len(self), len(self) + len(new_keys))
+        nodes[missing] = new_nodes[inverse]
+        positions = np.searchsorted(self.keys, new_keys)
+        self.keys = np.insert(self.keys, positions, new_keys)
+        self.key_nodes = np.insert(self.key_nodes, positions, new_nodes)
+        self.orders = np.append(self.orders, np.full(len(new_keys), order, dtype=np.int8))
+        return nodes
+
+    def nbytes(self):
+        return self.keys.nbytes + self.key_nodes.nbytes + self.orders.nbytes
+
+"""
+Nodes of the n-grams of orders 1..max_order of the documents (see naive_bayes.token_columns), as one
+    (nodes, rows) pair per order: the node of every n-gram within a document and the document it is in.
+    All orders are found in one sweep over the tokens: the n-gram starting at a token is the (n-1)-gram
+    starting there plus one word, so its key comes from the node found for the previous order.
+    With grow, unseen n-grams are added to the store; otherwise they get NO_NODE, and so do all n-grams
+    that extend an unseen one.
+"""
+def ngram_nodes(store, columns, lengths, max_order, grow=False):
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    ends = np.repeat(np.cumsum(lengths), lengths)
+    starts = np.arange(len(columns))
+    prefixes = np.full(len(columns), NO_NODE, dtype=np.int64)
+    result = []
+    for order in range(1, max_order + 1):
+        count = max(len(columns) - order + 1, 0)
+        within = starts[:count] + order <= ends[:count]
+        known = within & ((prefixes[:count] != NO_NODE) | (order == 1))
+        keys = ((prefixes[:count][known] + 1) << 32) | columns[order - 1:order - 1 + count][known]
+        nodes = np.full(count, NO_NODE, dtype=np.int64)
+        nodes[known] = store.add(keys, order) if grow else store.lookup(keys)
+        result.append((nodes[within], rows[:count][within]))
+        prefixes = nodes
+    return result
+
+
+"""
+N-gram mixture model. The order of the model is len(lambdas); laplaces holds one Laplace value per order.
+"""
+class NgramNaiveBayesModel(NaiveBayesBase):
+    def __init__(self, laplaces=(0.5, 1.0), lambdas=(0.55, 0.45), pos_prior=0.5, vocabulary=None):
+        if len(laplaces) != len(lambdas):
+            raise ValueError("laplaces and lambdas need one value per n-gram order")
+        self.laplaces = tuple(laplaces)
+        self.lambdas = tuple(lambdas)
+        self.pos_prior = pos_prior
+        self.vocabulary = Vocabulary() if vocabulary is None else vocabulary
+        self._reset()
+
+    @property
+    def order(self):
+        return len(self.lambdas)
+
+    def _reset(self):
+        self.store = NgramStore()
+        # Row c: how often each node's n-gram occurs in the training documents of label c
+        self.counts = np.zeros((2, 0))
+        self._log_likelihoods = None
+
+    def fit(self, train_set, train_labels):
+        self._reset()
+        return self.partial_fit(train_set, train_labels)
+
+    def partial_fit(self, docs, labels):
+        self.vocabulary.add_docs(docs)
+        columns, lengths = token_columns(docs, self.vocabulary)
+        ngrams = ngram_nodes(self.store, columns, lengths, self.order, grow=True)
+        nodes = np.concatenate([nodes for nodes, _ in ngrams])
+        node_labels = np.array(labels, dtype=np.int64)[np.concatenate([rows for _, rows in ngrams])]
+        counts = [np.bincount(nodes[node_labels == label], minlength=len(self.store)) for label in (0, 1)]
+        self.counts = grow_columns(self.counts, len(self.store)) + counts
+        self._log_likelihoods = None
+        return self
+
+    # Row c: log P(n-gram | label c) for every node among the n-grams of its order, worked out from the current
+    # counts, followed by the value of an unseen n-gram of each order (column len(store) + n - 1 for order n)
+    @property
+    def log_likelihoods(self):
+        if self._log_likelihoods is None:
+            num_nodes = len(self.store)
+            tables = np.zeros((2, num_nodes + self.order))
+            for order, laplace in enumerate(self.laplaces, start=1):
+                in_order = np.flatnonzero(self.store.orders == order)
+                for label, class_counts in enumerate(self.counts):
+                    table = class_log_likelihoods(class_counts[in_order], laplace, len(in_order))
+                    tables[label, in_order] = table[:-1]
+                    tables[label, num_nodes + order - 1] = table[-1]
+            self._log_likelihoods = tables
+        return self._log_likelihoods
+
+    def joint_log_likelihoods(self, docs):
+        tables = self.log_likelihoods
+        columns, lengths = token_columns(docs, self.vocabulary)
+        scores = self.log_priors[:, None]
+        for order, (weight, (nodes, rows)) in enumerate(zip(self.lambdas, ngram_nodes(self.store, columns, lengths,
+                                                                                         self.order)), start=1):
+            entries = np.where(nodes == NO_NODE, len(self.store) + order - 1, nodes)
+            scores = scores + weight * np.array([np.bincount(rows, weights=table[entries], minlength=len(docs))
+                                                 for table in tables])
+        return scores
+
+    def table_bytes(self):
+        return self.store.nbytes() + self.counts.nbytes + self.log_likelihoods.nbytes
+
+    def _header(self):
+        return {"laplaces": list(self.laplaces), "lambdas": list(self.lambdas), "pos_prior": self.pos_prior}
+
+    def _arrays(self):
+        return {
+            "keys": self.store.keys,
+            "key_nodes": self.store.key_nodes,
+            "orders": self.store.orders,
+            "counts": self.counts,
+            "log_likelihoods": self.log_likelihoods,
+        }
+
+    @classmethod
+    def _from_file(cls, header, arrays, vocabulary):
+        model = cls(header["laplaces"], header["lambdas"], header["pos_prior"], vocabulary)
+        model.store = NgramStore(arrays["keys"], arrays["key_nodes"], arrays["orders"])
+        model.counts = arrays["counts"]
+        model._log_likelihoods = arrays["log_likelihoods"]
+        return model
+
+
+"""
+Main function for training and predicting with the n-gram mixture model, like bigram_naive_bayes.bigram_bayes
+    with one Laplace value and one lambda per order.
+"""
+def ngram_bayes(train_set, train_labels, dev_set, laplaces=(0.5, 1.0), lambdas=(0.55, 0.45), pos_prior=0.5, silently=False, vocabulary=None):
+    print_values_ngram(laplaces, lambdas, pos_prior)
+    model = NgramNaiveBayesModel(laplaces, lambdas, pos_prior, vocabulary).fit(train_set, train_labels)
+    if not silently:
+        print(f"N-gram store: {len(model.store)} n-grams, {model.table_bytes() / 2**20:.2f} MB")
+    return model.predict(dev_set).tolist()
@@ -0,0 +1,147 @@
+"""
+Additive disjoint pattern databases (PDBs) for the sliding-tile puzzles in state.py.
+
+Each database covers one group of tiles ("pattern"). It stores, for every placement of
+those tiles, the fewest moves *of pattern tiles* needed to bring them to their goal cells,
+found by a backwards breadth-first search from the goal. Since the groups are disjoint and
+only their own tiles' moves are counted, the values of all groups can be added up and the
+sum is still an admissible (and consistent) heuristic.
+
+Databases are stored on disk as flat byte arrays and memory-mapped when loaded, so they
+are built once and then shared by every later run.
+"""
+import mmap
+import os
+from array import array
+from collections import deque
+
+from state import TILE_BITS, TILE_MASK, get_puzzle_tables, pack_puzzle
+from utils import write_atomically
+
+PDB_DIR = "data/pdb"
+UNSEEN = 255
+
+# Tiles grouped along the rows of the usual goal; groups of 4 keep the 15-puzzle builds to seconds
+DEFAULT_PATTERNS = {
+    3: [(1, 2, 3, 4), (5, 6, 7, 8)],
+    4: [(1, 2, 3), (4, 5, 6, 7), (8, 9, 10, 11), (12, 13, 14, 15)],
+}
+
+# Placements are numbered as base-(size*size) numbers whose i-th digit is the cell of pattern[i]
+def pattern_index(positions, pattern, cells):
+    index = 0
+    for tile in reversed(pattern):
+        index = index * cells + positions[tile]
+    return index
+
+def build_pattern_database(goal, size, pattern):
+    '''
+    goal: packed goal board
+    pattern: tuple of tiles (not the blank) covered by this database
+
+    Return: array('B') of length (size*size)**len(pattern) holding the database value of each
+            placement (UNSEEN for index values that are not a valid placement)
+    '''
+    cells = size * size
+    neighbors = get_puzzle_tables(goal, size).neighbors
+    k = len(pattern)
+
+    goal_cells = {}
+    for p in range(cells):
+        goal_cells[(goal >> (TILE_BITS * p)) & TILE_MASK] = p
+
+    # Abstract states are the pattern cells plus the blank cell, encoded with the blank as the
+    # lowest digit. Moving the blank onto a non-pattern cell is free, swapping it with a pattern
+    # tile costs 1, so this is a 0-1 BFS.
+    def encode(tile_cells, blank):
+        code = 0
+        for cell in reversed(tile_cells):
+            code = code * cells + cell
+        return code * cells + blank
+
+    distance = bytearray([UNSEEN]) * (cells ** (k + 1))
+    start = encode([goal_cells[tile] for tile in pattern], goal_cells[0])
+    distance[start] = 0
+    queue = deque([(0, start)])
+    while queue:
+        d, code = queue.popleft()
+        if d > distance[code]:
+            continue
+        blank = code % cells
+        rest = code // cells
+        tile_cells = []
+        for _ in range(k):
+            rest, cell = divmod(rest, cells)
+            tile_cells.append(cell)
+        for q in neighbors[blank]:
+            if q in tile_cells:
+                moved = list(tile_cells)
+                moved[tile_cells.index(q)] = blank
+                nbr, cost = encode(moved, q), d + 1
+            else:
+                nbr, cost = encode(tile_cells, q), d
+            if cost < distance[nbr]:
+                distance[nbr] = cost
+                if cost == d:
+                    queue.appendleft((cost, nbr))
+                else:
+                    queue.append((cost, nbr))
+
+    # The blank is not part of the pattern, so keep the best value over all blank cells
+    database = array('B', [UNSEEN]) * (cells ** k)
+    for code, d in enumerate(distance):
+        if d != UNSEEN:
+            index = code // cells
+            if d < database[index]:
+                database[index] = d
+    return database
+
+def pattern_database_path(goal, size, pattern, directory=PDB_DIR):
+    name = "-".join(str(tile) for tile in pattern)
+    return os.path.join(directory, f"{size}x{size}_{goal:x}_{name}.pdb")
+
+def load_pattern_database(goal, size, pattern, directory=PDB_DIR):
+    '''
+    Memory-map the database for (goal, size, pattern), building and saving it first if there is
+    no file for it yet. The returned mmap can be indexed like the array from build_pattern_database.
+    '''
+    path = pattern_database_path(goal, size, pattern, directory)
+    if not os.path.exists(path):
+        database = build_pattern_database(goal, size, pattern)
+        os.makedirs(directory, exist_ok=True)
+        write_atomically(path, database.tofile)
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class PatternDatabaseHeuristic:
+    '''
+    Sum of the additive disjoint pattern databases for one goal, usable as the
+    heuristic argument of EightPuzzleState.
+    '''
+    def __init__(self, goal, size, patterns=None, directory=PDB_DIR):
+        goal = pack_puzzle(goal)
+        if patterns is None:
+            patterns = DEFAULT_PATTERNS[size]
+        self.size = size
+        self.patterns = [tuple(pattern) for pattern in patterns]
+        self.databases = [load_pattern_database(goal, size, pattern, directory) for pattern in self.patterns]
+
+    def __call__(self, board):
+        cells = self.size * self.size
+        positions = [0] * cells
+        for p in range(cells):
+            positions[(board >> (TILE_BITS * p)) & TILE_MASK] = p
+        return sum(database[pattern_index(positions, pattern, cells)]
+                   for pattern, database in zip(self.patterns, self.databases))
+
+_heuristic_cache = {}
+
+# Keep one heuristic (and so one set of mappings) per puzzle for the lifetime of the process
+def get_pattern_database_heuristic(goal, size, patterns=None, directory=PDB_DIR):
+    goal = pack_puzzle(goal)
+    key = (goal, size, None if patterns is None else tuple(map(tuple, patterns)), directory)
+    heuristic = _heuristic_cache.get(key)
+    if heuristic is None:
+        heuristic = PatternDatabaseHeuristic(goal, size, patterns, directory)
+        _heuristic_cache[key] = heuristic
+    return heuristic
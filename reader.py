@@ -9,48 +9,143 @@
 """
 This file is responsible for providing functions for reading the files
 """
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from os import listdir
 from nltk.stem.porter import PorterStemmer
 from nltk.tokenize import RegexpTokenizer
 from tqdm import tqdm
 
+from utils import write_atomically
+
 porter_stemmer = PorterStemmer()
 tokenizer = RegexpTokenizer(r'\w+')
 bad_words = {'aed','oed','eed'} # these words fail in nltk stemmer algorithm
-def loadDir(name,stemming,lower_case,silently=False):
+
+# Token lists of already tokenized directories, see loadDir
+TOKEN_CACHE_DIR = "data/token_cache"
+# Bump when the tokenization changes, so older cache files are not used
+TOKEN_CACHE_VERSION = 1
+
+# The vocabulary is heavily repeated, so every word type is only stemmed once (per process)
+@lru_cache(maxsize=None)
+def stem(word):
+    if word in bad_words:
+        return word
+    return porter_stemmer.stem(word)
+
+def tokenize_file(fullname, stemming, lower_case):
+    # \w+ never matches across a line break, so the whole file can be tokenized at once
+    with open(fullname, 'rb') as f:
+        text = f.read().decode(errors='ignore')
+    return tokenize_text(text, stemming, lower_case)
+
+# Same tokens as for a file with this content, e.g. for documents that are scored online
+def tokenize_text(text, stemming, lower_case):
+    if lower_case:
+        text = text.lower()
+    tokens = tokenizer.tokenize(text)
+    if stemming:
+        tokens = [stem(token) for token in tokens]
+    return tokens
+
+def token_cache_path(name, files, stemming, lower_case, cache_dir):
+    # Keyed on the file names, sizes and modification times, so any change to the directory misses the cache
+    key = hashlib.sha256(repr((TOKEN_CACHE_VERSION, os.path.abspath(name), stemming, lower_case)).encode())
+    for f in sorted(files):
+        info = os.stat(name + f)
+        key.update(f"{f}\0{info.st_size}\0{info.st_mtime_ns}\0".encode())
+    return os.path.join(cache_dir, key.hexdigest() + ".pickle")
+
+def loadDir(name,stemming,lower_case,silently=False,workers=1,cache_dir=TOKEN_CACHE_DIR,vocabulary=None):
     # Loads the files in the folder and returns a list of lists of words from
-    # the text in each file
-    X0 = []
-    count = 0
-    for f in tqdm(listdir(name),disable=silently):
-        fullname = name+f
-        text = []
-        with open(fullname, 'rb') as f:
-            for line in f:
-                if lower_case:
-                    line = line.decode(errors='ignore').lower()
-                    text += tokenizer.tokenize(line)
-                    
-                else:
-                    text += tokenizer.tokenize(line.decode(errors='ignore'))
-        if stemming:
-            for i in range(len(text)):
-                if text[i] in bad_words:
-                    continue
-                text[i] = porter_stemmer.stem(text[i])
-        X0.append(text)
-        count = count + 1
+    # the text in each file.
+    # workers > 1 tokenizes the files in a process pool. Unless cache_dir is None, the result is
+    # also saved there and later calls on the unchanged folder just load it.
+    # With a vocabulary.Vocabulary, each file is returned as an array('I') of word ids instead.
+    X0 = tokenizeDir(name, stemming, lower_case, silently, workers, cache_dir)
+    if vocabulary is not None:
+        X0 = [vocabulary.intern(words) for words in X0]
+    return X0
+
+def tokenizeDir(name,stemming,lower_case,silently,workers,cache_dir):
+    files = listdir(name)
+    if cache_dir is not None:
+        cache_path = token_cache_path(name, files, stemming, lower_case, cache_dir)
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+    fullnames = [name + f for f in files]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(fullnames) // (4 * workers))
+            results = executor.map(tokenize_file, fullnames, [stemming] * len(fullnames),
+                                   [lower_case] * len(fullnames), chunksize=chunksize)
+            X0 = list(tqdm(results, total=len(fullnames), disable=silently))
+    else:
+        X0 = [tokenize_file(fullname, stemming, lower_case) for fullname in tqdm(fullnames, disable=silently)]
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_atomically(cache_path, lambda f: pickle.dump(X0, f, protocol=pickle.HIGHEST_PROTOCOL))
     return X0
 
-def load_dataset(train_dir, dev_dir, stemming=False, lower_case=False, silently=True):
+def iterDir(name,stemming,lower_case):
+    # Like loadDir, but yields the words of one file at a time, so the folder is never held in memory
+    for f in listdir(name):
+        yield tokenize_file(name + f, stemming, lower_case)
+
+def iter_dataset(data_dir, stemming=False, lower_case=False):
+    # Yields (words, label) for every file of data_dir/pos/ (label 1) and data_dir/neg/ (label 0), lazily
+    for words in iterDir(data_dir + '/pos/', stemming, lower_case):
+        yield words, 1
+    for words in iterDir(data_dir + '/neg/', stemming, lower_case):
+        yield words, 0
+
+def find_classes(data_dir):
+    # The class names of a dataset: its subfolders, sorted, so that neg/ and pos/ get the labels 0 and 1
+    return sorted(f for f in listdir(data_dir) if os.path.isdir(os.path.join(data_dir, f)))
+
+def iter_labeled_dataset(data_dir, classes, stemming=False, lower_case=False):
+    # Like iter_dataset for any number of classes: the label of a file of data_dir/<class>/ is the index
+    # of its class in classes. Classes without a folder in data_dir have no files.
+    for label, name in enumerate(classes):
+        if os.path.isdir(data_dir + '/' + name):
+            for words in iterDir(data_dir + '/' + name + '/', stemming, lower_case):
+                yield words, label
+
+def load_labeled_dataset(train_dir, dev_dir, stemming=False, lower_case=False, silently=True, workers=1,
+                         cache_dir=TOKEN_CACHE_DIR, vocabulary=None, classes=None):
+    # Like load_dataset for any number of classes, found with find_classes(train_dir) unless given.
+    # Returns X, Y, X_test, Y_test, classes, where the labels are indices into classes.
+    if classes is None:
+        classes = find_classes(train_dir)
+
+    def load(data_dir):
+        X, Y = [], []
+        for label, name in enumerate(classes):
+            if os.path.isdir(data_dir + '/' + name):
+                docs = loadDir(data_dir + '/' + name + '/', stemming, lower_case, silently, workers, cache_dir, vocabulary)
+                X += docs
+                Y += len(docs) * [label]
+        return X, Y
+
+    X, Y = load(train_dir)
+    X_test, Y_test = load(dev_dir)
+    return X, Y, X_test, Y_test, classes
+
+def load_dataset(train_dir, dev_dir, stemming=False, lower_case=False, silently=True, workers=1, cache_dir=TOKEN_CACHE_DIR,
+                 vocabulary=None):
 
-    X0 = loadDir(train_dir + '/pos/',stemming, lower_case, silently)
-    X1 = loadDir(train_dir + '/neg/',stemming, lower_case, silently)
+    X0 = loadDir(train_dir + '/pos/',stemming, lower_case, silently, workers, cache_dir, vocabulary)
+    X1 = loadDir(train_dir + '/neg/',stemming, lower_case, silently, workers, cache_dir, vocabulary)
     X = X0 + X1
     Y = len(X0) * [1] + len(X1) * [0]
 
-    X_test0 = loadDir(dev_dir + '/pos/',stemming, lower_case,silently)
-    X_test1 = loadDir(dev_dir + '/neg/',stemming, lower_case,silently)
+    X_test0 = loadDir(dev_dir + '/pos/',stemming, lower_case,silently, workers, cache_dir, vocabulary)
+    X_test1 = loadDir(dev_dir + '/neg/',stemming, lower_case,silently, workers, cache_dir, vocabulary)
     X_test = X_test0 + X_test1
     Y_test = len(X_test0) * [1] + len(X_test1) * [0]
 
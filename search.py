@@ -1,18 +1,80 @@
-import heapq
-# You do not need any other imports
+import time
+from frontier import HeapqFrontier, make_frontier
+from state import SearchState
 
-def astar_search(starting_state):
+class SearchStats:
+    '''
+    What an instrumented astar_search did:
+        nodes_expanded / nodes_generated: states popped and expanded / successors created
+        reopenings: successors that improved on the distance of an already known state
+        peak_frontier / peak_visited: largest sizes of the frontier and of visited_states
+        successor_time: time in generate_successors() (including incremental heuristic updates)
+        heuristic_time: time in full calculate_heuristic() calls
+        frontier_time: time in frontier pushes and pops
+        total_time: time of the whole search
+        solution_length: number of moves in the returned path (-1 if none was found)
+    '''
+    def __init__(self):
+        self.nodes_expanded = 0
+        self.nodes_generated = 0
+        self.reopenings = 0
+        self.peak_frontier = 0
+        self.peak_visited = 0
+        self.successor_time = 0.0
+        self.heuristic_time = 0.0
+        self.frontier_time = 0.0
+        self.total_time = 0.0
+        self.solution_length = -1
+
+    # b* such that a uniform tree of depth solution_length with branching factor b* has
+    # nodes_generated + 1 nodes: N + 1 = 1 + b* + b*^2 + ... + b*^d
+    def effective_branching_factor(self):
+        depth = self.solution_length
+        if depth <= 0:
+            return 0.0
+        total = self.nodes_generated + 1
+        def tree_size(b):
+            return sum(b ** i for i in range(depth + 1))
+        # tree_size(b) >= b**depth, so b* <= total**(1/depth); bisecting below that bound keeps every
+        # power at most total, where an upper bound of nodes_generated overflows for long solutions
+        low, high = 1.0, max(1.0, total ** (1 / depth))
+        for _ in range(100):
+            mid = (low + high) / 2
+            if tree_size(mid) < total:
+                low = mid
+            else:
+                high = mid
+        return (low + high) / 2
+
+    def to_dict(self):
+        stats = dict(vars(self))
+        stats["effective_branching_factor"] = self.effective_branching_factor()
+        return stats
+
+def astar_search(starting_state, frontier=None, return_stats=False, cache=None):
     '''
     Implementation of A* search algorithm
 
     Input:
         starting_state: an SearchState object
+        frontier: the priority queue to use, either a frontier object or one of the names in
+                  frontier.FRONTIERS (default: a plain heapq). Pass an object to read its
+                  push/pop counters after the search.
+        return_stats: also return a SearchStats for the search (this adds some timing overhead)
+        cache: optional solution_cache.SolutionCache; cached goal distances are used as an exact
+               heuristic, the search stops at the first cached state it pops, and the solution
+               found is added to the cache
 
     Return:
         A path consisting of a list of SearchState states
         The first state should be starting_state
         The last state should have state.goal_test()() == True
+        With return_stats, a (path, SearchStats) pair instead
     '''
+    if return_stats:
+        stats = SearchStats()
+        path = _astar_search_with_stats(starting_state, frontier, stats, cache)
+        return path, stats
     # we will use this visited_states dictionary to serve multiple purposes
     # - visited_states[state] = (parent_state, distance_of_state_from_start)
     #   - keep track of which states have been visited by the search algorithm
@@ -22,34 +84,117 @@ def astar_search(starting_state):
     # NOTE: we can hash states because the __hash__/__eq__ method of SearchState is implemented
     visited_states = {starting_state: (None, 0)}
 
-    # The frontier is a priority queue
-    # You can pop from the queue using "heapq.heappop(frontier)"
-    # You can push onto the queue using "heapq.heappush(frontier, state)"
-    # NOTE: states are ordered because the __lt__ method of SearchState is implemented
-    frontier = []
-    heapq.heappush(frontier, starting_state)
-    
-    # TODO(III): implement the rest of the A* search algorithm
-    # HINTS:
-    #   - add new states to the frontier by calling state.generate_successors()
-    #   - check whether you've finished the search by calling state.is_goal()
-    #       - then call backtrack(visited_states, state)...
-    # Your code here ---------------
+    # The frontier is a priority queue ordered by the __lt__ method of SearchState.
+    # Pushing a state that is already queued replaces its entry, so each state is queued once.
+    if frontier is None:
+        frontier = HeapqFrontier()
+    elif isinstance(frontier, str):
+        frontier = make_frontier(frontier)
+    # state -> cached moves to the goal, for the states found in the cache
+    cached_moves = {}
+    if cache is not None:
+        _check_cache(starting_state, cache, cached_moves)
+    frontier.push(starting_state)
+
+    # States that have been expanded. Both heuristics are consistent, so the first time a state
+    # is popped its path is already the shortest one and it never has to be expanded again.
+    closed_states = set()
+
     while frontier:
-        current = heapq.heappop(frontier)
-        if current.goal_test() == True:
-            return reconstruct_path(visited_states, current)
-        current_g = visited_states[current][1]
+        current = frontier.pop()
+        if current.goal_test() or current in cached_moves:
+            return _finish_path(starting_state, visited_states, current, cache, cached_moves)
+        closed_states.add(current)
         for neighbor in current.generate_successors():
-            g_new = current_g + neighbor.path_cost
+            if neighbor in closed_states:
+                continue
+            # path_cost of a successor is already the parent's distance plus the move cost
+            g_new = neighbor.path_cost
             previous = visited_states.get(neighbor)
-            if (previous is None or g_new < previous[1]):
+            if previous is None or g_new < previous[1]:
                 visited_states[neighbor] = (current, g_new)
-                heapq.heappush(frontier, neighbor)
-    # ------------------------------
+                if cache is not None:
+                    _check_cache(neighbor, cache, cached_moves)
+                frontier.push(neighbor)
     # if you do not find the goal return an empty list
     return []
 
+# A state found in the cache gets its exact goal distance as heuristic. Such a state is never
+# expanded (the search stops when it is popped), so successors never derive an incremental
+# heuristic from the overwritten value.
+def _check_cache(state, cache, cached_moves):
+    remaining = cache.get(state)
+    if remaining is not None:
+        state.heuristic_value = len(remaining)
+        cached_moves[state] = remaining
+
+# Path to current, completed from the cache if current is a cached state, and added to the cache
+def _finish_path(starting_state, visited_states, current, cache, cached_moves):
+    path = reconstruct_path(visited_states, current)
+    if starting_state.symmetry:
+        # visited_states identifies symmetric states, so consecutive states on the path may be in
+        # different orientations; redo it with successors of the start's orientation
+        path = follow_path([starting_state], path[1:])
+    if cache is not None:
+        remaining = cached_moves.get(current)
+        if remaining:
+            cache.extend_path(path, remaining)
+        cache.add_path(path)
+    return path
+
+# Same search as astar_search, timing each part and keeping counts in stats
+def _astar_search_with_stats(starting_state, frontier, stats, cache):
+    clock = time.perf_counter
+    search_start = clock()
+    # calculate_heuristic() runs inside state constructors, so SearchState times it for us
+    SearchState.heuristic_timer = stats
+    try:
+        visited_states = {starting_state: (None, 0)}
+        if frontier is None:
+            frontier = HeapqFrontier()
+        elif isinstance(frontier, str):
+            frontier = make_frontier(frontier)
+        cached_moves = {}
+        if cache is not None:
+            _check_cache(starting_state, cache, cached_moves)
+        frontier.push(starting_state)
+        closed_states = set()
+        path = []
+        while frontier:
+            stats.peak_frontier = max(stats.peak_frontier, len(frontier))
+            start = clock()
+            current = frontier.pop()
+            stats.frontier_time += clock() - start
+            if current.goal_test() or current in cached_moves:
+                path = _finish_path(starting_state, visited_states, current, cache, cached_moves)
+                break
+            closed_states.add(current)
+            stats.nodes_expanded += 1
+            start = clock()
+            successors = current.generate_successors()
+            stats.successor_time += clock() - start
+            stats.nodes_generated += len(successors)
+            for neighbor in successors:
+                if neighbor in closed_states:
+                    continue
+                g_new = neighbor.path_cost
+                previous = visited_states.get(neighbor)
+                if previous is None or g_new < previous[1]:
+                    if previous is not None:
+                        stats.reopenings += 1
+                    visited_states[neighbor] = (current, g_new)
+                    if cache is not None:
+                        _check_cache(neighbor, cache, cached_moves)
+                    start = clock()
+                    frontier.push(neighbor)
+                    stats.frontier_time += clock() - start
+            stats.peak_visited = max(stats.peak_visited, len(visited_states))
+    finally:
+        SearchState.heuristic_timer = None
+    stats.solution_length = len(path) - 1
+    stats.total_time = clock() - search_start
+    return path
+
 # TODO(III): implement backtrack method, to be called by astar_search upon reaching goal_state
 # Go backwards through the pointers in visited_states until you reach the starting state
 # NOTE: the parent of the starting state is None
@@ -62,3 +207,182 @@ def reconstruct_path(visited_states, goal_state):
         current = visited_states[current][0]
     # ------------------------------
     return path
+
+# Memory-bounded search ------------------------------------------------------------------------------------
+# Both searches below only keep the current path (plus the successors of the states on it) in memory,
+# so memory grows with the solution depth instead of with the size of the frontier. The price is
+# that states are re-generated many times instead of being looked up in visited_states.
+# States may define generate_tree_successors() to prune successors that only lead to paths
+# already covered in another order (see LightsOutState); it is used instead of generate_successors().
+
+def _tree_successors(state):
+    generate = getattr(state, "generate_tree_successors", None)
+    return generate() if generate is not None else state.generate_successors()
+
+def _f_value(state):
+    return state.path_cost + state.heuristic_value
+
+def ida_star_search(starting_state):
+    '''
+    Implementation of iterative deepening A* (IDA*)
+
+    Input:
+        starting_state: an SearchState object
+
+    Return:
+        A path consisting of a list of SearchState states, in the same format as astar_search
+    '''
+    # Depth-first searches bounded by f = g + h; each iteration raises the bound to the smallest
+    # f value that exceeded it in the previous one
+    path = [starting_state]
+    on_path = {starting_state}
+    bound = _f_value(starting_state)
+    while True:
+        next_bound = _ida_star_visit(path, on_path, bound)
+        if next_bound is None:
+            return path
+        if next_bound == float("inf"):
+            return []
+        bound = next_bound
+
+# Return None if the goal was found (path then ends in it), else the smallest f value above bound
+def _ida_star_visit(path, on_path, bound):
+    current = path[-1]
+    f = _f_value(current)
+    if f > bound:
+        return f
+    if current.goal_test():
+        return None
+    next_bound = float("inf")
+    for neighbor in _tree_successors(current):
+        # Skip states already on the path, otherwise reversible moves make us go round in circles
+        if neighbor in on_path:
+            continue
+        path.append(neighbor)
+        on_path.add(neighbor)
+        result = _ida_star_visit(path, on_path, bound)
+        if result is None:
+            return None
+        next_bound = min(next_bound, result)
+        on_path.remove(neighbor)
+        path.pop()
+    return next_bound
+
+def rbfs_search(starting_state):
+    '''
+    Implementation of recursive best-first search (RBFS)
+
+    Input:
+        starting_state: an SearchState object
+
+    Return:
+        A path consisting of a list of SearchState states, in the same format as astar_search
+    '''
+    path = [starting_state]
+    on_path = {starting_state}
+    found, _ = _rbfs_visit(path, on_path, _f_value(starting_state), float("inf"))
+    return path if found else []
+
+# Return (found, backed-up f value of path[-1]); when found, path ends in the goal
+def _rbfs_visit(path, on_path, stored_f, f_limit):
+    current = path[-1]
+    if current.goal_test():
+        return True, stored_f
+    # Each entry is [stored f, generation order, state]; a child's stored f is never below its
+    # parent's, so values backed up from earlier, abandoned visits are carried down
+    children = [[max(_f_value(neighbor), stored_f), i, neighbor]
+                for i, neighbor in enumerate(_tree_successors(current)) if neighbor not in on_path]
+    if not children:
+        return False, float("inf")
+    while True:
+        children.sort(key=lambda child: (child[0], child[1]))
+        best = children[0]
+        if best[0] > f_limit:
+            return False, best[0]
+        alternative = children[1][0] if len(children) > 1 else float("inf")
+        path.append(best[2])
+        on_path.add(best[2])
+        found, best[0] = _rbfs_visit(path, on_path, best[0], min(f_limit, alternative))
+        if found:
+            return True, best[0]
+        on_path.remove(best[2])
+        path.pop()
+
+# Bidirectional search -------------------------------------------------------------------------------------
+
+def bidirectional_search(starting_state, goal_state=None, frontier="heapq"):
+    '''
+    Implementation of bidirectional A* (front-to-end: each direction uses the heuristic towards its own target)
+
+    Input:
+        starting_state: an SearchState object
+        goal_state: the state to search backwards from, whose target is starting_state
+                    (default: starting_state.reversed_problem())
+        frontier: name of the frontier.FRONTIERS queue used in each direction
+
+    Return:
+        A path consisting of a list of SearchState states, in the same format as astar_search
+    '''
+    if starting_state.goal_test():
+        return [starting_state]
+    if starting_state.symmetry:
+        # Each direction would pick canonical states relative to its own target, so states from
+        # the two searches could not be compared
+        raise ValueError("bidirectional_search does not support symmetry reduction")
+    if goal_state is None:
+        goal_state = starting_state.reversed_problem()
+
+    # One visited_states / frontier / closed set per direction, as in astar_search
+    visited = [{starting_state: (None, 0)}, {goal_state: (None, 0)}]
+    frontiers = [make_frontier(frontier), make_frontier(frontier)]
+    closed = [set(), set()]
+    frontiers[0].push(starting_state)
+    frontiers[1].push(goal_state)
+
+    # Cost of the best start-goal path seen so far, and the state where its two halves meet
+    best_cost = float("inf")
+    meeting_state = None
+    while frontiers[0] and frontiers[1]:
+        # With consistent heuristics, no path through a state still in a frontier can be shorter
+        # than that frontier's smallest f value, so stop once the best path is no longer than either
+        f_min = max(_f_value(frontiers[0].peek()), _f_value(frontiers[1].peek()))
+        if best_cost <= f_min:
+            break
+        # Expand the direction with the smaller frontier
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        other_visited = visited[1 - side]
+        current = frontiers[side].pop()
+        closed[side].add(current)
+        for neighbor in current.generate_successors():
+            if neighbor in closed[side]:
+                continue
+            g_new = neighbor.path_cost
+            previous = visited[side].get(neighbor)
+            if previous is None or g_new < previous[1]:
+                visited[side][neighbor] = (current, g_new)
+                frontiers[side].push(neighbor)
+                other = other_visited.get(neighbor)
+                if other is not None and g_new + other[1] < best_cost:
+                    best_cost = g_new + other[1]
+                    meeting_state = neighbor
+
+    if meeting_state is None:
+        return []
+    # The forward half runs from the start to meeting_state and the backward half from the goal to
+    # meeting_state. meeting_state may have been created by the backward search, so the whole path
+    # is walked again with forward successors.
+    forward_half = reconstruct_path(visited[0], meeting_state)
+    backward_half = reconstruct_path(visited[1], meeting_state)
+    return follow_path([starting_state], forward_half[1:] + backward_half[::-1][1:])
+
+def follow_path(path, states):
+    '''
+    Extend path (a list of states ending in a forward-search state) along states, a list of
+    states equal to successive successors of path[-1] but possibly created by another search
+    (e.g. the backward half of a bidirectional search) or, with symmetry, in another orientation.
+    Each step is replaced by the matching successor of the previous state, so path_cost,
+    orientation and goal_test() are relative to the start.
+    '''
+    for target in states:
+        path.append(next(neighbor for neighbor in path[-1].generate_successors() if neighbor == target))
+    return path
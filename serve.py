@@ -0,0 +1,278 @@
+"""
+Online scoring server for the trained Naive Bayes models.
+
+Loads a model file written by the save() method of any of the models once (the
+tables are memory mapped, see model_io) and scores documents as they arrive, tokenized exactly
+like the training data by reader.tokenize_text, with the stemming and lowercase settings that
+mp1.py/mp2.py --save_model record in the model file. --stemming/--lowercase are only needed for
+model files without them; the server refuses to start if they contradict the recorded settings.
+
+Requests are queued and scored together in micro-batches: a batch is scored as soon as it holds
+--max_batch documents or --max_delay milliseconds after its first document arrived, so one matrix
+product serves many requests.
+
+Two front ends, both with the same batcher and counters:
+
+    HTTP (default)  POST /score with the raw document as the body; the response is a JSON object
+                    {"label": 0 or 1, "log_odds": ..., "probability": P(positive)}, or for a
+                    MulticlassNaiveBayesModel {"label": class index, "class": class name,
+                    "probability": P(class)} for the most likely class.
+                    GET /stats returns the counters as JSON. Connections are kept alive.
+    --stdin         one document per line on stdin, one JSON result per line on stdout.
+
+The counters (requests, batches, p50/p99 latency over the last --window requests, throughput)
+are also printed to stderr every --report seconds.
+
+Examples:
+    python serve.py --model nb.model --port 8440
+    python serve.py --model bigram.model --max_batch 128 --max_delay 1
+    echo "a wonderful, moving film" | python serve.py --model nb.model --stdin
+"""
+import argparse
+import asyncio
+import json
+import math
+import signal
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+import reader
+from model_io import load_model_file
+from naive_bayes import NaiveBayesModel
+from bigram_naive_bayes import BigramNaiveBayesModel
+from hashed_naive_bayes import HashedNaiveBayesModel
+from ngram_naive_bayes import NgramNaiveBayesModel
+from multiclass_naive_bayes import MulticlassNaiveBayesModel
+
+MODEL_CLASSES = {"NaiveBayesModel": NaiveBayesModel, "BigramNaiveBayesModel": BigramNaiveBayesModel,
+                 "HashedNaiveBayesModel": HashedNaiveBayesModel, "NgramNaiveBayesModel": NgramNaiveBayesModel,
+                 "MulticlassNaiveBayesModel": MulticlassNaiveBayesModel}
+
+
+def load_model(path):
+    '''Load a model file of any of the model classes'''
+    header, _ = load_model_file(path)
+    model_class = MODEL_CLASSES.get(header.get("model"))
+    if model_class is None:
+        raise ValueError(f"{path} does not hold a Naive Bayes model")
+    return model_class.load(path)
+
+def tokenization(model, stemming=None, lowercase=None):
+    '''
+    (stemming, lowercase) to tokenize the documents for model with: the settings recorded in its file, or
+    for a model saved without them the given ones (None for False). Settings that contradict the model's
+    raise ValueError, as the model would then score every document with words it was not trained on.
+    '''
+    if model.tokenization is None:
+        return bool(stemming), bool(lowercase)
+    for name, value in (("stemming", stemming), ("lowercase", lowercase)):
+        if value is not None and value != model.tokenization[name]:
+            raise ValueError(f"the model was trained with {name} {model.tokenization[name]}, not {value}")
+    return model.tokenization["stemming"], model.tokenization["lowercase"]
+
+class ServerStats:
+    def __init__(self, window=10000):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=window)
+
+    def record_batch(self, latencies):
+        self.requests += len(latencies)
+        self.batches += 1
+        self.latencies.extend(latencies)
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started
+        if self.latencies:
+            p50, p99 = np.percentile(np.fromiter(self.latencies, dtype=np.float64), [50, 99]) * 1000
+        else:
+            p50 = p99 = float("nan")
+        return {"requests": self.requests, "batches": self.batches,
+                "mean_batch": self.requests / self.batches if self.batches else 0.0,
+                "p50_ms": float(p50), "p99_ms": float(p99),
+                "requests_per_second": self.requests / elapsed if elapsed > 0 else 0.0}
+
+class MicroBatcher:
+    '''
+    Collects documents from concurrent callers of score() and scores them max_batch at a time.
+    Scoring runs on the event loop: it is a short numpy computation, and handing it to a thread
+    would only add latency under the GIL.
+    '''
+    def __init__(self, model, stemming, lower_case, max_batch=64, max_delay=0.002, stats=None):
+        self.model = model
+        self.stemming = stemming
+        self.lower_case = lower_case
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.stats = stats if stats is not None else ServerStats()
+        self.queue = asyncio.Queue()
+
+    async def score(self, text):
+        '''Return the result (see score_results) for one document'''
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, time.perf_counter(), future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+            self.score_batch(batch)
+
+    def score_batch(self, batch):
+        docs = [reader.tokenize_text(text, self.stemming, self.lower_case) for text, _, _ in batch]
+        try:
+            results = score_results(self.model, docs)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        done = time.perf_counter()
+        for (_, received, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+        self.stats.record_batch([done - received for _, received, _ in batch])
+
+def score_results(model, docs):
+    '''The response object of every document: the log-odds for a two-class model, the best class for a multiclass one'''
+    if isinstance(model, MulticlassNaiveBayesModel):
+        log_proba = model.predict_log_proba(docs)
+        labels = np.argmax(log_proba, axis=1)
+        return [{"label": int(label), "class": model.classes[label], "probability": math.exp(row[label])}
+                for label, row in zip(labels, log_proba)]
+    results = []
+    for log_odds in model.log_odds(docs).tolist():
+        probability = 1 / (1 + math.exp(-log_odds)) if log_odds > -700 else 0.0
+        results.append({"label": int(log_odds > 0), "log_odds": log_odds, "probability": probability})
+    return results
+
+async def handle_http(batcher, client_reader, client_writer):
+    try:
+        while True:
+            request_line = await client_reader.readline()
+            if not request_line:
+                break
+            method, target, version = request_line.decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await client_reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await client_reader.readexactly(int(headers.get("content-length", 0)))
+
+            if method == "POST" and target == "/score":
+                status, content = "200 OK", json.dumps(await batcher.score(body.decode(errors="ignore")))
+            elif method == "GET" and target == "/stats":
+                status, content = "200 OK", json.dumps(batcher.stats.snapshot())
+            else:
+                status, content = "404 Not Found", json.dumps({"error": f"no route for {method} {target}"})
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+            content = content.encode()
+            client_writer.write(f"{version} {status}\r\nContent-Type: application/json\r\n"
+                                f"Content-Length: {len(content)}\r\n"
+                                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + content)
+            await client_writer.drain()
+            if not keep_alive:
+                break
+    except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        client_writer.close()
+
+async def serve_stdin(batcher):
+    loop = asyncio.get_running_loop()
+    pending = deque()
+    # Lines are read in a thread so that several of them can wait in the batcher at once
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        pending.append(asyncio.ensure_future(batcher.score(line)))
+        while pending and pending[0].done():
+            print(json.dumps(pending.popleft().result()), flush=True)
+    for future in pending:
+        print(json.dumps(await future), flush=True)
+
+async def report(stats, interval):
+    while True:
+        await asyncio.sleep(interval)
+        snapshot = stats.snapshot()
+        print(f"requests {snapshot['requests']}  batches {snapshot['batches']}  mean batch {snapshot['mean_batch']:.1f}  "
+              f"p50 {snapshot['p50_ms']:.2f} ms  p99 {snapshot['p99_ms']:.2f} ms  "
+              f"{snapshot['requests_per_second']:.0f} req/s", file=sys.stderr)
+
+async def main(args):
+    # Stop like on Ctrl-C, so the final counters are printed
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    model = load_model(args.model)
+    try:
+        stemming, lowercase = tokenization(model, args.stemming, args.lowercase)
+    except ValueError as e:
+        print(f"Not serving {args.model}: {e}", file=sys.stderr)
+        return
+    batcher = MicroBatcher(model, stemming, lowercase, args.max_batch, args.max_delay / 1000, ServerStats(args.window))
+    tasks = [asyncio.ensure_future(batcher.run())]
+    if args.report:
+        tasks.append(asyncio.ensure_future(report(batcher.stats, args.report)))
+    try:
+        if args.stdin:
+            await serve_stdin(batcher)
+        else:
+            server = await asyncio.start_server(lambda r, w: handle_http(batcher, r, w), args.host, args.port)
+            print(f"Serving {type(model).__name__} from {args.model} on http://{args.host}:{args.port}", file=sys.stderr)
+            async with server:
+                await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        snapshot = batcher.stats.snapshot()
+        print(json.dumps(snapshot), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='CS440 MP1/MP2 Naive Bayes scoring server')
+    parser.add_argument('--model', dest='model', type=str, required=True,
+                        help='Model file written by the save() method of a model, e.g. with mp1.py/mp2.py --save_model')
+    parser.add_argument('--stemming', dest="stemming", action='store_true', default=None,
+                        help='Use porter stemmer (default: as recorded in the model file; must match it)')
+    parser.add_argument('--lowercase', dest="lowercase", action='store_true', default=None,
+                        help='Convert all word to lower case (default: as recorded in the model file; must match it)')
+    parser.add_argument('--stdin', dest="stdin", action='store_true',
+                        help='Score the lines of stdin instead of serving HTTP')
+    parser.add_argument('--host', dest="host", type=str, default="127.0.0.1",
+                        help='Address to listen on')
+    parser.add_argument('--port', dest="port", type=int, default=8440,
+                        help='Port to listen on')
+    parser.add_argument('--max_batch', dest="max_batch", type=int, default=64,
+                        help='Largest number of documents scored together')
+    parser.add_argument('--max_delay', dest="max_delay", type=float, default=2.0,
+                        help='Milliseconds a document waits for others to fill its batch')
+    parser.add_argument('--window', dest="window", type=int, default=10000,
+                        help='Number of recent requests the latency percentiles are computed over')
+    parser.add_argument('--report', dest="report", type=float, default=10.0,
+                        help='Seconds between counter reports on stderr (0 to disable)')
+
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -0,0 +1,116 @@
+"""
+Solution cache (transposition table) shared between searches.
+
+Every state on an optimal path to the goal has a known exact goal distance, and the rest of
+the path is a known optimal continuation. SolutionCache remembers both for the states of the
+paths it is given, keyed on SearchState.state_key(). astar_search uses it as an exact
+heuristic for cached states and stops as soon as it pops one, finishing the path from the cache.
+
+The continuation is stored as the state keys of the rest of the path: all entries of one path
+share a single tuple of keys and only store their offset into it. Keys are canonical when
+symmetry reduction is on, so a continuation can be followed from any orientation of a state.
+Entries are kept in memory in LRU order within a byte budget. The paths can also be written
+through to an on-disk shelve so later runs start with a warm cache: the shelve holds every path
+once, as its key tuple, and opening the cache loads them all, so lookups never go to disk.
+"""
+import shelve
+import sys
+from collections import OrderedDict
+
+# Shelve key prefix of the stored paths, numbered in the order they were added
+PATH_PREFIX = "path:"
+# Rough per-entry cost of the OrderedDict itself, on top of the key and value objects
+ENTRY_OVERHEAD = 100
+
+
+# The key tuple of a path is shared by all its entries, so each one is charged an equal share of it
+def _entry_size(key, entry):
+    path_keys, _ = entry
+    size = sys.getsizeof(key) + sys.getsizeof(entry) + sys.getsizeof(path_keys) // len(path_keys) + ENTRY_OVERHEAD
+    if isinstance(key, tuple):
+        size += sum(sys.getsizeof(part) for part in key)
+    return size
+
+class SolutionCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, path=None):
+        '''
+        max_bytes: memory budget for the in-memory entries; least recently used ones are evicted beyond it
+        path: optional shelve file to also keep every path on disk; the paths already in it are loaded now
+        '''
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.store = shelve.open(path) if path is not None else None
+        self.stored_paths = 0
+        if self.store is not None:
+            for name in self.store:
+                if name.startswith(PATH_PREFIX):
+                    self._add_keys(self.store[name])
+                    self.stored_paths += 1
+
+    def get(self, state):
+        '''
+        Return the state keys of an optimal continuation from state to the goal, state excluded
+        (so its length is the exact goal distance), or None if state is not cached.
+        '''
+        key = state.state_key()
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        path_keys, offset = entry
+        return path_keys[offset + 1:]
+
+    def add_path(self, path):
+        '''
+        Remember the goal distance and continuation of every state on path.
+        path must be an optimal solution (e.g. from astar_search), otherwise the cached
+        distances are not exact and later searches may return longer paths.
+        '''
+        if not path or not path[-1].goal_test():
+            return
+        path_keys = tuple(state.state_key() for state in path)
+        if self._add_keys(path_keys) and self.store is not None:
+            self.store[f"{PATH_PREFIX}{self.stored_paths}"] = path_keys
+            self.stored_paths += 1
+
+    def extend_path(self, path, remaining):
+        '''Append to path the successors of path[-1] whose keys are remaining, as returned by get()'''
+        for key in remaining:
+            path.append(next(state for state in path[-1].generate_successors() if state.state_key() == key))
+        return path
+
+    # Enter every key of the path that is not cached with a continuation at least as short; return whether any was
+    def _add_keys(self, path_keys):
+        added = False
+        for offset, key in enumerate(path_keys):
+            known = self.entries.get(key)
+            if known is not None and len(known[0]) - known[1] <= len(path_keys) - offset:
+                continue
+            self._put(key, (path_keys, offset))
+            added = True
+        return added
+
+    def _put(self, key, entry):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= _entry_size(key, old)
+        self.entries[key] = entry
+        self.bytes += _entry_size(key, entry)
+        while self.bytes > self.max_bytes and self.entries:
+            old_key, old_entry = self.entries.popitem(last=False)
+            self.bytes -= _entry_size(old_key, old_entry)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
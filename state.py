@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-import copy # NOTE: you may want to use copy when creating neighbors for EightPuzzle...
+from time import perf_counter
 from typing import List
 
 
@@ -13,7 +13,20 @@ global_index = count()
 #                Specifically, your search will need to call is_goal() and generate_successors().
 class SearchState(ABC):
     """Abstract base class for all search states"""
-    def __init__(self, current_state, target_state, path_cost=0, enable_heuristic=True):
+    __slots__ = ('current_state', 'target_state', 'creation_order', 'path_cost',
+                 'enable_heuristic', 'heuristic_value')
+
+    # When set to an object with a heuristic_time attribute (e.g. search.SearchStats),
+    # the time spent in calculate_heuristic() is added to it
+    heuristic_timer = None
+
+    # True when states that are rotations/reflections of each other hash and compare equal
+    # (see the Symmetry section below); searches then map their path back to the start's orientation
+    symmetry = False
+
+    # heuristic_value: if given, h(n) already worked out by the caller (e.g. updated incrementally
+    #                  from the parent in generate_successors), so calculate_heuristic() is skipped
+    def __init__(self, current_state, target_state, path_cost=0, enable_heuristic=True, heuristic_value=None):
         self.current_state = current_state
         self.target_state = target_state
         # Unique identifier for tie-breaking in priority queue
@@ -21,10 +34,18 @@ class SearchState(ABC):
         # g(n) - actual cost from start to current state
         self.path_cost = path_cost
         self.enable_heuristic = enable_heuristic
-        if enable_heuristic:
-            self.heuristic_value = self.calculate_heuristic()
-        else:
+        if not enable_heuristic:
             self.heuristic_value = 0
+        elif heuristic_value is None:
+            timer = SearchState.heuristic_timer
+            if timer is None:
+                self.heuristic_value = self.calculate_heuristic()
+            else:
+                start = perf_counter()
+                self.heuristic_value = self.calculate_heuristic()
+                timer.heuristic_time += perf_counter() - start
+        else:
+            self.heuristic_value = heuristic_value
 
     # Generate all valid successor states from current state
     @abstractmethod
@@ -36,6 +57,17 @@ class SearchState(ABC):
     def goal_test(self):
         pass
     
+    # Hashable key identifying this state within its problem (board, goal and problem variant),
+    # for tables shared between searches such as solution_cache.SolutionCache
+    def state_key(self):
+        return (type(self).__name__, self.current_state, self.target_state)
+
+    # Return a state for the reversed problem: it starts at this state's goal and its target is
+    # this state. Both puzzles have reversible moves, so it can be searched with the usual
+    # generate_successors(); used by bidirectional search.
+    def reversed_problem(self):
+        raise NotImplementedError(f"{type(self).__name__} does not support searching backwards")
+
     # Calculate heuristic estimate h(n) from current state to goal
     @abstractmethod
     def calculate_heuristic(self):
@@ -62,61 +94,204 @@ class SearchState(ABC):
     def __eq__(self, other_state):
         pass
     
+# Symmetry -------------------------------------------------------------------------------------------------
+# With symmetry enabled, a state hashes and compares by a canonical representative of all its
+# rotations/reflections that leave the goal (and the moves) unchanged, so visited_states and the
+# solution cache hold one entry per class of equivalent states instead of up to 8.
+
+def board_symmetries(rows, cols):
+    '''
+    Cell permutations of the rotations and reflections mapping a rows x cols board onto itself
+    (7 for a square board, 3 otherwise; the identity is left out). perm[p] is where cell p goes.
+    '''
+    maps = [lambda r, c: (r, cols - 1 - c),
+            lambda r, c: (rows - 1 - r, c),
+            lambda r, c: (rows - 1 - r, cols - 1 - c)]
+    if rows == cols:
+        maps += [lambda r, c: (c, r),
+                 lambda r, c: (cols - 1 - c, rows - 1 - r),
+                 lambda r, c: (c, rows - 1 - r),
+                 lambda r, c: (cols - 1 - c, r)]
+    perms = []
+    for f in maps:
+        perm = []
+        for p in range(rows * cols):
+            r, c = f(*divmod(p, cols))
+            perm.append(r * cols + c)
+        perms.append(tuple(perm))
+    return perms
+
+# Permuting the bits of a packed LightsOut board one byte at a time: tables[k][v] is the
+# permuted image of the bits of value v placed in byte k
+def _bit_permutation_tables(perm):
+    tables = []
+    for start in range(0, len(perm), 8):
+        table = []
+        for value in range(256):
+            image = 0
+            for bit in range(min(8, len(perm) - start)):
+                if (value >> bit) & 1:
+                    image |= 1 << perm[start + bit]
+            table.append(image)
+        tables.append(tuple(table))
+    return tuple(tables)
+
+def permute_bits(board, tables):
+    image = 0
+    shift = 0
+    for table in tables:
+        image |= table[(board >> shift) & 0xFF]
+        shift += 8
+    return image
+
+_lights_out_symmetry_cache = {}
+
+def get_lights_out_symmetries(rows, cols, goal):
+    '''
+    Byte tables (see permute_bits) of the board symmetries that leave goal unchanged. Both
+    toggle patterns look the same under every rotation and reflection, so those are all valid.
+    '''
+    key = (rows, cols, goal)
+    symmetries = _lights_out_symmetry_cache.get(key)
+    if symmetries is None:
+        symmetries = tuple(tables for tables in map(_bit_permutation_tables, board_symmetries(rows, cols))
+                           if permute_bits(goal, tables) == goal)
+        _lights_out_symmetry_cache[key] = symmetries
+    return symmetries
+
 # LightsOut ------------------------------------------------------------------------------------------------
 
-# State: List[List[{0, 1}]] of size m * n
+# Offsets of the cells flipped by a single toggle, for the original ("+") and cross ("X") patterns
+PLUS_OFFSETS = [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]
+CROSS_OFFSETS = [(0, 0), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+# Toggle masks only depend on the board shape and pattern, so build them once and share them
+_toggle_mask_cache = {}
+
+def get_toggle_masks(rows, cols, cross_pattern=False):
+    '''
+    Return a tuple of m*n integers, where entry r*cols + c is the XOR mask applied
+    to the packed board when cell (r, c) is toggled.
+    '''
+    key = (rows, cols, cross_pattern)
+    masks = _toggle_mask_cache.get(key)
+    if masks is None:
+        offsets = CROSS_OFFSETS if cross_pattern else PLUS_OFFSETS
+        masks = []
+        for row in range(rows):
+            for col in range(cols):
+                mask = 0
+                for dr, dc in offsets:
+                    r, c = row + dr, col + dc
+                    if 0 <= r < rows and 0 <= c < cols:
+                        mask |= 1 << (r * cols + c)
+                masks.append(mask)
+        masks = tuple(masks)
+        _toggle_mask_cache[key] = masks
+    return masks
+
+# Bit r*cols + c of the packed board holds cell (r, c)
+def pack_grid(grid):
+    if isinstance(grid, int):
+        return grid
+    cols = len(grid[0])
+    board = 0
+    for r, row in enumerate(grid):
+        for c, light in enumerate(row):
+            if light:
+                board |= 1 << (r * cols + c)
+    return board
+
+def unpack_grid(board, rows, cols):
+    return [[(board >> (r * cols + c)) & 1 for c in range(cols)] for r in range(rows)]
+
+# State: List[List[{0, 1}]] of size m * n, stored packed into a single integer
 # Goal: List[List[{0}]] of size m * n (all lights turn off)
 class LightsOutState(SearchState):
-    def __init__(self, state, goal, path_cost, enable_heuristic, cross_pattern=False):
-        super().__init__(state, goal, path_cost, enable_heuristic)
+    __slots__ = ('shape', 'cross_pattern', 'toggle_masks', 'lights_wrong', 'last_toggle', 'symmetry', 'key_board')
+
+    def __init__(self, state, goal, path_cost, enable_heuristic, cross_pattern=False, shape=None, lights_wrong=None,
+                 last_toggle=-1, symmetry=False):
+        '''
+        state: m x n grid of 0/1, or an already packed board (then shape must be given)
+        goal: m x n goal grid (or packed board), normally all zeros
+        shape: (rows, cols) of the board, inferred from state when it is a grid
+        lights_wrong: number of lights that differ between state and goal, if already known (e.g. updated
+                      from the parent)
+        last_toggle: row-major index of the toggle that produced this state from its parent (-1 for none)
+        symmetry: identify boards that are rotations/reflections of each other
+        '''
+        if shape is None:
+            shape = (len(state), len(state[0]))
+        board = pack_grid(state)
+        self.shape = shape
         self.cross_pattern = cross_pattern
+        self.toggle_masks = get_toggle_masks(shape[0], shape[1], cross_pattern)
+        self.last_toggle = last_toggle
+        goal = pack_grid(goal)
+        self.lights_wrong = (board ^ goal).bit_count() if lights_wrong is None else lights_wrong
+        self.symmetry = symmetry
+        # Board used for hashing and equality: the smallest of its symmetric images
+        self.key_board = board
+        if symmetry:
+            for tables in get_lights_out_symmetries(shape[0], shape[1], goal):
+                image = permute_bits(board, tables)
+                if image < self.key_board:
+                    self.key_board = image
+        super().__init__(board, goal, path_cost, enable_heuristic)
+
+    # List view of the packed board, e.g. for printing
+    @property
+    def grid(self):
+        return unpack_grid(self.current_state, self.shape[0], self.shape[1])
 
-    # Helper function to check if a 2d index is a valid location in puzzle grid
-    def _in_bounds(self, loc):
-        if loc[0] < 0 or loc[0] > len(self.current_state)-1 or loc[1] < 0 or loc[1] > len(self.current_state[0])-1:
-            return False
-        return True
-    
-    # TODO(III): implement this method
     def generate_successors(self) -> List[SearchState]:
-        nbr_states = []
-        # NOTE: For reproducible tie-breaking, please add neighbors in row-major order.
-        # For instance, you should toggle (0,0) first, then (0,1), ..., then (0,n-1), then (1,0), etc.
-        rows = len(self.current_state)
-        cols = len(self.current_state[0])
-        for i in range(rows):
-            for j in range(cols):
-                nbr_states.append(self.make_successor(i,j))
-        return nbr_states
-    
+        # NOTE: For reproducible tie-breaking, neighbors are added in row-major order.
+        # For instance, toggle (0,0) first, then (0,1), ..., then (0,n-1), then (1,0), etc.
+        return [self._toggle(i) for i in range(len(self.toggle_masks))]
+
+    # Toggles commute and toggling a cell twice undoes it, so every solution can be applied with
+    # strictly increasing toggle indices. Searches without duplicate detection (IDA*, RBFS) use this
+    # to avoid exploring every ordering of the same set of toggles.
+    def generate_tree_successors(self) -> List[SearchState]:
+        return [self._toggle(i) for i in range(self.last_toggle + 1, len(self.toggle_masks))]
+
     def make_successor(self, row: int, col: int) -> SearchState:
-        new_copy = copy.deepcopy(self.current_state)
-        for dx, dy in self.offsets:
-            r = row +dx
-            c = col + dy
-            if self._in_bounds((r,c)):
-                new_copy[r][c] = 1 - new_copy[r][c]
-        return LightsOutState(new_copy, self.target_state, self.path_cost + 1, self.eneable_heuristic, self.cross_pattern)
+        return self._toggle(row * self.shape[1] + col)
+
+    def _toggle(self, index):
+        mask = self.toggle_masks[index]
+        # Lights under the mask that differed from the goal now match it and the rest now differ,
+        # so the count changes by |mask| - 2 * |(board ^ goal) & mask|
+        wrong_under_mask = ((self.current_state ^ self.target_state) & mask).bit_count()
+        lights_wrong = self.lights_wrong + mask.bit_count() - 2 * wrong_under_mask
+        return LightsOutState(self.current_state ^ mask, self.target_state, self.path_cost + 1,
+                              self.enable_heuristic, self.cross_pattern, self.shape, lights_wrong, index, self.symmetry)
 
     def goal_test(self):
-        # In python "==" performs deep list equality checking, so this works as desired
         return self.current_state == self.target_state
-    
-    # Convert state to tuples.
+
+    def state_key(self):
+        return ("LightsOut", self.shape, self.cross_pattern, self.key_board, self.target_state)
+
+    def reversed_problem(self):
+        return LightsOutState(self.target_state, self.current_state, 0, self.enable_heuristic,
+                              self.cross_pattern, self.shape)
+
     def __hash__(self):
-        return hash(self.__str__())
+        return hash(self.key_board)
     def __eq__(self, other):
-        return self.current_state == other.current_state
+        return self.key_board == other.key_board
 
-    # TODO(III): implement this method
     def calculate_heuristic(self):
-        # The heuristic we use is the number of lights that are on divided by 5.
-        num_lights = sum(sum(row) for row in self.currrent_state)
-        heuristic = num_lights/5.0    
+        # The heuristic we use is the number of lights that differ from the goal divided by 5,
+        # since a single toggle flips at most 5 lights. Measuring against target_state (rather than
+        # counting the lights that are on) keeps it admissible and consistent for any goal, e.g. in
+        # the reversed problem of bidirectional search.
+        heuristic = self.lights_wrong/5.0
         return heuristic
 
-    # TODO(III): implement this method
-    def __lt__(self, other):    
+    def __lt__(self, other):
         # You should return True if the current state has a lower g + h value than "other"
         # If they have the same value then you should use creation_order to decide which is smaller
         f = self.path_cost + self.heuristic_value
@@ -124,82 +299,237 @@ class LightsOutState(SearchState):
         if f == g_h:
             return self.creation_order < other.creation_order
         return f < g_h
-    
+
     # str and repr just make output more readable when your print out states
     def __str__(self):
-        return str(self.current_state)
+        return str(self.grid)
     def __repr__(self):
-        return "\n".join([" ".join([str(c) for c in row]) for row in self.current_state])
+        return "\n".join([" ".join([str(c) for c in row]) for row in self.grid])
 
 # EightPuzzle ------------------------------------------------------------------------------------------------
 
-# TODO(IV): implement this method (also need it for the next homework)
 # Manhattan distance between two points (a=(a1,a2), b=(b1,b2))
 def grid_distance(a, b):
     return (abs(a[0] - b[0]) + abs(a[1] - b[1]))
 
+# Boards are packed TILE_BITS bits per cell, cell r*size + c in the lowest bits,
+# so anything up to a 4x4 board fits in one integer
+TILE_BITS = 4
+TILE_MASK = (1 << TILE_BITS) - 1
+
+def pack_puzzle(grid):
+    if isinstance(grid, int):
+        return grid
+    board = 0
+    for i, tile in enumerate(tile for row in grid for tile in row):
+        board |= tile << (TILE_BITS * i)
+    return board
+
+def unpack_puzzle(board, size):
+    return [[(board >> (TILE_BITS * (r * size + c))) & TILE_MASK for c in range(size)] for r in range(size)]
+
+class PuzzleTables:
+    '''
+    Lookup tables shared by every state of one puzzle (board size + goal):
+        neighbors[z]: cells the blank at z can swap with, in [below, left, above, right] order
+        goal_positions[tile]: 2d index of tile in the goal
+        distances[tile][p]: Manhattan distance of tile at cell p from its goal cell (0 for the blank)
+        symmetries: (perm, relabel) pairs for the board symmetries that map the goal onto itself
+                    once tiles are renamed by relabel; a board maps to new[perm[p]] = relabel[board[p]]
+    '''
+    __slots__ = ('size', 'neighbors', 'goal_positions', 'distances', 'symmetries')
+
+    def __init__(self, goal, size):
+        self.size = size
+        cells = size * size
+        neighbors = []
+        for z in range(cells):
+            r, c = divmod(z, size)
+            nbrs = []
+            if r < size - 1:
+                nbrs.append(z + size)
+            if c > 0:
+                nbrs.append(z - 1)
+            if r > 0:
+                nbrs.append(z - size)
+            if c < size - 1:
+                nbrs.append(z + 1)
+            neighbors.append(tuple(nbrs))
+        self.neighbors = tuple(neighbors)
+
+        goal_positions = [None] * cells
+        for p in range(cells):
+            goal_positions[(goal >> (TILE_BITS * p)) & TILE_MASK] = divmod(p, size)
+        self.goal_positions = tuple(goal_positions)
+        self.distances = tuple(
+            tuple(0 if tile == 0 else grid_distance(divmod(p, size), goal_positions[tile]) for p in range(cells))
+            for tile in range(cells))
+
+        # For the usual goal (blank in a corner) only the reflection in the diagonal through the
+        # blank qualifies. It preserves grid distances, so Manhattan and linear conflicts are unchanged.
+        goal_tiles = [(goal >> (TILE_BITS * p)) & TILE_MASK for p in range(cells)]
+        symmetries = []
+        for perm in board_symmetries(size, size):
+            relabel = [0] * cells
+            for p in range(cells):
+                relabel[goal_tiles[p]] = goal_tiles[perm[p]]
+            if relabel[0] == 0:
+                symmetries.append((perm, tuple(relabel)))
+        self.symmetries = tuple(symmetries)
+
+_puzzle_tables_cache = {}
+
+# Number of tiles that have to leave a line (row or column) so the rest are in goal order:
+# the line length minus its longest increasing subsequence of goal positions
+def _line_conflicts(goal_order):
+    if len(goal_order) < 2:
+        return 0
+    longest = []
+    for i, x in enumerate(goal_order):
+        longest.append(1 + max([longest[j] for j in range(i) if goal_order[j] < x], default=0))
+    return len(goal_order) - max(longest)
+
+def linear_conflicts(board, tables):
+    '''
+    Extra moves on top of Manhattan distance for tiles that sit in their goal row (column)
+    but in the wrong order: every tile that has to step out of the line costs 2 more moves.
+    '''
+    size = tables.size
+    goal_positions = tables.goal_positions
+    rows = [[] for _ in range(size)]
+    cols = [[] for _ in range(size)]
+    for p in range(size * size):
+        tile = (board >> (TILE_BITS * p)) & TILE_MASK
+        if tile == 0:
+            continue
+        r, c = divmod(p, size)
+        goal_r, goal_c = goal_positions[tile]
+        if goal_r == r:
+            rows[r].append(goal_c)
+        if goal_c == c:
+            cols[c].append(goal_r)
+    return 2 * sum(_line_conflicts(line) for line in rows + cols)
+
+def get_puzzle_tables(goal, size):
+    key = (goal, size)
+    tables = _puzzle_tables_cache.get(key)
+    if tables is None:
+        tables = PuzzleTables(goal, size)
+        _puzzle_tables_cache[key] = tables
+    return tables
+
+# Also handles the 15-puzzle (and any size x size board up to 4x4)
 class EightPuzzleState(SearchState):
-    def __init__(self, state, goal, path_cost, enable_heuristic, zero_loc):
+    __slots__ = ('size', 'zero_index', 'tables', 'heuristic', 'symmetry', 'key_board')
+
+    def __init__(self, state, goal, path_cost, enable_heuristic, zero_loc, size=None, heuristic_value=None,
+                 heuristic="manhattan", symmetry=False):
         '''
-        state: 3x3 array of integers 0-8
-        goal: 3x3 goal array, default is np.arange(9).reshape(3,3).tolist()
-        zero_loc: an additional helper argument indicating the 2d index of 0 in state, you do not have to use it
+        state: 3x3 array of integers 0-8, or an already packed board (then size must be given)
+        goal: 3x3 goal array (or packed board), default is np.arange(9).reshape(3,3).tolist()
+        zero_loc: the 2d index of 0 in state, or its flat index r*size + c
+        heuristic_value: h(n) of state, if already known (e.g. updated from the parent)
+        heuristic: "manhattan", "linear_conflict", or a callable mapping a packed board to h(n),
+                   e.g. a pattern_database.PatternDatabaseHeuristic
+        symmetry: identify boards that are reflections of each other up to renaming tiles. Ignored
+                  with a callable heuristic, which need not give equivalent boards the same value.
         '''
-        # NOTE: SearchState constructor does not take zero_loc
-        super().__init__(state, goal, path_cost, enable_heuristic)
-        self.zero_loc = zero_loc
-    
-    # TODO(IV): implement this method
+        if size is None:
+            size = len(state)
+        self.size = size
+        self.heuristic = heuristic
+        self.zero_index = zero_loc if isinstance(zero_loc, int) else zero_loc[0] * size + zero_loc[1]
+        goal = pack_puzzle(goal)
+        self.tables = get_puzzle_tables(goal, size)
+        board = pack_puzzle(state)
+        self.symmetry = symmetry and not callable(heuristic)
+        # Board used for hashing and equality: the smallest of its symmetric images
+        self.key_board = board
+        if self.symmetry:
+            for perm, relabel in self.tables.symmetries:
+                image = 0
+                for p in range(size * size):
+                    image |= relabel[(board >> (TILE_BITS * p)) & TILE_MASK] << (TILE_BITS * perm[p])
+                if image < self.key_board:
+                    self.key_board = image
+        super().__init__(board, goal, path_cost, enable_heuristic, heuristic_value)
+
+    # 2d index of the blank, as given by read_eight_puzzle
+    @property
+    def zero_loc(self):
+        return list(divmod(self.zero_index, self.size))
+
+    # List view of the packed board, e.g. for printing
+    @property
+    def grid(self):
+        return unpack_puzzle(self.current_state, self.size)
+
     def generate_successors(self):
         '''
         Return: a list of EightPuzzleState
         '''
-        nbr_states = []
-        # NOTE: There are *up to 4* possible neighbors and the order you add them matters for tiebreaking
-        #   Please add them in the following order: [below, left, above, right], where for example "below" 
+        # NOTE: There are *up to 4* possible neighbors and the order we add them matters for tiebreaking.
+        #   They are added in the following order: [below, left, above, right], where for example "below"
         #   corresponds to moving the empty tile down (moving the tile below the empty tile up)
-        
+        board = self.current_state
+        z = self.zero_index
+        distances = self.tables.distances
+        incremental = self.heuristic == "manhattan"
+        h = None
+        nbr_states = []
+        for p in self.tables.neighbors[z]:
+            tile = (board >> (TILE_BITS * p)) & TILE_MASK
+            new_board = board ^ (tile << (TILE_BITS * p)) ^ (tile << (TILE_BITS * z))
+            if incremental:
+                # Only the moved tile changes its distance to the goal
+                h = self.heuristic_value - distances[tile][p] + distances[tile][z]
+            nbr_states.append(EightPuzzleState(new_board, self.target_state, self.path_cost + 1,
+                                               self.enable_heuristic, p, self.size, h, self.heuristic,
+                                               self.symmetry))
         return nbr_states
 
     # Checks if goal has been reached
     def goal_test(self):
-        # In python "==" performs deep list equality checking, so this works as desired
         return self.current_state == self.target_state
-    
-    # Can't hash a list, so first flatten the 2d array and then turn into tuple
+
+    def state_key(self):
+        return ("EightPuzzle", self.size, self.key_board, self.target_state)
+
+    def reversed_problem(self):
+        goal = self.target_state
+        zero_index = next(p for p in range(self.size * self.size) if (goal >> (TILE_BITS * p)) & TILE_MASK == 0)
+        # A pattern database only knows distances to its own goal, so fall back to Manhattan distance
+        heuristic = "manhattan" if callable(self.heuristic) else self.heuristic
+        return EightPuzzleState(goal, self.current_state, 0, self.enable_heuristic, zero_index, self.size,
+                                heuristic=heuristic)
+
     def __hash__(self):
-        return hash(tuple([item for sublist in self.current_state for item in sublist]))
+        return hash(self.key_board)
     def __eq__(self, other):
-        return self.current_state == other.current_state
-    
-    # TODO(IV): implement this method
+        return self.key_board == other.key_board
+
     def calculate_heuristic(self):
+        board = self.current_state
+        if callable(self.heuristic):
+            return self.heuristic(board)
+        # Manhattan heuristic: sum over tiles (not the blank) of the grid distance to their goal cell
+        distances = self.tables.distances
         total = 0
-        # NOTE: There is more than one possible heuristic, 
-        #       please implement the Manhattan heuristic, as described in the MP instructions
-        positions = {}
-        for i in range(3):
-            for j in range(3):
-                positions[self.target_state[i][j]] = (i,j)
-        for i in range(3):
-            for j in range(3):
-                tile = self.current_state[i][j]
-                if tile != 0:
-                    goal_i, goal_j = positions[tile[i][j]]
-                    total += grid_distance((i,j), (goal_i, goal_j))
+        for p in range(self.size * self.size):
+            total += distances[(board >> (TILE_BITS * p)) & TILE_MASK][p]
+        if self.heuristic == "linear_conflict":
+            total += linear_conflicts(board, self.tables)
         return total
-    
-    # TODO(IV): implement this method
-    # Hint: it should be identical to what you wrote in WordLadder.__lt__(self, other)
+
     def __lt__(self, other):
-        f = self.path_cost + other.heuristic_value
+        f = self.path_cost + self.heuristic_value
         g_h = other.path_cost + other.heuristic_value
         if f == g_h:
             return self.creation_order < other.creation_order
         return f < g_h
-    
+
     # str and repr just make output more readable when you print out states
     def __str__(self):
-        return str(self.current_state)
+        return str(self.grid)
     def __repr__(self):
-        return "\n".join([" ".join([str(c) for c in row]) for row in self.current_state])
+        return "\n".join([" ".join([str(c) for c in row]) for row in self.grid])
@@ -0,0 +1,150 @@
+"""
+Hyperparameter sweep for the Naive Bayes models.
+
+Loads and counts the corpus once, then evaluates the dev accuracy for a whole grid of
+laplace / bigram_laplace / bigram_lambda / pos_prior values without going back to the text.
+With the counts fixed, a Laplace value only changes the per-word log-probability table, so each
+one costs a table and a sparse matrix-vector product over the dev set. bigram_lambda and pos_prior
+enter the log-odds of a document affinely, so the whole (lambda, prior) grid is one broadcast.
+The (laplace, bigram_laplace) combinations are spread over a process pool.
+
+Examples:
+    python sweep.py --model naive_bayes --laplace 0.01 0.1 1 --pos_prior 0.5 0.7
+    python sweep.py --laplace 0.5 1 --bigram_laplace 0.1 1 --bigram_lambda 0 0.25 0.5 --workers 4
+"""
+import argparse
+import csv
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import reader
+from naive_bayes import NaiveBayesModel, token_columns, csr_from_coordinates, csr_matvec, class_log_likelihoods, seen_columns
+from bigram_naive_bayes import BigramNaiveBayesModel, bigram_ids, bigram_entries
+
+
+class SweepCounts:
+    '''
+    What the sweep needs from the corpus: the per-class unigram (and bigram) counts of the
+    training set, and CSR count matrices of the dev set over the same columns
+    '''
+    def __init__(self, train_set, train_labels, dev_set, dev_labels, bigrams=True):
+        model = BigramNaiveBayesModel() if bigrams else NaiveBayesModel()
+        model.fit(train_set, train_labels)
+        self.unigram_counts = model.unigram_counts if bigrams else model.counts
+        unseen = self.unigram_counts.shape[1]
+        dev_columns, dev_lengths = token_columns(dev_set, model.vocabulary, unseen)
+        dev_rows = np.repeat(np.arange(len(dev_set)), dev_lengths)
+        self.unigram_matrix = csr_from_coordinates(dev_rows, dev_columns, len(dev_set), unseen + 1)
+        self.dev_labels = np.array(dev_labels)
+
+        self.bigram_counts = None
+        self.bigram_matrix = None
+        if bigrams:
+            self.bigram_counts = model.bigram_counts
+            dev_pairs, dev_pair_rows = bigram_ids(dev_columns, dev_lengths)
+            self.bigram_matrix = csr_from_coordinates(dev_pair_rows, bigram_entries(model.bigram_ids, dev_pairs),
+                                                      len(dev_set), len(model.bigram_ids) + 1)
+
+# Positive minus negative log-likelihood of every dev document for one Laplace value
+def log_likelihood_odds(counts, matrix, laplace):
+    tables = [class_log_likelihoods(class_counts, laplace, seen_columns(counts)) for class_counts in counts]
+    return csr_matvec(matrix, tables[1] - tables[0])
+
+# Set in each worker process once, so the counts are not sent along with every task
+_counts = None
+
+def _init_worker(counts):
+    global _counts
+    _counts = counts
+
+def evaluate(laplace, bigram_laplace, bigram_lambdas, pos_priors):
+    '''
+    Return the dev accuracy for every (bigram_lambda, pos_prior) pair, as an array of shape
+    (len(bigram_lambdas), len(pos_priors)). bigram_laplace is None for the unigram model.
+    '''
+    unigram_odds = log_likelihood_odds(_counts.unigram_counts, _counts.unigram_matrix, laplace)
+    if bigram_laplace is None:
+        bigram_odds = np.zeros_like(unigram_odds)
+    else:
+        bigram_odds = log_likelihood_odds(_counts.bigram_counts, _counts.bigram_matrix, bigram_laplace)
+    lambdas = np.array(bigram_lambdas, dtype=np.float64)[:, None, None]
+    prior_odds = np.array([math.log(p) - math.log(1 - p) for p in pos_priors])[None, :, None]
+    log_odds = prior_odds + (1 - lambdas) * unigram_odds + lambdas * bigram_odds
+    return ((log_odds > 0) == (_counts.dev_labels == 1)).mean(axis=2)
+
+def run_sweep(counts, laplaces, bigram_laplaces, bigram_lambdas, pos_priors, workers=1):
+    '''Return one dict per grid point with its parameters and dev accuracy'''
+    settings = list(itertools.product(laplaces, bigram_laplaces))
+    tasks = [(laplace, bigram_laplace, bigram_lambdas, pos_priors) for laplace, bigram_laplace in settings]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(counts,)) as executor:
+            accuracies = list(executor.map(evaluate, *zip(*tasks)))
+    else:
+        _init_worker(counts)
+        accuracies = [evaluate(*task) for task in tasks]
+    rows = []
+    for (laplace, bigram_laplace), grid in zip(settings, accuracies):
+        for (i, bigram_lambda), (j, pos_prior) in itertools.product(enumerate(bigram_lambdas), enumerate(pos_priors)):
+            rows.append({"laplace": laplace, "bigram_laplace": bigram_laplace, "bigram_lambda": bigram_lambda,
+                         "pos_prior": pos_prior, "accuracy": float(grid[i, j])})
+    return rows
+
+def print_table(rows, columns):
+    print(" ".join(f"{column:>14}" for column in columns))
+    for row in rows:
+        print(" ".join(f"{row[column]:>14.6g}" for column in columns))
+
+def main(args):
+    bigrams = args.model == "bigram"
+    train_set, train_labels, dev_set, dev_labels = reader.load_dataset(args.training_dir, args.development_dir,
+                                                                       args.stemming, args.lowercase, silently=True,
+                                                                       workers=args.workers)
+    counts = SweepCounts(train_set, train_labels, dev_set, dev_labels, bigrams)
+    if bigrams:
+        columns = ["laplace", "bigram_laplace", "bigram_lambda", "pos_prior", "accuracy"]
+        rows = run_sweep(counts, args.laplace, args.bigram_laplace, args.bigram_lambda, args.pos_prior, args.workers)
+    else:
+        columns = ["laplace", "pos_prior", "accuracy"]
+        rows = run_sweep(counts, args.laplace, [None], [0.0], args.pos_prior, args.workers)
+    rows.sort(key=lambda row: -row["accuracy"])
+    print_table(rows[:args.top] if args.top else rows, columns)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='CS440 MP1/MP2 Naive Bayes hyperparameter sweep')
+    parser.add_argument('--training', dest='training_dir', type=str, default = 'data/movie_reviews/train',
+                        help='the directory of the training data')
+    parser.add_argument('--development', dest='development_dir', type=str, default = 'data/movie_reviews/dev',
+                        help='the directory of the development data')
+    parser.add_argument('--stemming', dest="stemming", action='store_true',
+                        help='Use porter stemmer')
+    parser.add_argument('--lowercase', dest="lowercase", action='store_true',
+                        help='Convert all word to lower case')
+    parser.add_argument('--model', dest="model", type=str, default="bigram", choices=["naive_bayes", "bigram"],
+                        help='Sweep the unigram model of mp1 or the bigram mixture model of mp2')
+    parser.add_argument('--laplace', dest="laplace", type=float, nargs="+", default=[0.01, 0.1, 0.5, 1.0],
+                        help='Unigram Laplace smoothing values')
+    parser.add_argument('--bigram_laplace', dest="bigram_laplace", type=float, nargs="+", default=[0.01, 0.1, 0.5, 1.0],
+                        help='Bigram Laplace smoothing values')
+    parser.add_argument('--bigram_lambda', dest="bigram_lambda", type=float, nargs="+",
+                        default=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
+                        help='Weights on bigrams vs. unigrams')
+    parser.add_argument('--pos_prior', dest="pos_prior", type=float, nargs="+", default=[0.5],
+                        help='Positive priors')
+    parser.add_argument('--workers', dest="workers", type=int, default=1,
+                        help='Number of worker processes to evaluate the Laplace settings in parallel')
+    parser.add_argument('--top', dest="top", type=int, default=None,
+                        help='Only print the best TOP settings')
+    parser.add_argument('--csv', dest="csv", type=str, default=None,
+                        help='Also write the full table, best first, to this CSV file')
+
+    args = parser.parse_args()
+    main(args)
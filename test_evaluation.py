@@ -0,0 +1,13 @@
+import numpy as np
+
+from evaluation import bootstrap_intervals
+
+
+def test_bootstrap_intervals_do_not_depend_on_the_workers():
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, 2, 300)
+    scores = labels + rng.normal(size=300)
+    expected = bootstrap_intervals(labels, scores, num_resamples=50, workers=1)
+    for workers in (2, 3):
+        assert bootstrap_intervals(labels, scores, num_resamples=50, workers=workers) == expected
+    assert bootstrap_intervals(labels, scores, num_resamples=50, seed=1) != expected
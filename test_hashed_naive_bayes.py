@@ -0,0 +1,64 @@
+import numpy as np
+
+from bigram_naive_bayes import BigramNaiveBayesModel
+from hashed_naive_bayes import HashedNaiveBayesModel, word_hashes, ngram_hashes, hash_buckets
+from vocabulary import Vocabulary
+
+
+def distinct_buckets(docs, order, bits):
+    '''Whether the distinct n-grams of the given order in docs all fall in different buckets'''
+    hashes = word_hashes([word for doc in docs for word in doc])
+    ngrams, _ = ngram_hashes(hashes, np.array([len(doc) for doc in docs]), order)
+    ngrams = np.unique(ngrams)
+    return len(np.unique(hash_buckets(ngrams, bits))) == len(ngrams)
+
+def test_matches_exact_model_without_collisions(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    # A part of the corpus whose n-grams happen to fill 2**18 buckets without a collision
+    train_set, train_labels, dev_set, bits = train_set[:80], train_labels[:80], dev_set[:30], 18
+    assert all(distinct_buckets(train_set + dev_set, order, bits) for order in (1, 2))
+    exact = BigramNaiveBayesModel(0.5, 1.0, 0.45, 0.5).fit(train_set, train_labels)
+    hashed = HashedNaiveBayesModel(bits, (0.5, 1.0), (0.55, 0.45), 0.5).fit(train_set, train_labels)
+    assert np.allclose(hashed.log_odds(dev_set), exact.log_odds(dev_set))
+    assert np.array_equal(hashed.predict(dev_set), exact.predict(dev_set))
+
+def word_hash(word):
+    '''64-bit FNV-1a one byte at a time, then the splitmix64 finalizer'''
+    value = 0xCBF29CE484222325
+    for byte in word.encode():
+        value = ((value ^ byte) * 0x100000001B3) % 2 ** 64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) % 2 ** 64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) % 2 ** 64
+    return value ^ (value >> 31)
+
+def test_word_hashes_match_one_word_at_a_time():
+    words = ["", "a", "ab", "ba", "movie", "naïve", "x" * 50, "日本"]
+    assert word_hashes(words).tolist() == [word_hash(word) for word in words]
+
+def test_memory_does_not_grow_with_the_words(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    model = HashedNaiveBayesModel(12).fit(train_set, train_labels)
+    table_bytes = model.table_bytes()
+    new_docs = [[f"new{i}", f"new{i + 1}"] for i in range(1000)]
+    model.partial_fit(new_docs, [i % 2 for i in range(1000)]).log_odds(new_docs)
+    assert model.table_bytes() == table_bytes
+    assert model.vocabulary is None
+
+def test_interned_documents_score_like_token_lists(corpus, tmp_path):
+    train_set, train_labels, dev_set, _ = corpus
+    expected = HashedNaiveBayesModel(14).fit(train_set, train_labels).log_odds(dev_set)
+    vocabulary = Vocabulary()
+    interned_train = [vocabulary.intern(doc) for doc in train_set]
+    interned_dev = [vocabulary.intern(doc) for doc in dev_set]
+    model = HashedNaiveBayesModel(14, vocabulary=vocabulary).fit(interned_train, train_labels)
+    assert np.array_equal(model.log_odds(interned_dev), expected)
+    # A loaded model has no vocabulary and scores token lists the same way
+    model.save(tmp_path / "hashed.model")
+    assert np.array_equal(HashedNaiveBayesModel.load(tmp_path / "hashed.model").log_odds(dev_set), expected)
+
+def test_counts_do_not_wrap_around():
+    model = HashedNaiveBayesModel(8).fit([["a"]], [1])
+    bucket = hash_buckets(word_hashes(["a"]), 8)[0]
+    model.counts[0, 1, bucket] = 2 ** 31 - 1
+    model.partial_fit([["a", "a"]], [1])
+    assert model.counts[0, 1, bucket] == 2 ** 31 + 1
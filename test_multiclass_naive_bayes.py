@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from multiclass_naive_bayes import MulticlassNaiveBayesModel
+from naive_bayes import NaiveBayesModel, csr_matmat, csr_matvec, csr_from_coordinates, partial_fit_stream
+from serve import load_model, tokenization
+
+
+def test_two_classes_match_binary_model(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    binary = NaiveBayesModel(0.5, 0.6).fit(train_set, train_labels)
+    multiclass = MulticlassNaiveBayesModel(["neg", "pos"], 0.5, [0.4, 0.6]).fit(train_set, train_labels)
+    assert np.array_equal(multiclass.predict(dev_set), binary.predict(dev_set))
+    assert np.allclose(multiclass.predict_log_proba(dev_set), binary.predict_log_proba(dev_set))
+
+def test_csr_matmat_matches_csr_matvec_per_column():
+    rng = np.random.default_rng(0)
+    # Mostly short and empty documents, so blocks hold many documents and some hold none
+    lengths = rng.choice([0, 1, 2, 40], size=300)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    matrix = csr_from_coordinates(rows, rng.integers(0, 50, len(rows)), len(lengths), 50)
+    dense = rng.normal(size=(50, 3))
+    expected = np.stack([csr_matvec(matrix, dense[:, k]) for k in range(dense.shape[1])], axis=1)
+    for block_entries in (None, 1, 16):
+        assert np.allclose(csr_matmat(matrix, dense, block_entries), expected)
+
+def test_saved_model_loads_in_server(corpus, tmp_path):
+    train_set, train_labels, dev_set, _ = corpus
+    model = MulticlassNaiveBayesModel(["neg", "pos"]).fit(train_set, train_labels)
+    model.save(tmp_path / "multiclass.model")
+    loaded = load_model(tmp_path / "multiclass.model")
+    assert isinstance(loaded, MulticlassNaiveBayesModel)
+    assert np.array_equal(loaded.predict(dev_set), model.predict(dev_set))
+
+def test_server_tokenizes_like_the_saved_model(corpus, tmp_path):
+    train_set, train_labels, _, _ = corpus
+    model = MulticlassNaiveBayesModel(["neg", "pos"]).fit(train_set, train_labels)
+    model.save(tmp_path / "settings.model", stemming=False, lowercase=True)
+    loaded = load_model(tmp_path / "settings.model")
+    assert tokenization(loaded) == tokenization(loaded, lowercase=True) == (False, True)
+    with pytest.raises(ValueError):
+        tokenization(loaded, stemming=True)
+    # Without recorded settings the given ones are used
+    model.save(tmp_path / "plain.model")
+    assert tokenization(load_model(tmp_path / "plain.model"), stemming=True) == (True, False)
+
+def test_partial_fit_batches_match_fit(corpus, tmp_path):
+    train_set, _, dev_set, _ = corpus
+    classes = ["a", "b", "c", "d", "e"]
+    labels = [i * 7 % len(classes) for i in range(len(train_set))]
+    fitted = MulticlassNaiveBayesModel(classes).fit(train_set, labels)
+    streamed = partial_fit_stream(MulticlassNaiveBayesModel(classes), zip(train_set[:120], labels[:120]), batch_size=7)
+    # Counting on in a loaded model, whose tables are read-only mappings of the file
+    streamed.save(tmp_path / "half.model")
+    streamed = partial_fit_stream(MulticlassNaiveBayesModel.load(tmp_path / "half.model"),
+                                  zip(train_set[120:], labels[120:]), batch_size=7)
+    assert np.array_equal(streamed.counts, fitted.counts)
+    assert np.array_equal(streamed.doc_counts, fitted.doc_counts)
+    assert np.allclose(streamed.predict_log_proba(dev_set), fitted.predict_log_proba(dev_set))
@@ -0,0 +1,87 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from naive_bayes import NaiveBayesModel, partial_fit_stream, predict_stream
+from bigram_naive_bayes import BigramNaiveBayesModel
+from hashed_naive_bayes import HashedNaiveBayesModel
+from multiclass_naive_bayes import MulticlassNaiveBayesModel
+from ngram_naive_bayes import NgramNaiveBayesModel
+from vocabulary import Vocabulary
+
+
+def reference_log_odds(train_set, train_labels, docs, laplaces, lambdas, pos_prior):
+    '''
+    Per-token loop over Counters, as naive_bayes() and bigram_bayes() scored before the CSR rewrite:
+    the lambda-weighted sum over the n-gram orders of each class's Laplace-smoothed log-likelihood
+    '''
+    log_odds = []
+    orders = range(1, len(lambdas) + 1)
+    ngrams = lambda tokens, n: [tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+    counts = {(n, label): Counter() for n in orders for label in (0, 1)}
+    for tokens, label in zip(train_set, train_labels):
+        for n in orders:
+            counts[n, label].update(ngrams(tokens, n))
+    for tokens in docs:
+        scores = [math.log(1 - pos_prior), math.log(pos_prior)]
+        for n, laplace, weight in zip(orders, laplaces, lambdas):
+            vocabulary_size = len(set(counts[n, 0]) | set(counts[n, 1]))
+            for label in (0, 1):
+                denominator = sum(counts[n, label].values()) + laplace * vocabulary_size
+                scores[label] += weight * sum(math.log((counts[n, label][ngram] + laplace) / denominator)
+                                              for ngram in ngrams(tokens, n))
+        log_odds.append(scores[1] - scores[0])
+    return np.array(log_odds)
+
+
+def test_unigram_model_matches_per_token_loop(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    model = NaiveBayesModel(laplace=0.5, pos_prior=0.6).fit(train_set, train_labels)
+    expected = reference_log_odds(train_set, train_labels, dev_set, [0.5], [1.0], 0.6)
+    assert np.allclose(model.log_odds(dev_set), expected)
+    assert np.array_equal(model.predict(dev_set), (expected > 0).astype(int))
+
+def test_bigram_model_matches_per_token_loop(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    model = BigramNaiveBayesModel(0.5, 1.0, 0.45, 0.5).fit(train_set, train_labels)
+    expected = reference_log_odds(train_set, train_labels, dev_set, [0.5, 1.0], [0.55, 0.45], 0.5)
+    assert np.allclose(model.log_odds(dev_set), expected)
+    assert np.array_equal(model.predict(dev_set), (expected > 0).astype(int))
+
+def test_partial_fit_batches_match_fit(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    for make_model in (lambda: NaiveBayesModel(0.5, 0.6), lambda: BigramNaiveBayesModel(0.5, 1.0, 0.45, 0.5)):
+        fitted = make_model().fit(train_set, train_labels)
+        streamed = partial_fit_stream(make_model(), zip(train_set, train_labels), batch_size=7)
+        assert np.allclose(streamed.log_odds(dev_set), fitted.log_odds(dev_set))
+        predicted_labels, true_labels = predict_stream(streamed, zip(dev_set, range(len(dev_set))), batch_size=7)
+        assert predicted_labels == fitted.predict(dev_set).tolist()
+        assert true_labels == list(range(len(dev_set)))
+
+def test_interned_documents_score_like_token_lists(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    for make_model in (NaiveBayesModel, BigramNaiveBayesModel):
+        expected = make_model().fit(train_set, train_labels).log_odds(dev_set)
+        # As reader.load_dataset does: the dev set is interned too, before training
+        vocabulary = Vocabulary()
+        interned_train = [vocabulary.intern(doc) for doc in train_set]
+        interned_dev = [vocabulary.intern(doc) for doc in dev_set]
+        model = make_model(vocabulary=vocabulary).fit(interned_train, train_labels)
+        assert np.array_equal(model.log_odds(interned_dev), expected)
+        assert np.array_equal(model.log_odds(dev_set), expected)
+
+@pytest.mark.parametrize("make_model", [
+    NaiveBayesModel, BigramNaiveBayesModel, lambda: NgramNaiveBayesModel((0.5, 1.0, 0.8), (0.5, 0.3, 0.2)),
+    lambda: HashedNaiveBayesModel(12), lambda: MulticlassNaiveBayesModel(["neg", "pos"])])
+def test_saved_models_score_the_same(corpus, tmp_path, make_model):
+    train_set, train_labels, dev_set, _ = corpus
+    model = make_model().fit(train_set, train_labels)
+    model.save(tmp_path / "model")
+    loaded = type(model).load(tmp_path / "model")
+    assert np.array_equal(loaded.joint_log_likelihoods(dev_set), model.joint_log_likelihoods(dev_set))
+    assert np.array_equal(loaded.predict_log_proba(dev_set), model.predict_log_proba(dev_set))
+    other = NgramNaiveBayesModel if isinstance(model, NaiveBayesModel) else NaiveBayesModel
+    with pytest.raises(ValueError):
+        other.load(tmp_path / "model")
@@ -0,0 +1,28 @@
+import numpy as np
+
+from bigram_naive_bayes import BigramNaiveBayesModel
+from naive_bayes import partial_fit_stream
+from ngram_naive_bayes import NgramNaiveBayesModel
+from test_naive_bayes import reference_log_odds
+
+
+def test_order_two_matches_bigram_model(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    bigram = BigramNaiveBayesModel(0.5, 1.0, 0.45, 0.6).fit(train_set, train_labels)
+    ngram = NgramNaiveBayesModel((0.5, 1.0), (0.55, 0.45), 0.6).fit(train_set, train_labels)
+    assert np.allclose(ngram.log_odds(dev_set), bigram.log_odds(dev_set))
+    assert np.array_equal(ngram.predict(dev_set), bigram.predict(dev_set))
+
+def test_order_three_matches_per_token_loop(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    laplaces, lambdas = (0.5, 1.0, 0.8), (0.5, 0.3, 0.2)
+    model = NgramNaiveBayesModel(laplaces, lambdas, 0.5).fit(train_set, train_labels)
+    expected = reference_log_odds(train_set, train_labels, dev_set, laplaces, lambdas, 0.5)
+    assert np.allclose(model.log_odds(dev_set), expected)
+
+def test_partial_fit_batches_match_fit(corpus):
+    train_set, train_labels, dev_set, _ = corpus
+    laplaces, lambdas = (0.5, 1.0, 0.8), (0.5, 0.3, 0.2)
+    fitted = NgramNaiveBayesModel(laplaces, lambdas).fit(train_set, train_labels)
+    streamed = partial_fit_stream(NgramNaiveBayesModel(laplaces, lambdas), zip(train_set, train_labels), batch_size=7)
+    assert np.allclose(streamed.log_odds(dev_set), fitted.log_odds(dev_set))
@@ -0,0 +1,193 @@
+import math
+import random
+
+import pytest
+
+from frontier import FRONTIERS, make_frontier
+from lights_out_solver import solve_lights_out
+from pattern_database import PatternDatabaseHeuristic
+from search import SearchStats, astar_search, ida_star_search, rbfs_search, bidirectional_search
+from solution_cache import SolutionCache
+from state import EightPuzzleState, LightsOutState, pack_puzzle, unpack_grid
+from utils import get_goal_eight_puzzle
+
+
+def make_stats(solution_length, nodes_generated):
+    stats = SearchStats()
+    stats.solution_length = solution_length
+    stats.nodes_generated = nodes_generated
+    return stats
+
+def test_effective_branching_factor_of_uniform_tree():
+    # 1 + 3 + 9 + 27 nodes: depth 3 with branching factor 3
+    assert math.isclose(make_stats(3, 39).effective_branching_factor(), 3.0)
+
+def test_effective_branching_factor_for_long_solutions():
+    for solution_length, nodes_generated in ((60, 2 * 10 ** 6), (45, 5 * 10 ** 7), (2000, 10 ** 9)):
+        stats = make_stats(solution_length, nodes_generated)
+        b = stats.effective_branching_factor()
+        assert 1.0 < b < 2.0
+        assert math.isclose(sum(b ** i for i in range(solution_length + 1)), nodes_generated + 1, rel_tol=1e-6)
+        assert stats.to_dict()["effective_branching_factor"] == b
+
+
+def bfs_distances(goal_state, max_depth):
+    '''Exact goal distance of every state within max_depth moves of the goal (all moves are reversible)'''
+    distances = {goal_state: 0}
+    layer = [goal_state]
+    for depth in range(1, max_depth + 1):
+        next_layer = []
+        for state in layer:
+            for neighbor in state.generate_successors():
+                if neighbor not in distances:
+                    distances[neighbor] = depth
+                    next_layer.append(neighbor)
+        layer = next_layer
+    return distances
+
+@pytest.mark.parametrize("size, max_depth, patterns", [(3, 14, None), (4, 9, [(1, 2, 3), (4, 5, 6, 7)])])
+def test_puzzle_heuristics_never_exceed_true_distance(size, max_depth, patterns, tmp_path):
+    goal = get_goal_eight_puzzle(size)
+    pdb = PatternDatabaseHeuristic(goal, size, patterns, directory=str(tmp_path))
+    distances = bfs_distances(EightPuzzleState(goal, goal, 0, False, [0, 0]), max_depth)
+    for state, distance in distances.items():
+        for heuristic in ("manhattan", "linear_conflict", pdb):
+            h = EightPuzzleState(state.current_state, goal, 0, True, state.zero_index, size, heuristic=heuristic).heuristic_value
+            assert h <= distance
+    # The heuristics are ordered: linear conflicts only add to Manhattan distance
+    board = max(distances, key=distances.get)
+    manhattan, linear_conflict = (EightPuzzleState(board.current_state, goal, 0, True, board.zero_index, size,
+                                                   heuristic=heuristic).heuristic_value
+                                  for heuristic in ("manhattan", "linear_conflict"))
+    assert manhattan <= linear_conflict
+    assert pdb(board.current_state) > 0 and pdb(pack_puzzle(goal)) == 0
+
+
+def search_problems():
+    '''Solvable 8-puzzle and LightsOut problems (random walks back from the goal), some with a LightsOut goal that is not all off'''
+    rng = random.Random(7)
+    goal = get_goal_eight_puzzle(3)
+    problems = []
+    for steps in (6, 12, 18):
+        state = EightPuzzleState(goal, goal, 0, True, [0, 0])
+        for _ in range(steps):
+            state = rng.choice(state.generate_successors())
+        problems.append(EightPuzzleState(state.current_state, goal, 0, True, state.zero_index, 3))
+    for cross_pattern in (False, True):
+        for all_off in (True, False):
+            goal = [[0] * 3 for _ in range(3)] if all_off else [[rng.randint(0, 1) for _ in range(3)] for _ in range(3)]
+            state = LightsOutState(goal, goal, 0, True, cross_pattern)
+            for _ in range(5):
+                state = rng.choice(state.generate_successors())
+            problems.append(LightsOutState(state.current_state, goal, 0, True, cross_pattern, (3, 3)))
+    return problems
+
+def assert_valid_path(path, start):
+    assert path[0].current_state == start.current_state
+    for state, successor in zip(path, path[1:]):
+        assert successor.current_state in [neighbor.current_state for neighbor in state.generate_successors()]
+    assert path[-1].goal_test()
+
+@pytest.mark.parametrize("search", [ida_star_search, rbfs_search])
+def test_memory_bounded_searches_find_optimal_paths(search):
+    for start in search_problems():
+        path = search(start)
+        assert_valid_path(path, start)
+        assert len(path) == len(astar_search(start))
+
+@pytest.mark.parametrize("frontier", sorted(FRONTIERS))
+def test_every_frontier_finds_optimal_paths(frontier):
+    for start in search_problems():
+        queue = make_frontier(frontier)
+        path = astar_search(start, queue)
+        assert_valid_path(path, start)
+        assert len(path) == len(astar_search(start))
+        assert queue.pops <= queue.pushes
+
+def test_bidirectional_search_finds_optimal_paths():
+    for start in search_problems():
+        path = bidirectional_search(start)
+        assert_valid_path(path, start)
+        assert len(path) == len(astar_search(start))
+        assert [state.path_cost for state in path] == list(range(len(path)))
+
+def test_reversed_problem_heuristic_is_zero_on_its_target():
+    start = LightsOutState([[1, 0, 1], [0, 1, 0], [1, 1, 0]], [[0] * 3 for _ in range(3)], 0, True)
+    backward = LightsOutState(start.current_state, start.current_state, 0, True, shape=(3, 3))
+    assert backward.goal_test() and backward.heuristic_value == 0
+    reversed_start = start.reversed_problem()
+    assert reversed_start.target_state == start.current_state
+    assert reversed_start.heuristic_value == start.heuristic_value
+
+@pytest.mark.parametrize("cross_pattern", [False, True])
+def test_algebraic_lights_out_solver_matches_astar(cross_pattern):
+    rng = random.Random(11)
+    for rows, cols in ((3, 3), (3, 4), (4, 4)):
+        for _ in range(4):
+            grid = [[rng.randint(0, 1) for _ in range(cols)] for _ in range(rows)]
+            goal = [[0] * cols for _ in range(rows)]
+            start = LightsOutState(grid, goal, 0, True, cross_pattern)
+            optimal = astar_search(start)
+            path = solve_lights_out(start)
+            assert len(path) == len(optimal)
+            if path:
+                assert_valid_path(path, start)
+
+def test_unsolvable_lights_out_board():
+    # A single light in the corner of a 4x4 board cannot be switched off with the + pattern
+    grid = [[1, 0, 0, 0]] + [[0] * 4 for _ in range(3)]
+    start = LightsOutState(grid, [[0] * 4 for _ in range(4)], 0, True)
+    assert solve_lights_out(start) == []
+    assert astar_search(start) == []
+
+def with_options(start, symmetry):
+    '''The same problem as start, with symmetry reduction switched on or off'''
+    if isinstance(start, LightsOutState):
+        return LightsOutState(start.current_state, start.target_state, 0, True, start.cross_pattern, start.shape,
+                              symmetry=symmetry)
+    return EightPuzzleState(start.current_state, start.target_state, 0, True, start.zero_index, start.size,
+                            symmetry=symmetry)
+
+def test_cached_searches_stay_optimal(tmp_path):
+    cache = SolutionCache(path=str(tmp_path / "cache"))
+    for start in search_problems():
+        optimal = len(astar_search(start))
+        path = astar_search(start, cache=cache)
+        assert_valid_path(path, start)
+        assert len(path) == optimal
+        # Solved again, or from a state half way along, the search stops at a cached state
+        hits = cache.hits
+        again = astar_search(with_options(start, False), cache=cache)
+        assert_valid_path(again, start)
+        assert len(again) == optimal and cache.hits > hits
+        middle = with_options(path[len(path) // 2], False)
+        assert len(astar_search(middle, cache=cache)) == optimal - len(path) // 2
+    cache.close()
+    # A new cache on the same file starts warm, with every entry loaded from one stored copy of each path
+    reopened = SolutionCache(path=str(tmp_path / "cache"))
+    assert len(reopened.store) == reopened.stored_paths == cache.stored_paths
+    assert reopened.entries.keys() == cache.entries.keys()
+    start = search_problems()[-1]
+    assert reopened.get(start) is not None
+    assert len(astar_search(start, cache=reopened)) == len(astar_search(start))
+    reopened.close()
+
+def test_symmetry_reduction_keeps_paths_optimal():
+    cache = SolutionCache()
+    for start in search_problems():
+        optimal = len(astar_search(start))
+        for use_cache in (None, cache):
+            reduced = with_options(start, True)
+            path = astar_search(reduced, cache=use_cache)
+            assert_valid_path(path, reduced)
+            assert len(path) == optimal
+    # A mirror image of a solved LightsOut board shares its canonical key, so it is a cache hit
+    start = next(state for state in search_problems() if isinstance(state, LightsOutState))
+    mirrored = [row[::-1] for row in start.grid]
+    mirrored_start = LightsOutState(mirrored, [row[::-1] for row in unpack_grid(start.target_state, 3, 3)], 0, True,
+                                    start.cross_pattern, symmetry=True)
+    hits = cache.hits
+    path = astar_search(mirrored_start, cache=cache)
+    assert cache.hits > hits
+    assert_valid_path(path, mirrored_start)
+    assert len(path) == len(astar_search(start))
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from state import LightsOutState, EightPuzzleState, pack_grid, unpack_grid, pack_puzzle, unpack_puzzle
+from utils import get_goal_eight_puzzle
+
+
+def random_walk(state, rng, steps):
+    '''The states of a random chain of successors starting at state'''
+    states = [state]
+    for _ in range(steps):
+        state = rng.choice(state.generate_successors())
+        states.append(state)
+    return states
+
+def random_grid(rng, rows, cols):
+    return [[rng.randint(0, 1) for _ in range(cols)] for _ in range(rows)]
+
+
+@pytest.mark.parametrize("cross_pattern", [False, True])
+def test_lights_out_incremental_heuristic_matches_recomputation(cross_pattern):
+    rng = random.Random(3)
+    for rows, cols in ((3, 3), (4, 5)):
+        start = LightsOutState(random_grid(rng, rows, cols), random_grid(rng, rows, cols), 0, True, cross_pattern)
+        for state in random_walk(start, rng, 200):
+            assert state.heuristic_value == state.calculate_heuristic()
+            assert state.lights_wrong == (state.current_state ^ state.target_state).bit_count()
+
+@pytest.mark.parametrize("heuristic", ["manhattan", "linear_conflict"])
+@pytest.mark.parametrize("size", [3, 4])
+def test_eight_puzzle_incremental_heuristic_matches_recomputation(heuristic, size):
+    rng = random.Random(5)
+    start = EightPuzzleState(get_goal_eight_puzzle(size), get_goal_eight_puzzle(size), 0, True, [0, 0],
+                             heuristic=heuristic)
+    for state in random_walk(start, rng, 300):
+        assert state.heuristic_value == state.calculate_heuristic()
+
+
+def toggle_grid(grid, row, col, cross_pattern):
+    '''List-based toggle, as LightsOutState did it before boards were packed'''
+    offsets = [(0, 0), (-1, -1), (-1, 1), (1, -1), (1, 1)] if cross_pattern else [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]
+    grid = [list(line) for line in grid]
+    for dr, dc in offsets:
+        r, c = row + dr, col + dc
+        if 0 <= r < len(grid) and 0 <= c < len(grid[0]):
+            grid[r][c] ^= 1
+    return grid
+
+@pytest.mark.parametrize("cross_pattern", [False, True])
+def test_lights_out_packed_board(cross_pattern):
+    rng = random.Random(1)
+    grid = random_grid(rng, 3, 4)
+    goal = [[0] * 4 for _ in range(3)]
+    state = LightsOutState(grid, goal, 0, True, cross_pattern)
+    assert unpack_grid(pack_grid(grid), 3, 4) == grid
+    assert state.grid == grid
+    assert repr(state) == "\n".join(" ".join(str(light) for light in row) for row in grid)
+    successors = state.generate_successors()
+    assert [s.grid for s in successors] == [toggle_grid(grid, r, c, cross_pattern) for r in range(3) for c in range(4)]
+    assert all(s.path_cost == 1 for s in successors)
+    # Toggling the same cell twice is back to the same board, key and hash
+    again = successors[5].make_successor(1, 1)
+    assert again == state and hash(again) == hash(state) and again.state_key() == state.state_key()
+    assert state.state_key() != LightsOutState(grid, goal, 0, True, not cross_pattern).state_key()
+    assert state.state_key() != LightsOutState(grid, grid, 0, True, cross_pattern).state_key()
+
+def test_lights_out_goal_test():
+    assert LightsOutState([[0, 0], [0, 0]], [[0, 0], [0, 0]], 0, True).goal_test()
+    assert not LightsOutState([[0, 1], [0, 0]], [[0, 0], [0, 0]], 0, True).goal_test()
+    assert LightsOutState([[0, 1], [1, 0]], [[0, 1], [1, 0]], 0, True).goal_test()
+
+
+def move_blank(grid, zero_loc, dr, dc):
+    '''List-based move, as EightPuzzleState did it before boards were packed'''
+    grid = [list(line) for line in grid]
+    r, c = zero_loc
+    grid[r][c], grid[r + dr][c + dc] = grid[r + dr][c + dc], grid[r][c]
+    return grid
+
+@pytest.mark.parametrize("size", [3, 4])
+def test_eight_puzzle_packed_board(size):
+    rng = random.Random(2)
+    goal = get_goal_eight_puzzle(size)
+    start = random_walk(EightPuzzleState(goal, goal, 0, True, [0, 0]), rng, 40)[-1]
+    grid = start.grid
+    assert unpack_puzzle(pack_puzzle(grid), size) == grid
+    assert repr(start) == "\n".join(" ".join(str(tile) for tile in row) for row in grid)
+    zero_loc = start.zero_loc
+    assert grid[zero_loc[0]][zero_loc[1]] == 0
+    # Successors in [below, left, above, right] order
+    r, c = zero_loc
+    expected = [move_blank(grid, zero_loc, dr, dc) for dr, dc in ((1, 0), (0, -1), (-1, 0), (0, 1))
+                if 0 <= r + dr < size and 0 <= c + dc < size]
+    assert [s.grid for s in start.generate_successors()] == expected
+    same = EightPuzzleState(grid, goal, 3, True, zero_loc)
+    assert same == start and hash(same) == hash(start) and same.state_key() == start.state_key()
+    assert same.state_key() != EightPuzzleState(grid, grid, 0, True, zero_loc).state_key()
+
+def test_eight_puzzle_goal_test():
+    goal = get_goal_eight_puzzle(3)
+    assert EightPuzzleState(goal, goal, 0, True, [0, 0]).goal_test()
+    moved = move_blank(goal, [0, 0], 0, 1)
+    assert not EightPuzzleState(moved, goal, 0, True, [0, 1]).goal_test()
@@ -1,21 +1,29 @@
+import os
 
 # EightPuzzle ------------------------------------------------------------------------------------------------
 
-def read_eight_puzzle(filename):
+# Each line is one puzzle in row-major order: either one digit per cell (e.g. "125637084"),
+# or whitespace/comma separated numbers for boards with tiles above 9 (the 15-puzzle)
+def read_eight_puzzle(filename, size=3):
     with open(filename, "r") as file:
         all_grids = []
         for line in file:
-            grid = [[]]
-            for c in line.strip():
-                if len(grid[-1])==3:
-                    grid.append([])
-                intc = int(c)
-                if intc == 0:
-                    zero_loc = [len(grid)-1, len(grid[-1])]
-                grid[-1].append(intc)
+            line = line.strip()
+            if not line:
+                continue
+            if size > 3 or "," in line or " " in line:
+                tiles = [int(c) for c in line.replace(",", " ").split()]
+            else:
+                tiles = [int(c) for c in line]
+            assert len(tiles) == size*size, f"Invalid puzzle {line} in {filename}"
+            grid = [tiles[r*size:(r+1)*size] for r in range(size)]
+            zero_loc = list(divmod(tiles.index(0), size))
             all_grids.append([grid, zero_loc])
         return all_grids
 
+def get_goal_eight_puzzle(size=3):
+    return [[r*size + c for c in range(size)] for r in range(size)]
+
 # LightsOut ------------------------------------------------------------------------------------------------
 def read_lights_out(filename):
     with open(filename, "r") as file:
@@ -47,4 +55,17 @@ def read_lights_out(filename):
         return all_grids
 
 def get_goal_lights_out(state):
-    return [[0 for _ in range(len(state[0]))] for _ in range(len(state))]
\ No newline at end of file
+    return [[0 for _ in range(len(state[0]))] for _ in range(len(state))]
+# Files ------------------------------------------------------------------------------------------------
+
+# Write path through write(f) on a temporary file that is then renamed into place, so a concurrent run
+# sees either no file or the whole one, never a half-written file
+def write_atomically(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
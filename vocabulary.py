@@ -0,0 +1,41 @@
+"""
+Integer interning of words.
+
+A Vocabulary gives every word a consecutive integer id, in order of first appearance. Documents
+interned at load time are stored as array('I') buffers of ids (4 bytes per token instead of an
+8-byte pointer to a str object), and the models count and score them through numpy without
+hashing a single string. Plain token lists are accepted everywhere too and are looked up once.
+"""
+from array import array
+from itertools import chain, repeat
+
+
+class Vocabulary:
+    def __init__(self, words=()):
+        self.ids = {}
+        self.words = []
+        self.add(words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, words):
+        ids = self.ids
+        for word in words:
+            if word not in ids:
+                ids[word] = len(self.words)
+                self.words.append(word)
+
+    def add_docs(self, docs):
+        '''Add the words of token-list documents (interned documents are already in the vocabulary)'''
+        docs = [doc for doc in docs if isinstance(doc, list)]
+        self.add(dict.fromkeys(chain.from_iterable(docs)))
+
+    def intern(self, tokens):
+        '''Return the ids of tokens as an array('I'), adding any new words'''
+        self.add(dict.fromkeys(tokens))
+        return array('I', map(self.ids.__getitem__, tokens))
+
+    def lookup(self, tokens):
+        '''Iterator over the ids of tokens, with len(self) for words that are not in the vocabulary'''
+        return map(self.ids.get, tokens, repeat(len(self.words)))